@@ -0,0 +1,5 @@
+"""
+Benchmarks for YT CLI Tools.
+
+Run a benchmark module directly, e.g. ``python -m benchmarks.bench_metadata``.
+"""
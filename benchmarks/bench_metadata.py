@@ -0,0 +1,108 @@
+"""
+Benchmark the full and projected metadata extraction paths.
+
+The extractor is a stand-in for ``yt_dlp.YoutubeDL`` that charges simulated
+network latency for each resource a real YouTube extraction would fetch
+(watch page, player JavaScript, DASH/HLS manifests, oEmbed) and does real
+CPU work for format processing, so the relative cost of each strategy can
+be compared without network access.
+
+Usage:
+    python -m benchmarks.bench_metadata [--videos N] [--latency-ms MS]
+"""
+
+import argparse
+import io
+import json
+import random
+import time
+from typing import Any, Dict
+from yt_cli.metadata import choose_strategy, fetch_metadata_with_strategy, ydl_opts_for
+
+
+class FakeYoutubeDL:
+    """Minimal ``YoutubeDL`` stand-in with simulated extraction costs."""
+    
+    def __init__(self, params: Dict[str, Any], latency: float, formats: int = 150):
+        self.params = params
+        self.latency = latency
+        self.formats = formats
+        youtube_args = params.get('extractor_args', {}).get('youtube', {})
+        self.skip = set(youtube_args.get('skip', []))
+        self.player_skip = set(youtube_args.get('player_skip', []))
+        
+    def _fetch(self, weight: float = 1.0) -> None:
+        time.sleep(self.latency * weight)
+        
+    def urlopen(self, url):
+        self._fetch(0.5)
+        return io.BytesIO(json.dumps({
+            'title': 'Title', 'author_name': 'Channel', 'thumbnail_url': 'https://i.ytimg.com/x.jpg'
+        }).encode())
+        
+    def extract_info(self, url, download=False, process=True):
+        self._fetch()                       # Watch page
+        if 'configs' not in self.player_skip:
+            self._fetch()                   # Client configs
+        if 'js' not in self.player_skip:
+            self._fetch(2.0)                # Player JavaScript
+        for manifest in ('dash', 'hls'):
+            if manifest not in self.skip:
+                self._fetch()
+                
+        info = {
+            'id': url[-11:], 'title': 'Title', 'uploader': 'Channel', 'duration': 600,
+            'view_count': 1, 'like_count': 1, 'thumbnails': [{'url': 'https://i.ytimg.com/x.jpg'}],
+            'formats': [{'format_id': str(i), 'tbr': random.random() * 5000,
+                         'height': random.choice([144, 360, 720, 1080])}
+                        for i in range(self.formats)],
+        }
+        if process:
+            # Format sorting and selection, as done by process_video_result
+            for _ in range(20):
+                sorted(info['formats'], key=lambda f: (f['height'], f['tbr']))
+            info['thumbnail'] = info['thumbnails'][-1]['url']
+        return info
+
+
+def run(videos: int, latency: float) -> Dict[str, float]:
+    """
+    Time each strategy over ``videos`` extractions.
+    
+    Returns:
+        Mapping of strategy name to mean seconds per video
+    """
+    cases = {
+        'full': None,
+        'lightweight': ['title', 'duration', 'view_count'],
+        'oembed': ['title', 'channel'],
+        'url': ['video_id'],
+    }
+    results = {}
+    for name, fields in cases.items():
+        strategy = choose_strategy(fields)
+        assert strategy == name, (name, strategy)
+        ydl = FakeYoutubeDL(ydl_opts_for(strategy), latency)
+        start = time.perf_counter()
+        for i in range(videos):
+            fetch_metadata_with_strategy(f"https://youtu.be/{i:011d}", fields, ydl=ydl)
+        results[name] = (time.perf_counter() - start) / videos
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--videos', type=int, default=20, help='Extractions per strategy')
+    parser.add_argument('--latency-ms', type=float, default=20.0,
+                        help='Simulated latency per network request')
+    args = parser.parse_args()
+    
+    results = run(args.videos, args.latency_ms / 1000)
+    baseline = results['full']
+    print(f"{'strategy':<12} {'ms/video':>10} {'speedup':>8}")
+    for name, seconds in results.items():
+        print(f"{name:<12} {seconds * 1000:>10.2f} {baseline / seconds:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
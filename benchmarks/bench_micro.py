@@ -0,0 +1,283 @@
+"""
+Microbenchmarks for the hot pure-Python paths, checked against a baseline.
+
+Each case times one operation over a fixed, seeded input: summarizing
+transcripts of growing size, validating and classifying URLs and
+extracting their video IDs, formatting durations and file sizes, and
+building and serializing metadata records the way ``extract_metadata``
+and ``metadata --batch`` do.
+The best of several repeats is kept, which is the figure least disturbed
+by other work on the machine.
+
+Results are compared with a baseline file. A case that got slower than
+the baseline by more than ``--threshold`` percent is a regression, and
+the command then exits with status 1, so it can gate a CI job. Timings
+only compare on the same machine and Python, so record the baseline
+where the check runs (``--save``).
+
+Usage:
+    python -m benchmarks.bench_micro [--threshold PCT] [--only PREFIX] [--repeat N]
+    python -m benchmarks.bench_micro --save [--baseline FILE]
+"""
+
+import argparse
+import io
+import json
+import platform
+import random
+import sys
+import time
+import timeit
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from benchmarks.bench_summarize import synthetic_transcript
+from yt_cli.metadata import METADATA_FIELDS, MetadataWriter, build_metadata
+from yt_cli.transcript import summarize_text
+from yt_cli.utils import (
+    extract_video_id, format_duration, format_file_size, parse_youtube_url, validate_youtube_url
+)
+
+
+DEFAULT_BASELINE = Path(__file__).with_name('baseline_micro.json')
+
+# Slowdown, in percent, reported as a regression
+DEFAULT_THRESHOLD = 25.0
+
+DEFAULT_REPEAT = 5
+
+# Shortest time one timed sample runs for
+MIN_SAMPLE_TIME = 0.2
+
+
+@dataclass
+class Case:
+    """One benchmark: ``func`` processes ``ops`` items per call."""
+    
+    name: str
+    func: Callable[[], Any]
+    ops: int
+    unit: str
+
+
+def _video_id(rng: random.Random) -> str:
+    alphabet = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+    return ''.join(rng.choice(alphabet) for _ in range(11))
+
+
+def sample_urls(count: int, seed: int = 0) -> List[str]:
+    """Generate a mix of URL shapes seen in URL lists, about a tenth of them invalid."""
+    rng = random.Random(seed)
+    shapes = [
+        'https://www.youtube.com/watch?v={id}',
+        'https://youtu.be/{id}',
+        'https://www.youtube.com/watch?v={id}&t=42s&list=PL0123456789',
+        'youtube.com/embed/{id}',
+        'http://youtube-nocookie.com/v/{id}',
+        'https://m.youtube.com/watch?feature=share&v={id}',
+        'https://example.com/watch?v={id}',
+        'not a url {id}',
+    ]
+    weights = [40, 25, 10, 8, 4, 3, 5, 5]
+    return [rng.choices(shapes, weights)[0].format(id=_video_id(rng)) for _ in range(count)]
+
+
+def sample_info(rng: random.Random) -> Dict[str, Any]:
+    """Generate a yt-dlp info dict with realistic field sizes."""
+    words = 'video tutorial review music live stream guide news gaming setup'.split()
+    return {
+        'id': _video_id(rng),
+        'title': ' '.join(rng.choice(words) for _ in range(8)).title(),
+        'uploader': 'Channel ' + str(rng.randint(1, 10 ** 6)),
+        'channel_id': 'UC' + _video_id(rng) * 2,
+        'duration': rng.randint(30, 4 * 3600),
+        'view_count': rng.randint(0, 10 ** 9),
+        'like_count': rng.randint(0, 10 ** 7),
+        'upload_date': f"20{rng.randint(10, 25)}{rng.randint(1, 12):02d}{rng.randint(1, 28):02d}",
+        'description': ' '.join(rng.choice(words) for _ in range(300)),
+        'thumbnails': [{'url': f'https://i.ytimg.com/vi/x/{i}.jpg', 'preference': i} for i in range(40)],
+        'categories': ['Education'],
+        'tags': [rng.choice(words) + str(i) for i in range(20)],
+    }
+
+
+def _write_records(records: List[Dict[str, Any]], output_format: str) -> None:
+    writer = MetadataWriter(io.StringIO(), output_format, METADATA_FIELDS)
+    for record in records:
+        writer.write(record)
+
+
+def build_cases(seed: int = 0) -> List[Case]:
+    """Create every benchmark case with its input prepared up front."""
+    cases = []
+    for words in (1000, 10000, 50000):
+        text = synthetic_transcript(words, seed)
+        count = len(text.split())
+        cases.append(Case(f"summarize.{words // 1000}k", lambda text=text: summarize_text(text), count, 'word'))
+        
+    urls = sample_urls(10000, seed)
+    cases.append(Case('url.validate', lambda: [validate_youtube_url(u) for u in urls], len(urls), 'url'))
+    cases.append(Case('url.extract_id', lambda: [extract_video_id(u) for u in urls], len(urls), 'url'))
+    cases.append(Case('url.parse', lambda: [parse_youtube_url(u) for u in urls], len(urls), 'url'))
+    
+    rng = random.Random(seed)
+    durations = [rng.randint(0, 100 * 3600) for _ in range(10000)]
+    sizes = [int(10 ** rng.uniform(0, 13)) for _ in range(10000)]
+    cases.append(Case('format.duration', lambda: [format_duration(d) for d in durations], len(durations), 'value'))
+    cases.append(Case('format.file_size', lambda: [format_file_size(s) for s in sizes], len(sizes), 'value'))
+    
+    infos = [sample_info(rng) for _ in range(1000)]
+    url = 'https://www.youtube.com/watch?v=dQw4w9WgXcQ'
+    records = [build_metadata(info, url) for info in infos]
+    cases.append(Case('metadata.build', lambda: [build_metadata(info, url) for info in infos], len(infos), 'record'))
+    cases.append(Case('metadata.json', lambda: [json.dumps(build_metadata(info, url), indent=2) for info in infos],
+                      len(infos), 'record'))
+    cases.append(Case('metadata.ndjson', lambda: _write_records(records, 'ndjson'), len(records), 'record'))
+    cases.append(Case('metadata.csv', lambda: _write_records(records, 'csv'), len(records), 'record'))
+    return cases
+
+
+def measure(case: Case, repeat: int = DEFAULT_REPEAT) -> float:
+    """
+    Time a case.
+    
+    Returns:
+        Best seconds per item over ``repeat`` samples of at least ``MIN_SAMPLE_TIME`` each
+    """
+    timer = timeit.Timer(case.func)
+    number = 1
+    while True:
+        if timer.timeit(number) >= MIN_SAMPLE_TIME:
+            break
+        number *= 2
+    return min(timer.repeat(repeat=repeat, number=number)) / number / case.ops
+
+
+def load_baseline(path: Path) -> Optional[Dict[str, Any]]:
+    """Read a baseline file, or return None if there is none."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def environment() -> Dict[str, str]:
+    """Describe what the timings depend on."""
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.system(),
+        'processor': platform.processor(),
+    }
+
+
+def save_baseline(path: Path, results: Dict[str, float], previous: Optional[Dict[str, Any]] = None) -> None:
+    """Write results as the new baseline, keeping cases that were not run."""
+    merged = dict((previous or {}).get('results', {}))
+    merged.update(results)
+    baseline = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'environment': environment(),
+        'results': merged,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+def compare(results: Dict[str, float], baseline: Dict[str, float],
+            threshold: float) -> List[Tuple[str, Optional[float], float, Optional[float], str]]:
+    """
+    Compare results with a baseline.
+    
+    Args:
+        results: Seconds per item of each case that was run
+        baseline: Seconds per item recorded for each case
+        threshold: Slowdown in percent above which a case regressed
+        
+    Returns:
+        ``(name, baseline, result, change_percent, status)`` rows, where
+        status is ``ok``, ``faster``, ``REGRESSION`` or ``new``
+    """
+    rows = []
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if not before:
+            rows.append((name, None, seconds, None, 'new'))
+            continue
+        change = (seconds / before - 1) * 100
+        if change > threshold:
+            status = 'REGRESSION'
+        elif change < -threshold:
+            status = 'faster'
+        else:
+            status = 'ok'
+        rows.append((name, before, seconds, change, status))
+    return rows
+
+
+def format_time(seconds: Optional[float]) -> str:
+    """Format a per-item time with a readable unit."""
+    if seconds is None:
+        return '-'
+    for unit, scale in (('s', 1), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--baseline', type=Path, default=DEFAULT_BASELINE,
+                        help=f'Baseline file (default: {DEFAULT_BASELINE.name} next to this module)')
+    parser.add_argument('--save', action='store_true', help='Record the results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'Slowdown in percent reported as a regression (default: {DEFAULT_THRESHOLD:g})')
+    parser.add_argument('--only', action='append', default=[], metavar='PREFIX',
+                        help='Run only cases whose name starts with PREFIX (repeatable), e.g. url or summarize.1k')
+    parser.add_argument('--repeat', type=int, default=DEFAULT_REPEAT,
+                        help=f'Samples per case; the best one counts (default: {DEFAULT_REPEAT})')
+    args = parser.parse_args()
+    
+    cases = [c for c in build_cases() if not args.only or c.name.startswith(tuple(args.only))]
+    if not cases:
+        parser.error("no case matches --only")
+        
+    baseline = load_baseline(args.baseline)
+    if baseline is not None and baseline.get('environment') != environment():
+        print(f"Warning: {args.baseline} was recorded on a different machine or Python; "
+              "timings may not be comparable", file=sys.stderr)
+              
+    results = {}
+    start = time.perf_counter()
+    for case in cases:
+        results[case.name] = measure(case, max(1, args.repeat))
+        
+    rows = compare(results, (baseline or {}).get('results', {}), args.threshold)
+    units = {c.name: c.unit for c in cases}
+    print(f"{'case':<18} {'unit':<7} {'baseline':>11} {'now':>11} {'change':>8}  status")
+    for name, before, seconds, change, status in rows:
+        change_text = f"{change:+.1f}%" if change is not None else '-'
+        print(f"{name:<18} {units[name]:<7} {format_time(before):>11} {format_time(seconds):>11} "
+              f"{change_text:>8}  {status}")
+    print(f"\n{len(rows)} case(s) in {time.perf_counter() - start:.1f}s")
+    
+    if args.save:
+        save_baseline(args.baseline, results, baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; record one with --save")
+        return
+        
+    regressions = [row[0] for row in rows if row[4] == 'REGRESSION']
+    if regressions:
+        print(f"Regressions beyond {args.threshold:g}%: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark transcript summarization on synthetic transcripts of growing size.
+
+Transcripts are generated from a fixed vocabulary with a few recurring
+topics, roughly mimicking auto-generated captions (sentences of varying
+length, about a third of them without punctuation). Time per word should
+stay roughly constant as the input grows.
+
+Usage:
+    python -m benchmarks.bench_summarize [--sizes 10000,50000,100000,200000]
+"""
+
+import argparse
+import random
+import time
+from yt_cli.summarizer import summarize
+
+
+def synthetic_transcript(words: int, seed: int = 0) -> str:
+    """Generate a transcript of roughly ``words`` words."""
+    rng = random.Random(seed)
+    topics = [
+        [f"topic{t}word{i}" for i in range(40)] for t in range(8)
+    ]
+    filler = "the a and so we you it is that to of in this like know um".split()
+    out = []
+    count = 0
+    while count < words:
+        topic = rng.choice(topics)
+        length = rng.randint(6, 40)
+        sentence = [rng.choice(topic) if rng.random() < 0.4 else rng.choice(filler)
+                    for _ in range(length)]
+        out.append(' '.join(sentence) + ('.' if rng.random() < 0.7 else ''))
+        count += length
+    return ' '.join(out)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', default='10000,25000,50000,100000,200000',
+                        help='Comma-separated transcript sizes in words')
+    parser.add_argument('--summary', default='medium', choices=['short', 'medium', 'long'])
+    args = parser.parse_args()
+    
+    print(f"{'words':>10} {'seconds':>9} {'us/word':>9}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        text = synthetic_transcript(size)
+        start = time.perf_counter()
+        result = summarize(text, args.summary)
+        elapsed = time.perf_counter() - start
+        print(f"{result.total_words:>10} {elapsed:>9.3f} {elapsed / result.total_words * 1e6:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
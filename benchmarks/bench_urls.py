@@ -0,0 +1,125 @@
+"""
+Benchmark URL parsing and ``urls normalize`` throughput on large URL lists.
+
+The input mixes every URL shape ``parse_youtube_url`` knows (watch,
+youtu.be, mobile and music hosts, Shorts, embeds, playlists and channels)
+with foreign and malformed lines, and repeats a share of earlier URLs in
+other shapes so that deduplication has work to do.
+
+Parsing is compared with the two separate regex matches that
+``validate_youtube_url`` and ``extract_video_id`` used to make. The
+normalize runs stream the list from a temporary file to ``os.devnull``,
+once with every key in memory and once with a small ``--memory`` budget
+that forces sorted runs to be spilled to disk and merged.
+
+Usage:
+    python -m benchmarks.bench_urls [--lines 1000000] [--duplicates 0.3] [--memory 4M]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import re
+import tempfile
+import time
+from typing import List
+from yt_cli.urls import DEFAULT_MEMORY, normalize_urls
+from yt_cli.utils import parse_size, parse_youtube_url
+
+
+# The pattern validate_youtube_url and extract_video_id each matched before parse_youtube_url
+LEGACY_PATTERN = r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
+
+_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_'
+
+SHAPES = [
+    ('https://www.youtube.com/watch?v={id}', 30),
+    ('https://youtu.be/{id}', 20),
+    ('https://www.youtube.com/watch?v={id}&list=PL{list}&index=3', 8),
+    ('https://m.youtube.com/watch?feature=share&v={id}', 5),
+    ('https://music.youtube.com/watch?v={id}&si=abc', 4),
+    ('https://www.youtube.com/shorts/{id}', 8),
+    ('youtube.com/embed/{id}?start=10', 3),
+    ('https://www.youtube.com/playlist?list=PL{list}', 5),
+    ('https://www.youtube.com/@{handle}/videos', 4),
+    ('https://www.youtube.com/channel/UC{channel}', 3),
+    ('https://example.com/watch?v={id}', 5),
+    ('not a url {id}', 5),
+]
+
+
+def _token(rng: random.Random, length: int) -> str:
+    return ''.join(rng.choices(_ALPHABET, k=length))
+
+
+def generate_lines(count: int, duplicates: float = 0.3, seed: int = 0) -> List[str]:
+    """Generate a URL list where about ``duplicates`` of the lines repeat an earlier item."""
+    rng = random.Random(seed)
+    shapes = [shape for shape, _ in SHAPES]
+    weights = [weight for _, weight in SHAPES]
+    items = []
+    lines = []
+    for _ in range(count):
+        if items and rng.random() < duplicates:
+            fields = rng.choice(items)
+        else:
+            fields = {'id': _token(rng, 11), 'list': _token(rng, 32), 'channel': _token(rng, 22),
+                      'handle': _token(rng, 8)}
+            if len(items) < 100000:
+                items.append(fields)
+        lines.append(rng.choices(shapes, weights)[0].format(**fields))
+    return lines
+
+
+def time_parsing(lines: List[str]) -> None:
+    """Print the time per line of the legacy regex pair and of the classifier."""
+    legacy = re.compile(LEGACY_PATTERN)
+    
+    def legacy_parse(url):
+        if legacy.match(url):
+            return legacy.match(url).group(6)
+        return None
+        
+    for name, func in (('legacy validate + extract', legacy_parse), ('parse_youtube_url', parse_youtube_url)):
+        start = time.perf_counter()
+        for line in lines:
+            func(line)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<28} {elapsed / len(lines) * 1e9:>9.0f} ns/line {len(lines) / elapsed:>12,.0f} lines/s")
+
+
+def time_normalize(path: str, lines: int, memory: int, label: str) -> None:
+    """Print the throughput of ``normalize_urls`` over the list in ``path``."""
+    with open(os.devnull, 'w', encoding='utf-8') as output, contextlib.redirect_stderr(io.StringIO()):
+        start = time.perf_counter()
+        counts = normalize_urls(path, output, memory=memory)
+        elapsed = time.perf_counter() - start
+    print(f"{label:<28} {lines / elapsed:>12,.0f} lines/s  {elapsed:>6.2f}s  "
+          f"{counts['written']:,} unique, {counts['duplicates']:,} duplicates")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--lines', type=int, default=1000000, help='Lines in the generated list')
+    parser.add_argument('--duplicates', type=float, default=0.3,
+                        help='Share of lines repeating an earlier item (default: 0.3)')
+    parser.add_argument('--memory', default='4M',
+                        help='Budget of the spilling run (default: 4M)')
+    args = parser.parse_args()
+    
+    lines = generate_lines(args.lines, args.duplicates)
+    time_parsing(lines)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'urls.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        print()
+        time_normalize(path, len(lines), DEFAULT_MEMORY, 'normalize (in memory)')
+        time_normalize(path, len(lines), parse_size(args.memory), f'normalize (--memory {args.memory})')
+
+
+if __name__ == '__main__':
+    main()
@@ -21,7 +21,7 @@ setup(
     long_description=long_description,
     long_description_content_type='text/markdown',
     url='https://github.com/YOUR_USERNAME/yt-cli-tools',
-    packages=find_packages(exclude=['tests', 'tests.*']),
+    packages=find_packages(exclude=['tests', 'tests.*', 'benchmarks', 'benchmarks.*']),
     classifiers=[
         'Development Status :: 4 - Beta',
         'Intended Audience :: Developers',
@@ -39,6 +39,9 @@ setup(
     ],
     python_requires='>=3.7',
     install_requires=requirements,
+    extras_require={
+        'yaml': ['PyYAML'],
+    },
     entry_points={
         'console_scripts': [
             'yt-cli=yt_cli.main:main',
@@ -0,0 +1,132 @@
+"""
+Unit tests for the bandwidth scheduler.
+"""
+
+import unittest
+from unittest.mock import patch, MagicMock
+from yt_cli.bandwidth import BandwidthScheduler, Lease, fair_shares
+from yt_cli.downloader import _download_one, _setup_worker
+
+
+INF = float('inf')
+
+
+class TestFairShares(unittest.TestCase):
+    """Test cases for the max-min fair split."""
+    
+    def test_even_split(self):
+        """Test unlimited demands split the budget evenly."""
+        self.assertEqual(fair_shares(90, [INF, INF, INF]), [30, 30, 30])
+        
+    def test_unused_share_goes_to_the_others(self):
+        """Test a small demand is met and the rest goes to the larger ones."""
+        self.assertEqual(fair_shares(100, [INF, 10, INF]), [45, 10, 45])
+        
+    def test_spare_budget_is_spread(self):
+        """Test budget left once every demand is met is spread over all of them."""
+        self.assertEqual(fair_shares(100, [10, 30]), [40, 60])
+        self.assertEqual(fair_shares(100, []), [])
+
+
+class TestLease(unittest.TestCase):
+    """Test cases for a single download's share."""
+    
+    def test_progress_hook_counts_growth(self):
+        """Test cumulative progress is counted once and finished files add nothing."""
+        lease = Lease({})
+        for done in (100, 250, 200, 400):
+            lease.progress_hook({'status': 'downloading', 'filename': 'a.mp4', 'downloaded_bytes': done})
+        lease.progress_hook({'status': 'downloading', 'filename': 'b.mp4', 'downloaded_bytes': 50})
+        lease.progress_hook({'status': 'finished', 'filename': 'c.mp4', 'downloaded_bytes': 10 ** 9})
+        self.assertEqual(lease.bytes, 450)
+        
+    @patch('yt_cli.bandwidth.time.sleep')
+    def test_consume_throttles_to_rate(self, mock_sleep):
+        """Test a lease sleeps once it is ahead of its rate by more than a burst."""
+        lease = Lease({})
+        lease.set_rate(1000.0)
+        lease.consume(500)
+        mock_sleep.assert_not_called()
+        self.assertFalse(lease.throttled)
+        
+        for _ in range(9):
+            lease.consume(500)
+        # Sleep is mocked, so each delay covers all of the debt so far
+        self.assertAlmostEqual(mock_sleep.call_args.args[0], (5000 - 500) / 1000.0, delta=0.05)
+        self.assertTrue(lease.throttled)
+
+
+class TestBandwidthScheduler(unittest.TestCase):
+    """Test cases for sharing the budgets between downloads."""
+    
+    def setUp(self):
+        self.scheduler = BandwidthScheduler(1000.0, fragments=8, interval=3600)
+        self.addCleanup(self.scheduler.close)
+        
+    def test_shares_follow_active_downloads(self):
+        """Test shares are split on start and handed back on finish."""
+        first_params, second_params = {}, {}
+        first = self.scheduler.acquire(first_params)
+        self.assertEqual((first.rate, first_params['concurrent_fragment_downloads']), (1000.0, 8))
+        
+        second = self.scheduler.acquire(second_params)
+        self.assertEqual((first.rate, second.rate), (500.0, 500.0))
+        self.assertEqual(second_params['concurrent_fragment_downloads'], 4)
+        
+        self.scheduler.release(first)
+        self.assertEqual((second.rate, second.fragments), (1000.0, 8))
+        self.assertEqual(self.scheduler.stats()['active'], 1)
+        
+    @patch('yt_cli.bandwidth.time.sleep')
+    def test_rebalance_moves_unused_share(self, mock_sleep):
+        """Test a download that cannot use its share gives it to a throttled one."""
+        slow = self.scheduler.acquire({})
+        fast = self.scheduler.acquire({})
+        self.scheduler._tick()
+        
+        slow.consume(100)
+        fast.consume(2000)
+        self.scheduler._last_tick -= 1.0
+        self.scheduler._tick()
+        self.assertLess(slow.rate, 500.0)
+        self.assertGreater(fast.rate, 500.0)
+        self.assertAlmostEqual(slow.rate + fast.rate, 1000.0)
+        
+    def test_invalid_budgets(self):
+        """Test non-positive budgets are rejected."""
+        with self.assertRaises(ValueError):
+            BandwidthScheduler(0)
+        with self.assertRaises(ValueError):
+            BandwidthScheduler(fragments=0)
+            
+    def test_download_holds_a_lease(self):
+        """Test a batch download counts its bytes against the scheduler while it runs."""
+        scheduler = BandwidthScheduler(fragments=4, interval=3600)
+        self.addCleanup(scheduler.close)
+        opts = {}
+        state = _setup_worker(opts)
+        ydl = MagicMock(params={})
+        pool = MagicMock()
+        pool.get.return_value = (ydl, state)
+        
+        def fake_process(info, download=True):
+            self.assertEqual(scheduler.stats()['active'], 1)
+            self.assertEqual(ydl.params['concurrent_fragment_downloads'], 4)
+            for hook in opts['progress_hooks']:
+                hook({'status': 'downloading', 'filename': 'v.mp4', 'downloaded_bytes': 1234})
+                hook({'status': 'finished', 'filename': 'v.mp4', 'total_bytes': 1234})
+            return {'title': 'Video', 'requested_downloads': [{'filepath': 'v.mp4'}]}
+            
+        ydl.extract_info.return_value = {'title': 'Video'}
+        ydl.process_ie_result.side_effect = fake_process
+        result = _download_one(pool, 'https://youtu.be/dQw4w9WgXcQ', scheduler=scheduler)
+        
+        self.assertEqual((result.bytes, result.path), (1234, 'v.mp4'))
+        self.assertIsNone(state['lease'])
+        self.assertEqual(scheduler.stats()['active'], 0)
+        scheduler._tick()
+        self.assertEqual(scheduler.stats()['bytes'], 1234)
+
+
+if __name__ == '__main__':
+    unittest.main()
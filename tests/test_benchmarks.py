@@ -0,0 +1,92 @@
+"""
+Unit tests for the microbenchmark baseline checks.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from benchmarks import bench_micro
+from benchmarks.bench_micro import Case, compare, save_baseline
+
+
+def statuses(rows):
+    return {name: status for name, _, _, _, status in rows}
+
+
+class TestCompare(unittest.TestCase):
+    """Test cases for comparing timings with a baseline."""
+    
+    def test_statuses_around_threshold(self):
+        """Test only changes beyond the threshold count as faster or a regression."""
+        baseline = {'same': 1.0, 'slower': 1.0, 'regressed': 1.0, 'quicker': 1.0, 'faster': 1.0}
+        results = {'same': 1.0, 'slower': 1.25, 'regressed': 1.26, 'quicker': 0.75, 'faster': 0.74,
+                   'added': 1.0}
+        rows = compare(results, baseline, 25.0)
+        self.assertEqual(statuses(rows), {
+            'same': 'ok', 'slower': 'ok', 'regressed': 'REGRESSION', 'quicker': 'ok', 'faster': 'faster',
+            'added': 'new',
+        })
+        row = [r for r in rows if r[0] == 'regressed'][0]
+        self.assertEqual(row[1:3], (1.0, 1.26))
+        self.assertAlmostEqual(row[3], 26.0)
+        self.assertEqual([r for r in rows if r[0] == 'added'][0][1:4], (None, 1.0, None))
+        
+    def test_save_baseline_keeps_cases_not_run(self):
+        """Test saving a partial run only replaces the cases that were run."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / 'baseline.json'
+            save_baseline(path, {'a': 1.0, 'b': 2.0})
+            save_baseline(path, {'b': 3.0, 'c': 4.0}, bench_micro.load_baseline(path))
+            with open(path, encoding='utf-8') as f:
+                baseline = json.load(f)
+        self.assertEqual(baseline['results'], {'a': 1.0, 'b': 3.0, 'c': 4.0})
+        self.assertEqual(baseline['environment'], bench_micro.environment())
+
+
+class TestMain(unittest.TestCase):
+    """Test cases for the baseline check exit status."""
+    
+    CASES = [Case('url.parse', lambda: None, 1, 'url'), Case('format.duration', lambda: None, 1, 'value')]
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'baseline.json')
+        save_baseline(Path(self.path), {'url.parse': 1e-6, 'format.duration': 1e-6})
+        
+    def run_main(self, timings, *args):
+        """Run the benchmark with ``measure`` returning ``timings``; return stdout and stderr."""
+        stdout, stderr = self.stdout, self.stderr = io.StringIO(), io.StringIO()
+        argv = ['bench_micro', '--baseline', self.path] + list(args)
+        with patch.object(bench_micro, 'build_cases', return_value=self.CASES), \
+                patch.object(bench_micro, 'measure', side_effect=lambda case, repeat: timings[case.name]), \
+                patch.object(sys, 'argv', argv), patch('sys.stdout', stdout), patch('sys.stderr', stderr):
+            bench_micro.main()
+        return stdout.getvalue(), stderr.getvalue()
+        
+    def test_regression_exits_with_status_1(self):
+        """Test a case slower than the threshold fails the run and is named."""
+        with self.assertRaises(SystemExit) as ctx:
+            self.run_main({'url.parse': 1e-6, 'format.duration': 2e-6})
+        self.assertEqual(ctx.exception.code, 1)
+        self.assertIn('Regressions beyond 25%: format.duration', self.stderr.getvalue())
+        self.assertIn('+100.0%  REGRESSION', self.stdout.getvalue())
+        
+    def test_within_threshold_passes(self):
+        """Test slowdowns within --threshold and regressions outside --only do not fail the run."""
+        stdout, stderr = self.run_main({'url.parse': 2e-6, 'format.duration': 1e-6}, '--threshold', '150')
+        self.assertIn('2 case(s)', stdout)
+        self.assertEqual(stderr, '')
+        
+        stdout, _ = self.run_main({'url.parse': 1e-6, 'format.duration': 5e-6}, '--only', 'url')
+        self.assertIn('url.parse', stdout)
+        self.assertNotIn('format.duration', stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
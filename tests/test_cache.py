@@ -0,0 +1,179 @@
+"""
+Unit tests for the metadata cache and transcript store.
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from yt_cli.cache import MetadataCache, TranscriptStore
+from yt_cli.metadata import fetch_metadata
+
+
+class TestMetadataCache(unittest.TestCase):
+    """Test cases for metadata caching."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "metadata.sqlite3"
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_put_and_get(self):
+        """Test a stored entry is returned while fresh and clear resets the counters."""
+        cache = MetadataCache(self.path)
+        cache.put("dQw4w9WgXcQ", {'title': 'Test', 'duration': 212, 'view_count': 5})
+        self.assertEqual(cache.get("dQw4w9WgXcQ"),
+                         {'title': 'Test', 'duration': 212, 'view_count': 5})
+        self.assertIsNone(cache.get("aaaaaaaaaaa"))
+        self.assertEqual(cache.stats(), {'entries': 1, 'hits': 1, 'misses': 1})
+        
+        cache.clear()
+        self.assertEqual(cache.stats(), {'entries': 0, 'hits': 0, 'misses': 0})
+        
+    def test_lookups_only_read(self):
+        """Test lookups succeed while another process holds the write lock and are counted later."""
+        cache = MetadataCache(self.path)
+        cache.put("dQw4w9WgXcQ", {'title': 'Test'})
+        writer = sqlite3.connect(str(self.path), timeout=0, isolation_level=None)
+        self.addCleanup(writer.close)
+        writer.execute('BEGIN IMMEDIATE')
+        with patch('yt_cli.cache.sqlite3.connect', side_effect=AssertionError("no new connection")):
+            self.assertEqual(cache.get("dQw4w9WgXcQ"), {'title': 'Test'})
+            self.assertIsNone(cache.get("aaaaaaaaaaa"))
+        writer.execute('COMMIT')
+        cache.close()
+        self.assertEqual(MetadataCache(self.path).stats(), {'entries': 1, 'hits': 1, 'misses': 1})
+    
+    def test_volatile_fields_expire_first(self):
+        """Test stale view counts miss while static fields still hit."""
+        cache = MetadataCache(self.path, ttls={'static': 3600, 'volatile': 60})
+        cache.put("dQw4w9WgXcQ", {'title': 'Test', 'view_count': 5})
+        
+        with patch('yt_cli.cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(cache.get("dQw4w9WgXcQ"))
+            self.assertEqual(cache.get("dQw4w9WgXcQ", fields=['title']), {'title': 'Test'})
+    
+    def test_eviction_keeps_recently_used(self):
+        """Test the least recently used videos are evicted over the size bound."""
+        cache = MetadataCache(self.path, max_entries=2)
+        now = time.time()
+        for offset, video_id in enumerate(["a" * 11, "b" * 11]):
+            with patch('yt_cli.cache.time.time', return_value=now + offset):
+                cache.put(video_id, {'title': video_id})
+        with patch('yt_cli.cache.time.time', return_value=now + 2):
+            cache.get("a" * 11)
+        with patch('yt_cli.cache.time.time', return_value=now + 3):
+            cache.put("c" * 11, {'title': 'c'})
+        
+        self.assertIsNotNone(cache.get("a" * 11))
+        self.assertIsNone(cache.get("b" * 11))
+        self.assertIsNotNone(cache.get("c" * 11))
+    
+    def test_fetch_metadata_uses_cache(self):
+        """Test a cached video is not extracted again unless refreshed."""
+        cache = MetadataCache(self.path)
+        ydl = MagicMock()
+        ydl.extract_info.return_value = {'id': 'dQw4w9WgXcQ', 'title': 'Test', 'duration': 212}
+        url = "https://youtu.be/dQw4w9WgXcQ"
+        
+        first = fetch_metadata(url, ydl=ydl, cache=cache)
+        second = fetch_metadata(url, ydl=ydl, cache=cache)
+        self.assertEqual(ydl.extract_info.call_count, 1)
+        self.assertEqual(first, second)
+        
+        fetch_metadata(url, ydl=ydl, cache=cache, refresh=True)
+        self.assertEqual(ydl.extract_info.call_count, 2)
+
+
+
+class TestTranscriptStore(unittest.TestCase):
+    """Test cases for the transcript store."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = Path(self.tmp.name) / "transcripts"
+        self.segments = [{'text': 'hello world ' * 50, 'start': float(i), 'duration': 1.0}
+                         for i in range(100)]
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_round_trip_is_compressed(self):
+        """Test stored transcripts round-trip and are compressed on disk."""
+        store = TranscriptStore(self.directory)
+        self.assertIsNone(store.get("dQw4w9WgXcQ", "en"))
+        store.put("dQw4w9WgXcQ", "en", self.segments)
+        
+        self.assertEqual(store.get("dQw4w9WgXcQ", "en"), self.segments)
+        self.assertIsNone(store.get("dQw4w9WgXcQ", "de"))
+        
+        stats = store.stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses']), (1, 1, 2))
+        self.assertLess(stats['bytes'], len(str(self.segments)) / 10)
+        self.assertEqual([p.suffix for p in self.directory.glob("*.tmp")], [])
+    
+    def test_lru_eviction_within_byte_budget(self):
+        """Test the least recently used entries are evicted over budget."""
+        store = TranscriptStore(self.directory)
+        store.put("aaaaaaaaaaa", "en", self.segments)
+        entry_size = store.stats()['bytes']
+        store.max_bytes = entry_size * 2 + entry_size // 2
+        
+        store.put("bbbbbbbbbbb", "en", self.segments)
+        old = time.time() - 100
+        for path in self.directory.glob("*.json.gz"):
+            os.utime(path, (old, old))
+        store.get("aaaaaaaaaaa", "en")
+        store.put("ccccccccccc", "en", self.segments)
+        
+        self.assertIsNotNone(store.get("aaaaaaaaaaa", "en"))
+        self.assertIsNone(store.get("bbbbbbbbbbb", "en"))
+        self.assertIsNotNone(store.get("ccccccccccc", "en"))
+        self.assertLessEqual(store.stats()['bytes'], store.max_bytes)
+    
+    def test_puts_do_not_rescan_within_budget(self):
+        """Test the store is listed once while it fits its budget, and again to evict."""
+        TranscriptStore(self.directory).put("aaaaaaaaaaa", "en", self.segments)
+        store = TranscriptStore(self.directory)
+        with patch.object(TranscriptStore, '_entries', autospec=True,
+                          side_effect=TranscriptStore._entries) as mock_entries:
+            for video_id in ("bbbbbbbbbbb", "ccccccccccc", "ccccccccccc"):
+                store.put(video_id, "en", self.segments)
+            self.assertEqual(mock_entries.call_count, 1)
+            store.max_bytes = store._total + store._total // 6
+            store.put("ddddddddddd", "en", self.segments)
+            self.assertEqual(mock_entries.call_count, 2)
+        self.assertEqual(store.stats()['entries'], 3)
+        self.assertEqual(store._total, store.stats()['bytes'])
+        
+    def test_counters_share_one_connection(self):
+        """Test lookups from several threads reuse one connection and clear resets the counters."""
+        store = TranscriptStore(self.directory)
+        store.put("dQw4w9WgXcQ", "en", self.segments)
+        with patch('yt_cli.cache.sqlite3.connect', wraps=sqlite3.connect) as mock_connect:
+            threads = [threading.Thread(target=store.get, args=("dQw4w9WgXcQ", "en")) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            store.get("aaaaaaaaaaa", "en")
+            self.assertEqual(mock_connect.call_count, 1)
+        self.assertEqual((store.stats()['hits'], store.stats()['misses']), (4, 1))
+        
+        store.clear()
+        stats = store.stats()
+        self.assertEqual((stats['entries'], stats['hits'], stats['misses']), (0, 0, 0))
+        store.close()
+        store.get("dQw4w9WgXcQ", "en")
+        self.assertEqual(store.stats()['misses'], 1)
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
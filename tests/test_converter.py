@@ -2,38 +2,256 @@
 Unit tests for converter module.
 """
 
+import os
+import tempfile
 import unittest
+from dataclasses import replace
+from pathlib import Path
 from unittest.mock import patch, MagicMock
-from yt_cli.converter import check_ffmpeg
+from yt_cli.converter import (
+    build_convert_args, check_ffmpeg, compress_file, compress_folder, ffmpeg_thread_budget,
+    find_video_files, plan_conversion, predict_compression, sample_windows, ConversionError,
+    Prediction, PredictOptions
+)
+from yt_cli.ffmpeg import (
+    FFmpegCapabilities, MediaInfo, StreamInfo, probe_ffmpeg, probe_media, run_ffmpeg
+)
+
+
+FAKE_FFMPEG = FFmpegCapabilities(
+    path='/usr/bin/ffmpeg', mtime_ns=0, size=0, version='7.0',
+    encoders=frozenset(['libx264', 'aac']), muxers=frozenset(['mp4', 'matroska']),
+    progress_options=frozenset(['progress', 'stats_period']),
+)
 
 
 class TestConverter(unittest.TestCase):
     """Test cases for converter functionality."""
     
-    @patch('subprocess.run')
-    def test_check_ffmpeg_installed(self, mock_run):
+    @patch('yt_cli.converter.probe_ffmpeg')
+    def test_check_ffmpeg_installed(self, mock_probe):
         """Test FFmpeg detection when installed."""
-        mock_run.return_value = MagicMock()
+        mock_probe.return_value = FAKE_FFMPEG
         result = check_ffmpeg()
         self.assertTrue(result)
     
-    @patch('subprocess.run')
-    def test_check_ffmpeg_not_installed(self, mock_run):
+    @patch('yt_cli.converter.probe_ffmpeg')
+    def test_check_ffmpeg_not_installed(self, mock_probe):
         """Test FFmpeg detection when not installed."""
-        mock_run.side_effect = FileNotFoundError()
+        mock_probe.return_value = None
         result = check_ffmpeg()
         self.assertFalse(result)
     
-    @patch('yt_cli.converter.check_ffmpeg')
+    @patch('yt_cli.converter.probe_ffmpeg')
     @patch('yt_cli.converter.Path')
-    def test_convert_file_no_ffmpeg(self, mock_path, mock_check):
+    def test_convert_file_no_ffmpeg(self, mock_path, mock_probe):
         """Test conversion without FFmpeg installed."""
-        mock_check.return_value = False
+        mock_probe.return_value = None
         
         from yt_cli.converter import convert_file
         with self.assertRaises(SystemExit):
             convert_file("test.mp4", "mp3")
 
+    
+    @patch('yt_cli.converter.probe_streams')
+    def test_plan_remux(self, mock_probe):
+        """Test compatible streams are copied into the new container."""
+        mock_probe.return_value = [
+            StreamInfo(0, 'video', 'h264'),
+            StreamInfo(1, 'audio', 'aac'),
+            StreamInfo(2, 'video', 'mjpeg', attached_pic=True),
+        ]
+        plan = plan_conversion(Path('in.mkv'), 'mp4')
+        self.assertEqual(plan.mode, 'copy')
+        self.assertEqual([p.action for p in plan.streams], ['copy', 'copy', 'drop'])
+        self.assertEqual(
+            build_convert_args(plan, Path('in.mkv'), Path('in.mp4')),
+            ['-i', 'in.mkv', '-map', '0:0', '-c:0', 'copy',
+             '-map', '0:1', '-c:1', 'copy', '-y', 'in.mp4']
+        )
+    
+    @patch('yt_cli.converter.probe_streams')
+    def test_plan_transcodes_incompatible_streams(self, mock_probe):
+        """Test only streams the container cannot hold are re-encoded."""
+        mock_probe.return_value = [
+            StreamInfo(0, 'video', 'h264'),
+            StreamInfo(1, 'audio', 'pcm_s16le'),
+            StreamInfo(2, 'subtitle', 'hdmv_pgs_subtitle'),
+        ]
+        plan = plan_conversion(Path('in.mkv'), 'mp4')
+        self.assertEqual(plan.mode, 'audio')
+        self.assertEqual([p.action for p in plan.streams], ['copy', 'transcode', 'drop'])
+        
+        self.assertEqual(plan_conversion(Path('in.mkv'), 'webm').mode, 'full')
+        
+        mock_probe.return_value = [
+            StreamInfo(0, 'video', 'h264'),
+            StreamInfo(1, 'audio', 'aac'),
+            StreamInfo(2, 'subtitle', 'subrip'),
+        ]
+        plan = plan_conversion(Path('in.mkv'), 'mp4')
+        self.assertEqual(plan.mode, 'subtitles')
+        self.assertEqual([p.action for p in plan.streams], ['copy', 'copy', 'transcode'])
+    
+    @patch('yt_cli.converter.probe_streams')
+    def test_plan_unknown_streams(self, mock_probe):
+        """Test FFmpeg's own stream selection is used when probing fails."""
+        mock_probe.return_value = None
+        plan = plan_conversion(Path('in.mkv'), 'mp4')
+        self.assertEqual(plan.mode, 'full')
+        self.assertEqual(build_convert_args(plan, Path('in.mkv'), Path('in.mp4')),
+                         ['-i', 'in.mkv', '-y', 'in.mp4'])
+    
+    @patch('yt_cli.converter.os.cpu_count')
+    def test_ffmpeg_thread_budget(self, mock_cpu_count):
+        """Test CPU cores are split between concurrent jobs."""
+        mock_cpu_count.return_value = 32
+        self.assertEqual(ffmpeg_thread_budget(1), 32)
+        self.assertEqual(ffmpeg_thread_budget(4), 8)
+        self.assertEqual(ffmpeg_thread_budget(64), 1)
+    
+    def test_find_video_files_skips_compressed(self):
+        """Test previously compressed outputs are not picked up again."""
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["a.mp4", "a_compressed.mp4", "b.mkv", "notes.txt"]:
+                (Path(tmp) / name).write_bytes(b"x")
+            names = [f.name for f in find_video_files(Path(tmp))]
+            self.assertEqual(names, ["a.mp4", "b.mkv"])
+    
+    @patch('yt_cli.converter.probe_ffmpeg')
+    @patch('yt_cli.converter._compress')
+    def test_compress_folder_without_encoder(self, mock_compress, mock_probe):
+        """Test a missing encoder fails before any file is touched."""
+        mock_probe.return_value = replace(FAKE_FFMPEG, encoders=frozenset())
+        with tempfile.TemporaryDirectory() as tmp:
+            (Path(tmp) / "a.mp4").write_bytes(b"xx")
+            with self.assertRaises(SystemExit):
+                compress_folder(tmp, "medium")
+        mock_compress.assert_not_called()
+    
+    @patch('yt_cli.converter.probe_ffmpeg')
+    @patch('yt_cli.converter._compress')
+    def test_compress_folder_isolates_failures(self, mock_compress, mock_probe):
+        """Test one failing file does not stop the rest of the batch."""
+        mock_probe.return_value = FAKE_FFMPEG
+        
+        def fake_compress(input_path, output_file, quality, threads=None, **kwargs):
+            if input_path.name == "bad.mp4":
+                raise ConversionError("Invalid data found when processing input")
+            output_file.write_bytes(b"y")
+        
+        mock_compress.side_effect = fake_compress
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["bad.mp4", "good1.mp4", "good2.mp4"]:
+                (Path(tmp) / name).write_bytes(b"xx")
+            with self.assertRaises(SystemExit):
+                compress_folder(tmp, "medium", jobs=2)
+            self.assertEqual(mock_compress.call_count, 3)
+            self.assertTrue((Path(tmp) / "good1_compressed.mp4").exists())
+            self.assertTrue((Path(tmp) / "good2_compressed.mp4").exists())
+            
+            # A rerun only retries the file that failed
+            mock_compress.reset_mock()
+            with self.assertRaises(SystemExit):
+                compress_folder(tmp, "medium", jobs=2)
+            self.assertEqual(mock_compress.call_count, 1)
+            self.assertEqual(mock_compress.call_args[0][0].name, "bad.mp4")
+            self.assertFalse(list(Path(tmp).glob(".*partial*")))
+
+
+    
+    def test_sample_windows(self):
+        """Test samples are spread through long files and cover short ones."""
+        self.assertEqual(sample_windows(10.0), [(0.0, 10.0)])
+        windows = sample_windows(4000.0)
+        self.assertEqual(len(windows), 3)
+        self.assertEqual(windows[1], (1997.0, 6.0))
+    
+    @patch('yt_cli.converter._predict_size')
+    @patch('yt_cli.converter.probe_media')
+    def test_predict_picks_fastest_setting_meeting_goal(self, mock_probe, mock_predict):
+        """Test the fastest preset, then lowest CRF, predicted to fit the budget wins."""
+        mock_probe.return_value = MediaInfo([], duration=100.0)
+        sizes = {('23', 'veryfast'): 900, ('26', 'veryfast'): 700, ('29', 'veryfast'): 600,
+                 ('23', 'faster'): 550, ('26', 'faster'): 450}
+        mock_predict.side_effect = lambda path, duration, tmp, crf, preset, threads: sizes[(crf, preset)]
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            source = Path(tmp) / "a.mp4"
+            source.write_bytes(b"x" * 1000)
+            prediction = predict_compression(source, "medium", PredictOptions(target_size=500))
+            self.assertEqual((prediction.preset, prediction.crf, prediction.size), ('faster', '26', 450))
+            self.assertTrue(prediction.on_target)
+            self.assertAlmostEqual(prediction.reduction, 55.0)
+            
+            # 4000 bits/s over 100 s is a 50000 byte budget: the first candidate fits
+            prediction = predict_compression(source, "medium", PredictOptions(max_bitrate=4000))
+            self.assertEqual((prediction.preset, prediction.crf), ('veryfast', '23'))
+    
+    @patch('yt_cli.converter.probe_ffmpeg')
+    @patch('yt_cli.converter.predict_compression')
+    @patch('yt_cli.converter._compress')
+    def test_compress_folder_skips_unprofitable_files(self, mock_compress, mock_predict, mock_probe):
+        """Test files predicted to barely shrink are skipped, also on reruns."""
+        mock_probe.return_value = FAKE_FFMPEG
+        mock_predict.side_effect = lambda path, quality, options, threads: Prediction(
+            crf='23', preset='medium', original_size=100,
+            size=95 if path.name == "encoded.mp4" else 40)
+        mock_compress.side_effect = lambda i, o, *args, **kwargs: o.write_bytes(b"y" * 40)
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["encoded.mp4", "raw.mp4"]:
+                (Path(tmp) / name).write_bytes(b"x" * 100)
+            compress_folder(tmp, "medium", predict=PredictOptions(min_gain=10))
+            self.assertEqual(mock_compress.call_count, 1)
+            self.assertEqual(mock_compress.call_args[1], {'crf': '23', 'preset': 'medium'})
+            self.assertFalse((Path(tmp) / "encoded_compressed.mp4").exists())
+            
+            mock_predict.reset_mock()
+            compress_folder(tmp, "medium", predict=PredictOptions(min_gain=10))
+            mock_predict.assert_not_called()
+
+
+def _has_libx264():
+    with tempfile.TemporaryDirectory() as tmp:
+        with patch.dict(os.environ, {'YT_CLI_CACHE_DIR': tmp}):
+            caps = probe_ffmpeg()
+    return caps is not None and caps.has_encoder('libx264')
+
+
+@unittest.skipUnless(_has_libx264(), "requires FFmpeg with libx264")
+class TestChunkedCompression(unittest.TestCase):
+    """End-to-end test of chunked compression on a generated video."""
+    
+    def count_frames(self, path):
+        events = []
+        run_ffmpeg(['-i', str(path), '-map', '0:v:0', '-f', 'null', '-'], events.append)
+        return events[-1].frame
+    
+    @patch('yt_cli.converter.MIN_CHUNK_SECONDS', 1.0)
+    def test_chunked_output_matches_input(self):
+        """Test chunks are joined without losing frames or audio."""
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch.dict(os.environ, {'YT_CLI_CACHE_DIR': tmp}):
+            source = Path(tmp) / "source.mp4"
+            run_ffmpeg([
+                '-f', 'lavfi', '-i', 'testsrc=duration=10:size=320x240:rate=25',
+                '-f', 'lavfi', '-i', 'sine=duration=10',
+                '-c:v', 'libx264', '-g', '25', '-preset', 'ultrafast', '-c:a', 'aac',
+                '-y', str(source),
+            ])
+            
+            compress_file(str(source), "low", progress_callback=None, chunked=True, jobs=2)
+            
+            output = Path(tmp) / "source_compressed.mp4"
+            before, after = probe_media(str(source)), probe_media(str(output))
+            self.assertAlmostEqual(after.duration, before.duration, delta=0.05)
+            self.assertEqual([s.codec_type for s in after.streams], ['video', 'audio'])
+            self.assertEqual(self.count_frames(output), self.count_frames(source))
+            self.assertEqual(self.count_frames(output), 250)
+            self.assertFalse([p for p in Path(tmp).iterdir() if p.name.startswith('.source_chunks')])
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,195 @@
+"""
+Unit tests for the job daemon.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from yt_cli.daemon import (
+    DaemonError, DaemonServer, JobQueue, Workers, submit_job, wait_for_job, DAEMON_ENV
+)
+from yt_cli.main import main
+
+
+def wait_all(queue, jobs):
+    for job in jobs:
+        job.done.wait(5)
+    return [queue.get(job.id) for job in jobs]
+
+
+class TestJobQueue(unittest.TestCase):
+    """Test cases for the per-type job queue."""
+    
+    def test_results_and_errors(self):
+        """Test job results are kept and handler exceptions become job errors."""
+        def fail(args):
+            raise ValueError("Invalid YouTube URL")
+            
+        queue = JobQueue({'echo': lambda args: args['value'], 'fail': fail})
+        self.addCleanup(queue.shutdown)
+        done, failed = wait_all(queue, [queue.submit('echo', {'value': 42}), queue.submit('fail', {})])
+        
+        self.assertEqual((done.status, done.result), ('done', 42))
+        self.assertEqual((failed.status, failed.error), ('failed', "Invalid YouTube URL"))
+        with self.assertRaises(ValueError):
+            queue.submit('missing', {})
+            
+    def test_per_type_limits(self):
+        """Test each job type runs at most its limit of jobs at once."""
+        lock = threading.Lock()
+        running = {'slow': 0, 'fast': 0}
+        peak = {'slow': 0, 'fast': 0}
+        
+        def handler(job_type):
+            def run(args):
+                with lock:
+                    running[job_type] += 1
+                    peak[job_type] = max(peak[job_type], running[job_type])
+                time.sleep(0.05)
+                with lock:
+                    running[job_type] -= 1
+            return run
+            
+        queue = JobQueue({'slow': handler('slow'), 'fast': handler('fast')}, {'slow': 1, 'fast': 3})
+        self.addCleanup(queue.shutdown)
+        wait_all(queue, [queue.submit(t, {}) for t in ['slow', 'fast'] * 6])
+        self.assertEqual(peak, {'slow': 1, 'fast': 3})
+        
+    def test_finished_jobs_are_bounded(self):
+        """Test the oldest finished jobs are forgotten beyond the limit."""
+        queue = JobQueue({'echo': lambda args: None}, max_finished=2)
+        self.addCleanup(queue.shutdown)
+        jobs = []
+        for _ in range(5):
+            jobs.append(queue.submit('echo', {}))
+            jobs[-1].done.wait(5)
+            
+        queue.submit('echo', {}).done.wait(5)
+        self.assertIsNone(queue.get(jobs[0].id))
+        self.assertIsNotNone(queue.get(jobs[-1].id))
+        self.assertLessEqual(len(queue.jobs()), 3)
+        
+    def test_shutdown_without_wait_cancels_queued_jobs(self):
+        """Test queued jobs fail instead of starting once the queue stops without waiting."""
+        release = threading.Event()
+        queue = JobQueue({'block': lambda args: release.wait(5)})
+        running = queue.submit('block', {})
+        queued = queue.submit('block', {})
+        while running.status != 'running':
+            time.sleep(0.01)
+        queue.shutdown(wait=False)
+        release.set()
+        running, queued = wait_all(queue, [running, queued])
+        self.assertEqual(running.status, 'done')
+        self.assertEqual(queued.status, 'failed')
+        self.assertIsNone(queued.started)
+
+
+class TestDaemonServer(unittest.TestCase):
+    """Test cases for the HTTP API and its client."""
+    
+    def setUp(self):
+        self.release = threading.Event()
+        self.queue = JobQueue({'echo': self.echo})
+        self.server = DaemonServer(('127.0.0.1', 0), self.queue)
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        env = patch.dict(os.environ, {DAEMON_ENV: self.server.url})
+        env.start()
+        self.addCleanup(env.stop)
+        
+    def tearDown(self):
+        self.release.set()
+        self.server.shutdown()
+        self.server.server_close()
+        self.queue.shutdown()
+        
+    def echo(self, args):
+        self.release.wait(5)
+        return {'echo': args}
+        
+    def test_submit_and_wait(self):
+        """Test a job submitted over HTTP is long-polled until it finishes."""
+        job = submit_job('echo', {'url': 'x'})
+        self.assertIn(job['status'], ('queued', 'running'))
+        
+        threading.Timer(0.1, self.release.set).start()
+        finished = wait_for_job(job['id'], poll=5)
+        self.assertEqual(finished['status'], 'done')
+        self.assertEqual(finished['result'], {'echo': {'url': 'x'}})
+        
+    def test_rejected_requests(self):
+        """Test unknown job types and job IDs are reported as client errors."""
+        with self.assertRaisesRegex(DaemonError, "Unknown job type"):
+            submit_job('missing', {})
+        with self.assertRaisesRegex(DaemonError, "Unknown job"):
+            wait_for_job('0123456789ab')
+            
+    def test_unreachable_daemon(self):
+        """Test a daemon that is not running gives a clear error."""
+        self.server.shutdown()
+        self.server.server_close()
+        with self.assertRaisesRegex(DaemonError, "Cannot reach the daemon"):
+            submit_job('echo', {})
+
+
+class TestWorkers(unittest.TestCase):
+    """Test cases for the daemon's job handlers."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        env = patch.dict(os.environ, {'YT_CLI_CACHE_DIR': self.tmp.name})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(self.tmp.cleanup)
+        
+    @patch('yt_cli.transcript.TranscriptListFetcher')
+    def test_transcript_shares_store_and_session(self, mock_fetcher):
+        """Test transcript jobs summarize, reuse the transcript store and share one session."""
+        transcript = mock_fetcher.return_value.fetch.return_value.find_transcript.return_value
+        transcript.fetch.return_value = [{'text': 'Hello world. ' * 50, 'start': 0.0}]
+        workers = Workers()
+        self.addCleanup(workers.close)
+        args = {'url': 'https://youtu.be/dQw4w9WgXcQ', 'summary': 'short'}
+        
+        first = workers.transcript(args)
+        second = workers.transcript(args)
+        self.assertEqual((first['source'], second['source']), ('api', 'cache'))
+        self.assertEqual(first['video_id'], 'dQw4w9WgXcQ')
+        self.assertLessEqual(first['summary_words'], 100)
+        self.assertEqual(transcript.fetch.call_count, 1)
+        
+        workers.transcript({'url': 'https://youtu.be/AAAAAAAAAAA', 'no_cache': True})
+        sessions = {call.args[0] for call in mock_fetcher.call_args_list}
+        self.assertEqual(len(sessions), 1)
+        
+        with self.assertRaisesRegex(ValueError, "Invalid YouTube URL"):
+            workers.transcript({'url': 'not a url'})
+
+class TestViaDaemon(unittest.TestCase):
+    """Test cases for forwarding CLI commands to the daemon."""
+    
+    @patch('yt_cli.daemon.run_via_daemon')
+    def test_compress_rejects_local_only_options(self, mock_run):
+        """Test compress options the daemon cannot run are rejected before submitting."""
+        with tempfile.TemporaryDirectory() as tmp:
+            video = os.path.join(tmp, 'in.mp4')
+            open(video, 'wb').close()
+            for extra in ([tmp], [video, '--chunked'], [video, '--jobs', '2'], [video, '--force'],
+                          [video, '--state-dir', tmp]):
+                with self.subTest(extra=extra):
+                    argv = ['yt-cli', 'compress'] + extra + ['--via-daemon']
+                    with patch.object(sys, 'argv', argv), patch('sys.stderr', io.StringIO()), \
+                            self.assertRaises(SystemExit) as ctx:
+                        main()
+                    self.assertEqual(ctx.exception.code, 2)
+        mock_run.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,9 +2,13 @@
 Unit tests for downloader module.
 """
 
+import io
+import os
+import sys
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
-from yt_cli.downloader import download_progress_hook
+from yt_cli.downloader import download_progress_hook, download_batch
 
 
 class TestDownloader(unittest.TestCase):
@@ -38,6 +42,97 @@ class TestDownloader(unittest.TestCase):
         with self.assertRaises(SystemExit):
             download_video("invalid_url")
 
+    
+    @patch('yt_cli.downloader.yt_dlp.YoutubeDL')
+    def test_download_video_extracts_once(self, mock_ydl_class):
+        """Test the info printout and the download share one extraction."""
+        ydl = mock_ydl_class.return_value.__enter__.return_value
+        info = {'_type': 'video', 'id': 'dQw4w9WgXcQ', 'title': 'Test', 'duration': 212}
+        ydl.extract_info.return_value = info
+        ydl.process_ie_result.return_value = info
+        
+        from yt_cli.downloader import download_video
+        with tempfile.TemporaryDirectory() as tmp:
+            download_video("https://youtu.be/dQw4w9WgXcQ", output_path=tmp, use_cache=False)
+        
+        ydl.extract_info.assert_called_once_with(
+            "https://youtu.be/dQw4w9WgXcQ", download=False, process=False
+        )
+        ydl.process_ie_result.assert_called_once_with(info, download=True)
+        ydl.download.assert_not_called()
+    
+    @patch('yt_cli.downloader.yt_dlp.YoutubeDL')
+    def test_download_video_keeps_ytdlp_fragment_default(self, mock_ydl_class):
+        """Test a download without --fragments or --limit-rate leaves the fragment count to yt-dlp."""
+        ydl = mock_ydl_class.return_value.__enter__.return_value
+        info = {'_type': 'video', 'id': 'dQw4w9WgXcQ', 'title': 'Test', 'duration': 212}
+        ydl.extract_info.return_value = info
+        ydl.process_ie_result.return_value = info
+        
+        from yt_cli.downloader import download_video
+        with tempfile.TemporaryDirectory() as tmp, patch('sys.stdout', io.StringIO()):
+            ydl.params = {}
+            download_video("https://youtu.be/dQw4w9WgXcQ", output_path=tmp, use_cache=False)
+            self.assertNotIn('concurrent_fragment_downloads', ydl.params)
+            
+            download_video("https://youtu.be/dQw4w9WgXcQ", output_path=tmp, use_cache=False,
+                           fragments=4)
+            self.assertEqual(ydl.params['concurrent_fragment_downloads'], 4)
+    
+    @patch('yt_cli.downloader.yt_dlp.YoutubeDL')
+    def test_download_video_fills_metadata_cache(self, mock_ydl_class):
+        """Test a download caches the video's metadata unless --no-cache is given."""
+        ydl = mock_ydl_class.return_value.__enter__.return_value
+        info = {'_type': 'video', 'id': 'dQw4w9WgXcQ', 'title': 'Test', 'duration': 212}
+        ydl.extract_info.return_value = info
+        ydl.process_ie_result.return_value = info
+        
+        from yt_cli.cache import MetadataCache
+        from yt_cli.main import main
+        with tempfile.TemporaryDirectory() as tmp, patch.dict(os.environ, {'YT_CLI_CACHE_DIR': tmp}):
+            argv = ['yt-cli', 'download', 'https://youtu.be/dQw4w9WgXcQ', '--output', tmp]
+            with patch.object(sys, 'argv', argv + ['--no-cache']), patch('sys.stdout', io.StringIO()):
+                main()
+            cache = MetadataCache()
+            self.assertIsNone(cache.get('dQw4w9WgXcQ'))
+            
+            with patch.object(sys, 'argv', argv), patch('sys.stdout', io.StringIO()):
+                main()
+            self.assertEqual(cache.get('dQw4w9WgXcQ')['title'], 'Test')
+            cache.close()
+    
+    @patch('yt_cli.downloader.yt_dlp.YoutubeDL')
+    def test_download_batch_reuses_instance_and_isolates_errors(self, mock_ydl_class):
+        """Test batch workers reuse YoutubeDL and survive a failing URL."""
+        ydl = mock_ydl_class.return_value
+        
+        def fake_extract(url, download=True, process=True):
+            if url.endswith("BBBBBBBBBBB"):
+                raise Exception("Video unavailable")
+            return {'id': url[-11:], 'title': url[-11:]}
+        
+        ydl.extract_info.side_effect = fake_extract
+        ydl.process_ie_result.side_effect = lambda info, download=True: info
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            url_file = os.path.join(tmp, "urls.txt")
+            with open(url_file, "w") as f:
+                f.write("https://youtu.be/AAAAAAAAAAA\n")
+                f.write("# comment\n\n")
+                f.write("https://youtu.be/BBBBBBBBBBB\n")
+                f.write("not a url\n")
+                f.write("https://youtu.be/CCCCCCCCCCC\n")
+            
+            results = download_batch(url_file, output_path=tmp, jobs=1, use_cache=False)
+        
+        self.assertEqual(mock_ydl_class.call_count, 1)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(sum(1 for r in results if r.ok), 2)
+        failed = {r.url: r.error for r in results if not r.ok}
+        self.assertEqual(failed["not a url"], "Invalid YouTube URL")
+        self.assertIn("Video unavailable", failed["https://youtu.be/BBBBBBBBBBB"])
+        ydl.close.assert_called_once()
+
 
 if __name__ == '__main__':
     unittest.main()
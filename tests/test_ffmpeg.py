@@ -0,0 +1,196 @@
+"""
+Unit tests for the FFmpeg capability probe.
+"""
+
+import io
+import os
+import subprocess
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch, MagicMock
+from yt_cli import ffmpeg
+from yt_cli.ffmpeg import (
+    parse_encoders, parse_ffmpeg_streams, parse_ffprobe_streams, parse_muxers,
+    parse_progress_options, probe_ffmpeg, run_ffmpeg, FFmpegError, StreamInfo,
+    STDERR_TAIL_LINES
+)
+
+
+ENCODERS = """Encoders:
+ V..... = Video
+ A..... = Audio
+ ------
+ V....D libx264              libx264 H.264 / AVC / MPEG-4 AVC (codec h264)
+ A....D aac                  AAC (Advanced Audio Coding)
+"""
+
+MUXERS = """Formats:
+ D.. = Demuxing supported
+ .E. = Muxing supported
+ ---
+ D   aac             raw ADTS AAC (Advanced Audio Coding)
+  E  matroska        Matroska
+ DE  mp4             MP4 (MPEG-4 Part 14)
+  Ed video4linux2,v4l2 Video4Linux2 output device
+"""
+
+HELP = """-stats              print progress report during encoding
+-progress <url>     write program-readable progress information
+-stats_period <time>  set the period at which ffmpeg updates stats and -progress output
+-vstats             dump video coding statistics to file
+"""
+
+
+def fake_ffmpeg(cmd, **kwargs):
+    output = {
+        '-version': "ffmpeg version 7.0.2 Copyright (c) 2000-2024 the FFmpeg developers\n",
+        '-encoders': ENCODERS,
+        '-muxers': MUXERS,
+        '-h': HELP,
+    }[cmd[2]]
+    return MagicMock(stdout=output)
+
+
+class TestFFmpegProbe(unittest.TestCase):
+    """Test cases for the FFmpeg capability probe."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.binary = Path(self.tmp.name) / 'ffmpeg'
+        self.binary.write_bytes(b'binary')
+        env = patch.dict(os.environ, {'YT_CLI_CACHE_DIR': str(Path(self.tmp.name) / 'cache')})
+        env.start()
+        self.addCleanup(env.stop)
+        which = patch('yt_cli.ffmpeg.shutil.which', return_value=str(self.binary))
+        which.start()
+        self.addCleanup(which.stop)
+        ffmpeg._memo.clear()
+        self.addCleanup(ffmpeg._memo.clear)
+        
+    def tearDown(self):
+        self.tmp.cleanup()
+        
+    def test_parse_listings(self):
+        """Test encoders, muxers and progress options are parsed."""
+        self.assertEqual(parse_encoders(ENCODERS), {'libx264', 'aac'})
+        self.assertEqual(parse_muxers(MUXERS), {'matroska', 'mp4', 'video4linux2', 'v4l2'})
+        self.assertEqual(parse_progress_options(HELP), {'stats', 'progress', 'stats_period'})
+        
+    def test_parse_streams(self):
+        """Test streams are read from both ffprobe and ffmpeg output."""
+        expected = [
+            StreamInfo(0, 'video', 'h264'),
+            StreamInfo(1, 'audio', 'aac'),
+            StreamInfo(2, 'video', 'mjpeg', attached_pic=True),
+        ]
+        ffmpeg_output = (
+            "Input #0, matroska,webm, from 'in.mkv':\n"
+            "  Stream #0:0: Video: h264 (High), yuv420p(progressive), 1920x1080, 25 fps\n"
+            "  Stream #0:1(eng): Audio: aac (LC), 48000 Hz, stereo, fltp (default)\n"
+            "  Stream #0:2: Video: mjpeg (Baseline), yuvj420p, 600x600 (attached pic)\n"
+        )
+        ffprobe_output = """{"streams": [
+            {"index": 0, "codec_name": "h264", "codec_type": "video", "disposition": {"attached_pic": 0}},
+            {"index": 1, "codec_name": "aac", "codec_type": "audio", "disposition": {"attached_pic": 0}},
+            {"index": 2, "codec_name": "mjpeg", "codec_type": "video", "disposition": {"attached_pic": 1}}
+        ]}"""
+        self.assertEqual(parse_ffmpeg_streams(ffmpeg_output), expected)
+        self.assertEqual(parse_ffprobe_streams(ffprobe_output), expected)
+    
+    @patch('yt_cli.ffmpeg.subprocess.run')
+    def test_probe_runs_once_and_persists(self, mock_run):
+        """Test FFmpeg is only run for the first probe, even across processes."""
+        mock_run.side_effect = fake_ffmpeg
+        caps = probe_ffmpeg()
+        self.assertEqual(caps.version, '7.0.2')
+        self.assertTrue(caps.has_encoder('libx264'))
+        self.assertTrue(caps.supports_option('progress'))
+        calls = mock_run.call_count
+        
+        self.assertEqual(probe_ffmpeg(), caps)
+        ffmpeg._memo.clear()
+        self.assertEqual(probe_ffmpeg(), caps)
+        self.assertEqual(mock_run.call_count, calls)
+        
+    @patch('yt_cli.ffmpeg.subprocess.run')
+    def test_probe_invalidated_by_new_binary(self, mock_run):
+        """Test replacing the FFmpeg binary triggers a new probe."""
+        mock_run.side_effect = fake_ffmpeg
+        probe_ffmpeg()
+        calls = mock_run.call_count
+        
+        self.binary.write_bytes(b'upgraded binary')
+        probe_ffmpeg()
+        self.assertEqual(mock_run.call_count, 2 * calls)
+        
+    @patch('yt_cli.ffmpeg.subprocess.run')
+    def test_probe_missing_ffmpeg(self, mock_run):
+        """Test the probe reports a missing or broken FFmpeg as None."""
+        with patch('yt_cli.ffmpeg.shutil.which', return_value=None):
+            self.assertIsNone(probe_ffmpeg())
+        mock_run.assert_not_called()
+        
+        mock_run.side_effect = subprocess.CalledProcessError(1, 'ffmpeg')
+        self.assertIsNone(probe_ffmpeg())
+
+
+
+PROGRESS = b"""frame=50
+fps=25.00
+out_time_us=2000000
+total_size=1024
+speed=2.0x
+progress=continue
+frame=100
+fps=25.00
+out_time_us=4000000
+total_size=2048
+speed=2.0x
+progress=end
+"""
+
+
+def fake_popen(stdout, stderr, returncode):
+    def popen(cmd, **kwargs):
+        proc = MagicMock()
+        proc.stdout = io.BytesIO(stdout)
+        proc.stderr = io.BytesIO(stderr)
+        proc.wait.return_value = returncode
+        return proc
+    return popen
+
+
+@patch('yt_cli.ffmpeg.probe_ffmpeg', return_value=None)
+class TestRunFFmpeg(unittest.TestCase):
+    """Test cases for running FFmpeg with streamed progress."""
+    
+    @patch('yt_cli.ffmpeg.subprocess.Popen')
+    def test_progress_events(self, mock_popen, mock_probe):
+        """Test progress blocks are parsed into events with an ETA."""
+        stderr = b"Input #0, matroska,webm, from 'in.mkv':\n  Duration: 00:00:10.00, start: 0.000000\n"
+        mock_popen.side_effect = fake_popen(PROGRESS, stderr, 0)
+        events = []
+        run_ffmpeg(['-i', 'in.mkv', 'out.mp4'], events.append)
+        
+        self.assertIn('-progress', mock_popen.call_args[0][0])
+        self.assertEqual(len(events), 2)
+        self.assertEqual(events[0].out_time, 2.0)
+        self.assertEqual(events[0].percent, 20.0)
+        self.assertEqual(events[0].eta, 4.0)
+        self.assertTrue(events[1].done)
+        
+    @patch('yt_cli.ffmpeg.subprocess.Popen')
+    def test_error_keeps_bounded_tail(self, mock_popen, mock_probe):
+        """Test a failure reports only the last stderr lines."""
+        stderr = b''.join(b"line %d\n" % i for i in range(10000))
+        mock_popen.side_effect = fake_popen(b'', stderr, 1)
+        with self.assertRaises(FFmpegError) as ctx:
+            run_ffmpeg(['-i', 'in.mkv', 'out.mp4'])
+        self.assertEqual(len(ctx.exception.stderr_tail), STDERR_TAIL_LINES)
+        self.assertEqual(ctx.exception.stderr_tail[-1], 'line 9999')
+        self.assertIn('-nostats', mock_popen.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
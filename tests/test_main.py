@@ -0,0 +1,59 @@
+"""
+Unit tests for the CLI entry point.
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+
+HEAVY_MODULES = ('yt_dlp', 'youtube_transcript_api')
+
+PACKAGE_ROOT = str(Path(__file__).resolve().parent.parent)
+
+
+def imported_modules(*cli_args):
+    """Run ``yt-cli`` with ``-X importtime`` and return the modules it imported."""
+    code = "import sys; from yt_cli.main import main; sys.argv = ['yt-cli'] + sys.argv[1:]; main()"
+    env = dict(os.environ, PYTHONPATH=PACKAGE_ROOT)
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code] + list(cli_args),
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, env=env
+    )
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            modules.add(line.rsplit('|', 1)[1].strip())
+    return modules
+
+
+class TestMain(unittest.TestCase):
+    """Test cases for CLI startup cost."""
+    
+    def assertNoHeavyImports(self, modules):
+        heavy = sorted(m for m in modules if m.split('.')[0] in HEAVY_MODULES)
+        self.assertEqual(heavy, [], "unexpected imports: " + ", ".join(heavy))
+    
+    def test_version_skips_heavy_imports(self):
+        """Test --version does not import downloader dependencies."""
+        modules = imported_modules('--version')
+        self.assertIn('yt_cli.main', modules)
+        self.assertNoHeavyImports(modules)
+    
+    def test_convert_skips_heavy_imports(self):
+        """Test convert does not import yt_dlp or the transcript API."""
+        modules = imported_modules('convert', 'missing-input.mp4', '--to', 'mp3')
+        self.assertIn('yt_cli.converter', modules)
+        self.assertNoHeavyImports(modules)
+    
+    def test_compress_skips_heavy_imports(self):
+        """Test compress does not import yt_dlp or the transcript API."""
+        modules = imported_modules('compress', 'missing-input.mp4')
+        self.assertIn('yt_cli.converter', modules)
+        self.assertNoHeavyImports(modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Unit tests for the compression work manifest.
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from yt_cli.manifest import CompressManifest, MANIFEST_NAME, fingerprint
+
+
+SETTINGS = {'encoder': 'libx264', 'crf': '23', 'preset': 'medium'}
+
+
+class TestCompressManifest(unittest.TestCase):
+    """Test cases for the compression work manifest."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.folder = Path(self.tmp.name)
+        self.input = self.folder / 'a.mp4'
+        self.input.write_bytes(b'input video')
+        self.output = self.folder / 'a_compressed.mp4'
+        self.output.write_bytes(b'output')
+        
+    def tearDown(self):
+        self.tmp.cleanup()
+        
+    def record(self, manifest):
+        st = self.input.stat()
+        manifest.record(self.input, self.output, SETTINGS,
+                        st.st_size, st.st_mtime_ns, fingerprint(self.input))
+                        
+    def reload(self, state_dir=None):
+        manifest = CompressManifest(self.folder, state_dir)
+        manifest.load()
+        return manifest
+        
+    def test_finished_input_is_skipped(self):
+        """Test an unchanged input with an intact output is done."""
+        self.record(self.reload())
+        manifest = self.reload()
+        self.assertTrue(manifest.is_done(self.input, SETTINGS))
+        self.assertEqual(manifest.outputs(), {'a_compressed.mp4'})
+        self.assertFalse(manifest.is_done(self.input, dict(SETTINGS, crf='18')))
+        
+    def test_touched_input_is_still_done(self):
+        """Test a new mtime alone does not trigger recompression."""
+        self.record(self.reload())
+        os.utime(self.input, ns=(0, 0))
+        self.assertTrue(self.reload().is_done(self.input, SETTINGS))
+        
+        self.input.write_bytes(b'other video')
+        os.utime(self.input, ns=(0, 0))
+        self.assertFalse(self.reload().is_done(self.input, SETTINGS))
+        
+    def test_truncated_output_is_redone(self):
+        """Test an output whose size changed is not trusted."""
+        self.record(self.reload())
+        self.output.write_bytes(b'out')
+        self.assertFalse(self.reload().is_done(self.input, SETTINGS))
+        self.output.unlink()
+        self.assertFalse(self.reload().is_done(self.input, SETTINGS))
+        
+    def test_torn_line_and_compaction(self):
+        """Test a partially written line is ignored and compaction keeps one line per input."""
+        manifest = self.reload()
+        self.record(manifest)
+        self.record(manifest)
+        with open(manifest.path, 'a') as f:
+            f.write('{"input": "b.mp4", "si')
+        manifest = self.reload()
+        self.assertEqual(list(manifest.entries), ['a.mp4'])
+        manifest.compact()
+        self.assertEqual(len(manifest.path.read_text().splitlines()), 1)
+        
+    def test_state_dir(self):
+        """Test the manifest can be kept outside the folder."""
+        with tempfile.TemporaryDirectory() as state_dir:
+            self.record(self.reload(Path(state_dir)))
+            self.assertFalse((self.folder / MANIFEST_NAME).exists())
+            self.assertTrue(self.reload(Path(state_dir)).is_done(self.input, SETTINGS))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Unit tests for metadata module.
+"""
+
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock
+from yt_cli.metadata import (
+    build_metadata, extract_metadata_batch, choose_strategy, parse_fields,
+    fetch_metadata_with_strategy
+)
+
+
+def fake_info(url, download=False, **kwargs):
+    """Return a minimal yt-dlp info dict for a youtu.be URL."""
+    video_id = url[-11:]
+    if video_id == "BBBBBBBBBBB":
+        raise Exception("Video unavailable")
+    return {
+        'id': video_id,
+        'title': f"Video {video_id}",
+        'duration': 61,
+        'view_count': 10,
+        'tags': ['a', 'b'],
+    }
+
+
+class TestMetadata(unittest.TestCase):
+    """Test cases for metadata functionality."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.url_file = os.path.join(self.tmp.name, "urls.txt")
+        with open(self.url_file, "w") as f:
+            for video_id in ["AAAAAAAAAAA", "BBBBBBBBBBB", "CCCCCCCCCCC"]:
+                f.write(f"https://youtu.be/{video_id}\n")
+    
+    def tearDown(self):
+        self.tmp.cleanup()
+    
+    def test_build_metadata(self):
+        """Test record building from an info dict."""
+        metadata = build_metadata(fake_info("https://youtu.be/AAAAAAAAAAA"),
+                                  "https://youtu.be/AAAAAAAAAAA")
+        self.assertEqual(metadata['video_id'], "AAAAAAAAAAA")
+        self.assertEqual(metadata['duration_formatted'], "01:01")
+        self.assertEqual(metadata['like_count'], 0)
+    
+    @patch('yt_cli.metadata.yt_dlp.YoutubeDL')
+    def test_batch_ndjson_streams_records_and_errors(self, mock_ydl_class):
+        """Test batch mode writes one NDJSON line per record and per failure."""
+        mock_ydl_class.return_value.extract_info.side_effect = fake_info
+        output, errors = io.StringIO(), io.StringIO()
+        
+        succeeded, failed = extract_metadata_batch(self.url_file, output, errors,
+                                                   jobs=2, use_cache=False)
+        
+        self.assertEqual((succeeded, failed), (2, 1))
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(sorted(r['video_id'] for r in records), ["AAAAAAAAAAA", "CCCCCCCCCCC"])
+        error = json.loads(errors.getvalue())
+        self.assertEqual(error['url'], "https://youtu.be/BBBBBBBBBBB")
+        self.assertIn("Video unavailable", error['error'])
+    
+    @patch('yt_cli.metadata.yt_dlp.YoutubeDL')
+    def test_batch_csv(self, mock_ydl_class):
+        """Test batch mode CSV output has a header and joined list fields."""
+        mock_ydl_class.return_value.extract_info.side_effect = fake_info
+        output, errors = io.StringIO(), io.StringIO()
+        
+        extract_metadata_batch(self.url_file, output, errors, output_format='csv',
+                               jobs=1, use_cache=False)
+        
+        lines = output.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("video_id,url,title"))
+        self.assertEqual(len(lines), 3)
+        self.assertIn("a|b", lines[1])
+
+    
+    @patch('yt_cli.metadata.MetadataCache')
+    @patch('yt_cli.metadata.yt_dlp.YoutubeDL')
+    def test_batch_closes_cache(self, mock_ydl_class, mock_cache_class):
+        """Test batch mode closes the metadata cache it opened."""
+        mock_ydl_class.return_value.extract_info.side_effect = fake_info
+        mock_cache_class.return_value.get.return_value = None
+        
+        extract_metadata_batch(self.url_file, io.StringIO(), io.StringIO(), jobs=2)
+        
+        mock_cache_class.return_value.close.assert_called_once_with()
+    
+    def test_parse_fields(self):
+        """Test --fields parsing and validation."""
+        self.assertEqual(parse_fields("title, duration"), ["title", "duration"])
+        with self.assertRaises(ValueError):
+            parse_fields("title,bogus")
+    
+    def test_choose_strategy(self):
+        """Test the cheapest strategy able to fill the fields is chosen."""
+        self.assertEqual(choose_strategy(None), 'full')
+        self.assertEqual(choose_strategy(['video_id']), 'url')
+        self.assertEqual(choose_strategy(['title', 'thumbnail']), 'oembed')
+        self.assertEqual(choose_strategy(['title', 'view_count']), 'lightweight')
+    
+    def test_url_strategy_needs_no_extraction(self):
+        """Test URL-only fields are answered without touching yt-dlp."""
+        ydl = MagicMock()
+        metadata, source = fetch_metadata_with_strategy(
+            "https://youtu.be/AAAAAAAAAAA", ['video_id', 'url'], ydl=ydl)
+        self.assertEqual(source, 'url')
+        self.assertEqual(metadata, {'video_id': "AAAAAAAAAAA", 'url': "https://youtu.be/AAAAAAAAAAA"})
+        ydl.extract_info.assert_not_called()
+        ydl.urlopen.assert_not_called()
+    
+    def test_oembed_strategy(self):
+        """Test title/channel/thumbnail come from a single oEmbed request."""
+        ydl = MagicMock()
+        ydl.urlopen.return_value.__enter__.return_value = io.BytesIO(json.dumps({
+            'title': 'Test', 'author_name': 'Channel', 'thumbnail_url': 'http://t/1.jpg'
+        }).encode())
+        metadata, source = fetch_metadata_with_strategy(
+            "https://youtu.be/AAAAAAAAAAA", ['title', 'channel'], ydl=ydl)
+        self.assertEqual(source, 'oembed')
+        self.assertEqual(metadata, {'title': 'Test', 'channel': 'Channel'})
+        ydl.extract_info.assert_not_called()
+    
+    def test_lightweight_strategy_skips_processing(self):
+        """Test projected fields skip format processing and use the thumbnail list."""
+        ydl = MagicMock()
+        ydl.extract_info.return_value = {
+            'id': "AAAAAAAAAAA", 'view_count': 7,
+            'thumbnails': [{'url': 'http://t/small.jpg'}, {'url': 'http://t/big.jpg'}],
+        }
+        metadata, source = fetch_metadata_with_strategy(
+            "https://youtu.be/AAAAAAAAAAA", ['view_count', 'thumbnail'], ydl=ydl)
+        self.assertEqual(source, 'lightweight')
+        self.assertEqual(metadata, {'view_count': 7, 'thumbnail': 'http://t/big.jpg'})
+        ydl.extract_info.assert_called_once_with(
+            "https://youtu.be/AAAAAAAAAAA", download=False, process=False)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Unit tests for the Prometheus metrics.
+"""
+
+import os
+import tempfile
+import unittest
+import urllib.error
+import urllib.request
+from unittest.mock import patch
+from yt_cli import metrics
+from yt_cli.cache import TranscriptStore
+from yt_cli.downloader import count_download_progress
+from yt_cli.ffmpeg import run_ffmpeg
+from yt_cli.metrics import (
+    Counter, Gauge, Histogram, MetricsServer, Registry, TextfileExporter, error_type
+)
+from tests.test_ffmpeg import PROGRESS, fake_popen
+
+
+class TestExposition(unittest.TestCase):
+    """Test cases for the metric types and the text format."""
+    
+    def setUp(self):
+        self.registry = Registry()
+        
+    def test_counter_and_gauge(self):
+        """Test samples carry escaped labels and unlabeled metrics start at zero."""
+        requests = Counter('requests_total', 'Requests', ['path'], self.registry)
+        Gauge('temperature', 'Current "temperature"', registry=self.registry)
+        requests.inc(path='/a')
+        requests.inc(2, path='say "hi"\n')
+        text = self.registry.exposition()
+        self.assertIn('# HELP temperature Current "temperature"\n# TYPE temperature gauge\ntemperature 0\n', text)
+        self.assertIn('requests_total{path="/a"} 1\n', text)
+        self.assertIn('requests_total{path="say \\"hi\\"\\n"} 2\n', text)
+        self.assertEqual(requests.get(path='/a'), 1)
+        
+    def test_invalid_updates(self):
+        """Test wrong labels and decreasing counters are rejected."""
+        requests = Counter('requests_total', 'Requests', ['path'], self.registry)
+        with self.assertRaises(ValueError):
+            requests.inc(method='GET')
+        with self.assertRaises(ValueError):
+            requests.inc(-1, path='/')
+        with self.assertRaises(ValueError):
+            Counter('requests_total', 'Again', registry=self.registry)
+            
+    def test_histogram(self):
+        """Test buckets are cumulative and end with +Inf, sum and count."""
+        speed = Histogram('speed', 'Speed', ['preset'], self.registry, buckets=(1, 4))
+        for value in (0.5, 2, 8):
+            speed.observe(value, preset='fast')
+        lines = [line for line in self.registry.exposition().splitlines() if not line.startswith('#')]
+        self.assertEqual(lines, [
+            'speed_bucket{preset="fast",le="1"} 1',
+            'speed_bucket{preset="fast",le="4"} 2',
+            'speed_bucket{preset="fast",le="+Inf"} 3',
+            'speed_sum{preset="fast"} 10.5',
+            'speed_count{preset="fast"} 3',
+        ])
+        
+    def test_error_type_unwraps_download_errors(self):
+        """Test the error wrapped by a yt-dlp style DownloadError is named."""
+        class DownloadError(Exception):
+            pass
+            
+        class ExtractorError(Exception):
+            pass
+            
+        error = DownloadError("failed")
+        error.exc_info = (ExtractorError, ExtractorError("page"), None)
+        self.assertEqual(error_type(error), 'ExtractorError')
+        self.assertEqual(error_type(KeyError('x')), 'KeyError')
+
+
+class TestExporters(unittest.TestCase):
+    """Test cases for the textfile collector and the /metrics endpoint."""
+    
+    def setUp(self):
+        self.registry = Registry()
+        self.counter = Counter('jobs_total', 'Jobs', registry=self.registry)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        
+    def test_textfile_is_rewritten_on_close(self):
+        """Test the file is written at start and holds the final values after close."""
+        path = os.path.join(self.tmp.name, 'yt-cli.prom')
+        exporter = TextfileExporter(path, interval=3600, registry=self.registry)
+        with open(path, encoding='utf-8') as f:
+            self.assertIn('jobs_total 0\n', f.read())
+        self.counter.inc(3)
+        exporter.close()
+        with open(path, encoding='utf-8') as f:
+            self.assertIn('jobs_total 3\n', f.read())
+        self.assertEqual(os.listdir(self.tmp.name), ['yt-cli.prom'])
+        
+    def test_metrics_endpoint(self):
+        """Test /metrics serves the text format and other paths are not found."""
+        server = MetricsServer(('127.0.0.1', 0), self.registry)
+        self.addCleanup(server.close)
+        self.counter.inc()
+        with urllib.request.urlopen(server.url) as response:
+            self.assertEqual(response.headers['Content-Type'], metrics.CONTENT_TYPE)
+            self.assertIn(b'jobs_total 1\n', response.read())
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            urllib.request.urlopen(server.url.replace('/metrics', '/other'))
+        self.assertEqual(ctx.exception.code, 404)
+
+
+class TestInstrumentation(unittest.TestCase):
+    """Test cases for the metrics fed by downloads, caches and FFmpeg."""
+    
+    def test_download_bytes_count_growth(self):
+        """Test cumulative progress of each file is counted once."""
+        before = metrics.DOWNLOAD_BYTES.get()
+        for done in (100, 300, 250):
+            count_download_progress({'status': 'downloading', 'filename': 'v.f1.mp4', 'downloaded_bytes': done})
+        count_download_progress({'status': 'downloading', 'filename': 'v.f2.m4a', 'downloaded_bytes': 50})
+        count_download_progress({'status': 'finished', 'filename': 'v.f1.mp4', 'total_bytes': 300})
+        self.assertEqual(metrics.DOWNLOAD_BYTES.get() - before, 350)
+        
+    def test_transcript_cache_lookups(self):
+        """Test transcript store hits and misses are counted."""
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TranscriptStore(directory=tmp)
+            misses = metrics.CACHE_REQUESTS.get(cache='transcript', result='miss')
+            hits = metrics.CACHE_REQUESTS.get(cache='transcript', result='hit')
+            store.get('abc', 'en')
+            store.put('abc', 'en', [{'text': 'hi', 'start': 0, 'duration': 1}])
+            store.get('abc', 'en')
+        self.assertEqual(metrics.CACHE_REQUESTS.get(cache='transcript', result='miss') - misses, 1)
+        self.assertEqual(metrics.CACHE_REQUESTS.get(cache='transcript', result='hit') - hits, 1)
+        
+    @patch('yt_cli.ffmpeg.probe_ffmpeg', return_value=None)
+    @patch('yt_cli.ffmpeg.subprocess.Popen')
+    def test_ffmpeg_runs_by_preset(self, mock_popen, mock_probe):
+        """Test every encode counts by preset and records its speed; failures count by error."""
+        mock_popen.side_effect = fake_popen(PROGRESS, b'', 0)
+        runs = metrics.FFMPEG_RUNS.get(preset='veryfast', result='ok')
+        speeds = metrics.ENCODE_SPEED.get(preset='veryfast')
+        run_ffmpeg(['-i', 'in.mkv', '-preset', 'veryfast', 'out.mp4'])
+        self.assertEqual(metrics.FFMPEG_RUNS.get(preset='veryfast', result='ok') - runs, 1)
+        self.assertEqual(metrics.ENCODE_SPEED.get(preset='veryfast') - speeds, 1)
+        
+        mock_popen.side_effect = fake_popen(b'', b'boom\n', 1)
+        failures = metrics.FAILURES.get(operation='ffmpeg', error='FFmpegError')
+        with self.assertRaises(Exception):
+            run_ffmpeg(['-i', 'in.mkv', 'out.mp4'])
+        self.assertGreaterEqual(metrics.FFMPEG_RUNS.get(preset='none', result='failed'), 1)
+        self.assertEqual(metrics.FAILURES.get(operation='ffmpeg', error='FFmpegError') - failures, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+"""
+Unit tests for the pipeline runner.
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from yt_cli.bandwidth import BandwidthScheduler
+from yt_cli.cache import MetadataCache
+from yt_cli.pipeline import (
+    PipelineError, Stage, build_stages, load_spec, run_pipeline, spec_inputs
+)
+
+
+class TestPipeline(unittest.TestCase):
+    """Test cases for streaming items through stages."""
+    
+    def test_items_flow_through_stages(self):
+        """Test each item passes every stage and failures name their stage."""
+        def check(value):
+            if value == 2:
+                raise ValueError("bad item")
+            return value
+            
+        stages = [Stage('double', lambda v: v * 2, 2), Stage('check', check, 1),
+                  Stage('label', lambda v: f"#{v}", 3)]
+        seen = []
+        results, stats = run_pipeline(range(4), stages, on_result=seen.append)
+        
+        self.assertEqual(sorted((r.item, r.value) for r in results if r.ok),
+                         [(0, '#0'), (2, '#4'), (3, '#6')])
+        failed = [r for r in results if not r.ok]
+        self.assertEqual([(r.item, r.stage, r.error) for r in failed], [(1, 'check', "bad item")])
+        self.assertEqual(len(seen), 4)
+        self.assertEqual([(s.processed, s.failed) for s in stats], [(4, 0), (3, 1), (3, 0)])
+        
+    def test_stages_overlap_within_limits(self):
+        """Test stages run at the same time, each within its concurrency limit."""
+        lock = threading.Lock()
+        active = {'fetch': 0, 'encode': 0}
+        peak = {'fetch': 0, 'encode': 0, 'both': 0}
+        
+        def work(name):
+            def run(value):
+                with lock:
+                    active[name] += 1
+                    peak[name] = max(peak[name], active[name])
+                    if active['fetch'] and active['encode']:
+                        peak['both'] = 1
+                time.sleep(0.02)
+                with lock:
+                    active[name] -= 1
+                return value
+            return run
+            
+        _, stats = run_pipeline(range(12), [Stage('fetch', work('fetch'), 3), Stage('encode', work('encode'), 2)])
+        self.assertLessEqual(peak['fetch'], 3)
+        self.assertLessEqual(peak['encode'], 2)
+        self.assertEqual(peak['both'], 1)
+        self.assertTrue(all(0 < s.utilization(1.0) <= 1 for s in stats))
+        
+    def test_backpressure(self):
+        """Test a slow stage stops an earlier one from running far ahead."""
+        fetched = []
+        ahead = []
+        
+        def fetch(value):
+            fetched.append(value)
+            return value
+            
+        def encode(value):
+            ahead.append(len(fetched) - value)
+            time.sleep(0.01)
+            return value
+            
+        run_pipeline(range(30), [Stage('fetch', fetch, 1), Stage('encode', encode, 1)], queue_size=2)
+        # At most the queue plus the item each stage is holding
+        self.assertLessEqual(max(ahead), 4)
+
+
+class TestPipelineSpec(unittest.TestCase):
+    """Test cases for reading pipeline specs."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        
+    def write(self, spec, name='spec.json'):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(spec if isinstance(spec, str) else json.dumps(spec))
+        return path
+        
+    def test_load_spec(self):
+        """Test JSON and YAML specs are read and their inputs listed."""
+        spec = load_spec(self.write({'input': ['a.mkv', 'b.mkv'],
+                                     'stages': [{'type': 'convert', 'to': 'mp4'}]}))
+        self.assertEqual(list(spec_inputs(spec)), ['a.mkv', 'b.mkv'])
+        
+        urls = self.write("https://youtu.be/a\n# comment\nhttps://youtu.be/b\n", 'urls.txt')
+        self.assertEqual(list(spec_inputs(spec, urls)), ['https://youtu.be/a', 'https://youtu.be/b'])
+        
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            return
+        spec = load_spec(self.write("stages:\n  - type: compress\n    jobs: 2\n", 'spec.yaml'))
+        self.assertEqual(spec['stages'], [{'type': 'compress', 'jobs': 2}])
+        
+    def test_invalid_specs(self):
+        """Test invalid specs are rejected with a clear error."""
+        invalid = [
+            {'stages': []},
+            {'stages': [{'type': 'upload'}]},
+            {'stages': [{'type': 'convert'}]},
+            {'stages': [{'type': 'compress'}, {'type': 'download'}]},
+            {'stages': [{'type': 'compress', 'jobs': 0}]},
+            {'queue_size': 0, 'stages': [{'type': 'compress'}]},
+            {'queue_size': '2', 'stages': [{'type': 'compress'}]},
+            '{"stages": [',
+        ]
+        for spec in invalid:
+            with self.assertRaises(PipelineError):
+                load_spec(self.write(spec))
+                
+    def test_download_stage_resources_are_closed(self):
+        """Test the download stage's metadata cache and scheduler are closed with the run."""
+        spec = {'stages': [{'type': 'download', 'output': self.tmp.name, 'limit_rate': '1M'}]}
+        with patch.dict(os.environ, {'YT_CLI_CACHE_DIR': self.tmp.name}), \
+                patch.object(MetadataCache, 'close', autospec=True, side_effect=MetadataCache.close) as cache, \
+                patch.object(BandwidthScheduler, 'close', autospec=True,
+                             side_effect=BandwidthScheduler.close) as scheduler:
+            with contextlib.ExitStack() as cleanup:
+                build_stages(spec, cleanup)
+                self.assertFalse(cache.called or scheduler.called)
+            self.assertEqual((cache.call_count, scheduler.call_count), (1, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Unit tests for resumable, verified downloads.
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest.mock import patch
+import yt_dlp
+from yt_cli.ffmpeg import MediaInfo
+from yt_cli.resume import (
+    DownloadState, PartState, ResumeTracker, VerificationError, verify_download
+)
+
+
+DATA = bytes(range(256)) * 1200
+
+
+class FlakyMediaServer(BaseHTTPRequestHandler):
+    """Serves ``DATA`` with range support, dropping the connection mid-stream while ``drop`` is set."""
+    
+    drop = False
+    ranges = []
+    
+    def log_message(self, format, *args):
+        pass
+        
+    def do_HEAD(self):
+        self.do_GET(head=True)
+        
+    def do_GET(self, head=False):
+        requested = self.headers.get('Range')
+        start = 0
+        if requested:
+            start = int(requested.split('=')[1].split('-')[0])
+            self.ranges.append(start)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{len(DATA) - 1}/{len(DATA)}')
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', 'video/mp4')
+        self.send_header('Accept-Ranges', 'bytes')
+        self.send_header('Content-Length', str(len(DATA) - start))
+        self.end_headers()
+        if not head:
+            body = DATA[start:]
+            self.wfile.write(body[:len(body) // 2] if self.drop else body)
+
+
+class TestResumableDownload(unittest.TestCase):
+    """Test cases for resuming across runs against a local stand-in server."""
+    
+    def setUp(self):
+        FlakyMediaServer.drop = False
+        FlakyMediaServer.ranges = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), FlakyMediaServer)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/clip.mp4'
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.state_path = DownloadState.path_for(Path(self.tmp.name), 'clip')
+        
+    def download(self, filesize=None):
+        """Run one download in a fresh YoutubeDL instance, as a new process would."""
+        ydl = yt_dlp.YoutubeDL({'quiet': True, 'noprogress': True, 'no_warnings': True, 'retries': 0,
+                                'outtmpl': os.path.join(self.tmp.name, '%(id)s.%(ext)s')})
+        self.addCleanup(ydl.close)
+        tracker = ResumeTracker(self.tmp.name, checkpoint_bytes=32 * 1024)
+        tracker.attach(ydl)
+        info = ydl.extract_info(self.url, download=False, process=False)
+        if filesize is not None:
+            info['formats'][0]['filesize'] = filesize
+        kept = tracker.begin(info)
+        try:
+            return kept, tracker.finish(ydl.process_ie_result(info, download=True))
+        finally:
+            tracker.end()
+            
+    def test_resume_from_last_checkpoint(self):
+        """Test a killed download resumes from its last checkpoint, not from its torn tail."""
+        FlakyMediaServer.drop = True
+        with self.assertRaises(yt_dlp.utils.DownloadError):
+            self.download()
+        state = DownloadState.load(self.state_path)
+        part = state.parts[state.format_id]
+        checkpoint = part.good_bytes
+        self.assertGreater(checkpoint, 0)
+        self.assertEqual(state.status, 'downloading')
+        
+        # Simulate bytes that were written after the checkpoint and did not survive intact
+        with open(part.tmpfilename, 'ab') as f:
+            f.write(b'\0' * 5000)
+            
+        FlakyMediaServer.drop = False
+        kept, path = self.download()
+        self.assertEqual(kept, checkpoint)
+        self.assertEqual(FlakyMediaServer.ranges[-1], checkpoint)
+        self.assertEqual(Path(path).read_bytes(), DATA)
+        self.assertEqual(Path(path).name, 'clip.mp4')
+        
+        state = DownloadState.load(self.state_path)
+        self.assertEqual((state.status, state.filepath), ('complete', path))
+        
+    def test_size_mismatch_is_not_marked_complete(self):
+        """Test a file of the wrong size fails verification and is removed."""
+        with self.assertRaisesRegex(VerificationError, "expected"):
+            self.download(filesize=len(DATA) + 1)
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'clip.mp4')))
+        self.assertFalse(self.state_path.exists())
+        
+    def test_changed_formats_discard_parts(self):
+        """Test parts of formats that are no longer offered are deleted."""
+        stale = Path(self.tmp.name) / 'clip.f1.mp4.part'
+        stale.write_bytes(b'x' * 100)
+        state = DownloadState('clip', format_id='1', parts={'1': PartState(str(stale), completed=[[0, 100]])})
+        state.save(self.state_path)
+        
+        tracker = ResumeTracker(self.tmp.name)
+        info = {'id': 'clip', 'formats': [{'format_id': 'mp4'}]}
+        self.assertEqual(tracker.begin(info), 0)
+        self.assertFalse(stale.exists())
+        self.assertEqual(info['formats'], [{'format_id': 'mp4'}])
+        self.assertIsNone(DownloadState.load(self.state_path).format_id)
+
+
+class TestVerifyDownload(unittest.TestCase):
+    """Test cases for checking finished files."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'video.mp4')
+        Path(self.path).write_bytes(b'data')
+        
+    @patch('yt_cli.resume.probe_media')
+    def test_duration_is_checked(self, mock_probe):
+        """Test a file much shorter than the video fails and a close one passes."""
+        state = DownloadState('video', duration=600.0)
+        mock_probe.return_value = MediaInfo([], duration=300.0)
+        with self.assertRaisesRegex(VerificationError, "lasts 300.0s"):
+            verify_download(state, self.path)
+            
+        mock_probe.return_value = MediaInfo([], duration=599.5)
+        verify_download(state, self.path)
+        
+    def test_missing_file(self):
+        """Test a missing final file fails verification."""
+        with self.assertRaisesRegex(VerificationError, "missing"):
+            verify_download(DownloadState('video'), os.path.join(self.tmp.name, 'gone.mp4'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+Unit tests for summarizer module.
+"""
+
+import unittest
+from yt_cli.summarizer import split_sentences, rank_sentences, summarize, MAX_SENTENCE_WORDS
+
+
+class TestSummarizer(unittest.TestCase):
+    """Test cases for extractive summarization."""
+    
+    def test_split_sentences_on_punctuation(self):
+        """Test sentences are split after terminal punctuation."""
+        sentences = split_sentences("First one here. Second one! Third? Fourth")
+        self.assertEqual([" ".join(s) for s in sentences],
+                         ["First one here.", "Second one!", "Third?", "Fourth"])
+    
+    def test_split_sentences_windows_unpunctuated_text(self):
+        """Test text without punctuation is cut into fixed word windows."""
+        sentences = split_sentences(" ".join(["word"] * (MAX_SENTENCE_WORDS * 2 + 5)))
+        self.assertEqual([len(s) for s in sentences], [MAX_SENTENCE_WORDS, MAX_SENTENCE_WORDS, 5])
+    
+    def test_rank_sentences_prefers_central_sentences(self):
+        """Test sentences sharing the main topic outrank an outlier."""
+        sentences = [s.split() for s in [
+            "python makes scripting easy",
+            "python scripting tools are easy",
+            "easy python scripting for everyone",
+            "bananas grow on tropical trees",
+        ]]
+        scores = rank_sentences(sentences)
+        self.assertEqual(scores.index(min(scores)), 3)
+    
+    def test_summarize_respects_budget_and_order(self):
+        """Test the summary fits its word budget and keeps original order."""
+        text = " ".join(
+            f"Sentence {i} talks about python scripting and automation." if i % 2 == 0
+            else f"Filler {i} mentions weather and lunch plans today."
+            for i in range(200)
+        )
+        result = summarize(text, "short")
+        self.assertEqual(result.total_words, len(text.split()))
+        self.assertLessEqual(result.summary_words, 100)
+        self.assertEqual(result.summary_words, len(result.text.split()))
+        self.assertIn("python", result.text)
+        
+        numbers = [int(w) for w in result.text.split() if w.isdigit()]
+        self.assertEqual(numbers, sorted(numbers))
+    
+    def test_summarize_short_text(self):
+        """Test texts too short for the budget produce an empty summary."""
+        self.assertEqual(summarize("Too short.", "short").text, "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Unit tests for playlist and channel sync.
+"""
+
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+from yt_cli.sync import DownloadArchive, iter_entries, sync_collection
+
+
+def video_id(n):
+    return f"vid{n:08d}"
+
+
+def listing(ids, pulled=None):
+    """Flat tab listing whose entries are generated lazily, like yt-dlp's paged tabs."""
+    def entries():
+        for i in ids:
+            if pulled is not None:
+                pulled.append(i)
+            yield {'_type': 'url', 'ie_key': 'Youtube', 'id': video_id(i),
+                   'url': f'https://www.youtube.com/watch?v={video_id(i)}', 'title': f'Video {i}'}
+    return {'_type': 'playlist', 'id': 'UCchannel', 'entries': entries()}
+
+
+class TestSync(unittest.TestCase):
+    """Test cases for the download archive and channel listing."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        env = patch.dict(os.environ, {'YT_CLI_CACHE_DIR': self.tmp.name})
+        env.start()
+        self.addCleanup(env.stop)
+        
+    def test_archive_round_trip(self):
+        """Test the archive reads and writes yt-dlp's download archive format."""
+        path = Path(self.tmp.name) / 'archive.txt'
+        path.write_text(f"youtube {video_id(1)}\nvimeo 12345\nyoutube {video_id(2)}\nyoutube tor", encoding='utf-8')
+        archive = DownloadArchive(path)
+        archive.load()
+        self.assertEqual(len(archive), 2)
+        
+        archive.add(video_id(3))
+        archive.add(video_id(3))
+        reloaded = DownloadArchive(path)
+        reloaded.load()
+        self.assertIn(video_id(3), reloaded)
+        self.assertEqual(path.read_text(encoding='utf-8').count(video_id(3)), 1)
+        
+    def test_listing_stops_at_archived_run(self):
+        """Test a tab stops being read after a run of archived videos."""
+        path = Path(self.tmp.name) / 'archive.txt'
+        path.write_text(''.join(f"youtube {video_id(i)}\n" for i in range(3, 5000)), encoding='utf-8')
+        archive = DownloadArchive(path)
+        archive.load()
+        pulled = []
+        
+        entries = list(iter_entries(None, listing(range(5000), pulled), archive, stop_after=5))
+        self.assertEqual([e.video_id for e in entries], [video_id(i) for i in range(8)])
+        self.assertEqual(len(pulled), 8)
+        
+        everything = list(iter_entries(None, listing(range(50)), archive, stop_after=0))
+        self.assertEqual(len(everything), 50)
+        
+    @patch('yt_cli.sync.yt_dlp.YoutubeDL')
+    def test_sync_downloads_only_new_videos(self, mock_ydl_class):
+        """Test a sync follows channel tabs, downloads new videos and archives them."""
+        ydl = mock_ydl_class.return_value
+        channel = 'https://www.youtube.com/@channel'
+        
+        def fake_extract(url, download=True, process=True):
+            if not process:
+                if url == channel:
+                    shorts = {'_type': 'url', 'ie_key': 'YoutubeTab', 'url': channel + '/shorts'}
+                    return {'_type': 'playlist', 'entries': [listing([1, 2, 3]), shorts]}
+                if 'watch?v=' in url:
+                    return {'_type': 'video', 'id': url[-11:], 'title': url[-11:]}
+                return listing([3, 4])
+            
+        def fake_process(info, download=True):
+            return dict(info, requested_downloads=[{'filepath': info['id'] + '.mp4'}])
+            
+        ydl.extract_info.side_effect = fake_extract
+        ydl.process_ie_result.side_effect = fake_process
+        output = os.path.join(self.tmp.name, 'mirror')
+        
+        first = sync_collection(channel, output, jobs=2, use_cache=False)
+        self.assertEqual(sorted(r.title for r in first), [video_id(i) for i in (1, 2, 3, 4)])
+        
+        second = sync_collection(channel, output, jobs=2, use_cache=False)
+        self.assertEqual(second, [])
+        archive = DownloadArchive(Path(output) / '.yt-cli-archive.txt')
+        archive.load()
+        self.assertEqual(len(archive), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+"""
+Unit tests for phase tracing and profiling.
+"""
+
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from yt_cli import trace
+from yt_cli.main import main
+
+
+class TestSpans(unittest.TestCase):
+    """Test cases for recording spans."""
+    
+    def setUp(self):
+        self.addCleanup(trace.stop_tracing)
+        
+    def test_disabled_span_is_shared_noop(self):
+        """Test spans cost no allocation and record nothing while tracing is off."""
+        self.assertIs(trace.span('a'), trace.span('b', x=1))
+        with trace.span('a') as phase:
+            phase.set(result=1)
+        self.assertFalse(trace.enabled())
+        
+    def test_nested_spans(self):
+        """Test nested spans are recorded inside their parent, with their details."""
+        tracer = trace.start_tracing()
+        with trace.span('outer', 'cli'):
+            with trace.span('inner', url='u') as inner:
+                inner.set(hit=True)
+        inner_event, outer_event = tracer.events
+        self.assertEqual((outer_event['name'], outer_event['cat'], outer_event['ph']), ('outer', 'cli', 'X'))
+        self.assertEqual(inner_event['args'], {'url': 'u', 'hit': True})
+        self.assertGreaterEqual(inner_event['ts'], outer_event['ts'])
+        self.assertLessEqual(inner_event['ts'] + inner_event['dur'], outer_event['ts'] + outer_event['dur'])
+        self.assertEqual([name for name, _, _ in tracer.totals()], ['outer', 'inner'])
+        
+    def test_failed_span_records_error(self):
+        """Test a span left by an exception is kept and names the error."""
+        tracer = trace.start_tracing()
+        with self.assertRaises(ValueError):
+            with trace.span('broken'):
+                raise ValueError("boom")
+        self.assertEqual(tracer.events[0]['args'], {'error': 'ValueError'})
+        
+    def test_chrome_format(self):
+        """Test the trace names the process and threads and sorts events by start."""
+        tracer = trace.start_tracing()
+        tracer.record('late', 2.0 + tracer._origin, 3.0 + tracer._origin)
+        tracer.record('early', 1.0 + tracer._origin, 1.5 + tracer._origin)
+        data = tracer.to_chrome()
+        names = [event['name'] for event in data['traceEvents']]
+        self.assertEqual(names, ['process_name', 'thread_name', 'early', 'late'])
+        self.assertEqual(data['traceEvents'][2]['dur'], 500000.0)
+
+
+class TestYdlHooks(unittest.TestCase):
+    """Test cases for timing yt-dlp's transfer and post-processing."""
+    
+    def setUp(self):
+        self.addCleanup(trace.stop_tracing)
+        
+    def test_instrument_only_while_tracing(self):
+        """Test hooks are added once, and only while tracing is on."""
+        opts = {'progress_hooks': [print]}
+        self.assertEqual(trace.instrument_ydl_opts(opts), {'progress_hooks': [print]})
+        trace.start_tracing()
+        trace.instrument_ydl_opts(opts)
+        trace.instrument_ydl_opts(opts)
+        self.assertEqual(opts['progress_hooks'], [print, trace.progress_hook])
+        self.assertEqual(opts['postprocessor_hooks'], [trace.postprocessor_hook])
+        
+    def test_hooks_record_phases(self):
+        """Test progress and post-processor events become transfer and postprocess spans."""
+        tracer = trace.start_tracing()
+        info = {'id': 'abc', 'format_id': '140'}
+        for done in (100, 200):
+            trace.progress_hook({'status': 'downloading', 'filename': 'abc.m4a',
+                                 'downloaded_bytes': done, 'info_dict': info})
+        trace.progress_hook({'status': 'finished', 'filename': 'abc.m4a',
+                             'total_bytes': 200, 'info_dict': info})
+        # An already downloaded file never reports progress and is not a transfer
+        trace.progress_hook({'status': 'finished', 'filename': 'old.m4a', 'info_dict': info})
+        for status in ('started', 'processing', 'finished'):
+            trace.postprocessor_hook({'status': status, 'postprocessor': 'ExtractAudio',
+                                      'info_dict': info})
+                                      
+        transfer, postprocess = tracer.events
+        self.assertEqual(transfer['name'], 'transfer')
+        self.assertEqual((transfer['args']['format_id'], transfer['args']['bytes']), ('140', 200))
+        self.assertEqual(postprocess['args'], {'postprocessor': 'ExtractAudio', 'video_id': 'abc'})
+
+
+class TestCommandLine(unittest.TestCase):
+    """Test cases for --trace and --profile."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        patcher = patch.dict(os.environ, {'YT_CLI_CACHE_DIR': self.tmp.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+    def run_main(self, *args):
+        stderr = io.StringIO()
+        with patch.object(sys, 'argv', ['yt-cli'] + list(args)), \
+                patch('sys.stdout', io.StringIO()), patch('sys.stderr', stderr):
+            main()
+        return stderr.getvalue()
+        
+    def test_trace_writes_chrome_json(self):
+        """Test --trace writes the command, import and command phases."""
+        path = os.path.join(self.tmp.name, 'trace.json')
+        output = self.run_main('--trace', path, 'cache', 'stats')
+        self.assertIn("Trace written to", output)
+        self.assertFalse(trace.enabled())
+        with open(path, encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        names = {event['name'] for event in events if event['ph'] == 'X'}
+        self.assertEqual(names, {'yt-cli cache', 'import'})
+        
+    def test_trace_is_written_when_command_exits(self):
+        """Test the trace is written even if the command fails."""
+        path = os.path.join(self.tmp.name, 'trace.json')
+        with self.assertRaises(SystemExit):
+            self.run_main('--trace', path, 'convert', os.path.join(self.tmp.name, 'missing.mp4'),
+                          '--to', 'mp3')
+        with open(path, encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        command = [event for event in events if event['name'] == 'yt-cli convert'][0]
+        self.assertEqual(command['args'], {'error': 'SystemExit'})
+        
+    @patch('yt_cli.transcript.YouTubeTranscriptApi.get_transcript')
+    def test_trace_covers_summary(self, mock_get_transcript):
+        """Test the transcript command traces the fetch and the summary."""
+        mock_get_transcript.return_value = [{'text': 'Hello world. ' * 50, 'start': 0.0}]
+        path = os.path.join(self.tmp.name, 'trace.json')
+        self.run_main('--trace', path, 'transcript', 'https://youtu.be/dQw4w9WgXcQ', '--summary', 'short')
+        with open(path, encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+        summaries = [event for event in events if event['name'] == 'summarize']
+        self.assertEqual(len(summaries), 1)
+        self.assertEqual(summaries[0]['args']['summary_type'], 'short')
+        self.assertIn('fetch_transcript', {event['name'] for event in events})
+        
+    def test_profile_prints_stats(self):
+        """Test --profile prints the sorted cProfile listing."""
+        output = self.run_main('--profile', '--profile-sort', 'tottime', 'cache', 'stats')
+        self.assertIn("Ordered by: internal time", output)
+        self.assertIn("show_cache_stats", output)
+
+
+if __name__ == '__main__':
+    unittest.main()
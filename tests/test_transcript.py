@@ -2,14 +2,32 @@
 Unit tests for transcript module.
 """
 
+import io
+import json
+import os
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from unittest.mock import patch, MagicMock
-from yt_cli.transcript import fetch_transcript, summarize_text
+from urllib.parse import parse_qs, urlparse
+from requests.adapters import HTTPAdapter
+from yt_cli.transcript import (
+    create_session, fetch_transcript, fetch_transcript_batch, fetch_with_retry,
+    summarize_text, Throttled
+)
 
 
 class TestTranscript(unittest.TestCase):
     """Test cases for transcript functionality."""
     
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        env = patch.dict(os.environ, {'YT_CLI_CACHE_DIR': self.tmp.name})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(self.tmp.cleanup)
+    
     def test_summarize_text_short(self):
         """Test short summary generation."""
         text = " ".join(["word"] * 1000)
@@ -49,6 +67,153 @@ class TestTranscript(unittest.TestCase):
         result = fetch_transcript("invalid_url")
         self.assertIsNone(result)
 
+    
+    @patch('yt_cli.transcript.YouTubeTranscriptApi.get_transcript')
+    def test_fetch_transcript_uses_store(self, mock_get_transcript):
+        """Test a second fetch of the same video is served from the store."""
+        mock_get_transcript.return_value = [{'text': 'Hello', 'start': 0.0}]
+        url = "https://youtu.be/dQw4w9WgXcQ"
+        
+        self.assertEqual(fetch_transcript(url), "Hello")
+        self.assertEqual(fetch_transcript(url), "Hello")
+        self.assertEqual(mock_get_transcript.call_count, 1)
+        
+        fetch_transcript(url, use_cache=False)
+        self.assertEqual(mock_get_transcript.call_count, 2)
+
+
+
+class StandInYouTube(BaseHTTPRequestHandler):
+    """Serves watch pages and caption tracks the way the transcript API expects."""
+    
+    # video ID -> number of 429 responses still to send
+    throttle = {}
+    requests = []
+    
+    def log_message(self, format, *args):
+        pass
+        
+    def do_GET(self):
+        url = urlparse(self.path)
+        video_id = parse_qs(url.query).get('v', [''])[0]
+        self.requests.append((url.path, video_id))
+        if self.throttle.get(video_id):
+            self.throttle[video_id] -= 1
+            self.send_response(429)
+            self.send_header('Retry-After', '0')
+            self.end_headers()
+            return
+        if video_id == 'nocaptions1':
+            body = '<html>"playabilityStatus":{}</html>'
+        elif url.path == '/watch':
+            captions = {'playerCaptionsTracklistRenderer': {'captionTracks': [{
+                'baseUrl': f'https://www.youtube.com/api/timedtext?v={video_id}',
+                'name': {'simpleText': 'English'},
+                'languageCode': 'en',
+            }]}}
+            body = f'<html>"captions":{json.dumps(captions)},"videoDetails":{{}}</html>'
+        else:
+            body = f'<transcript><text start="0" dur="1">Hello {video_id}</text></transcript>'
+        data = body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class LocalAdapter(HTTPAdapter):
+    """Sends requests for www.youtube.com to the stand-in server instead."""
+    
+    def __init__(self, base_url):
+        super().__init__()
+        self.base_url = base_url
+        
+    def send(self, request, **kwargs):
+        request.url = request.url.replace('https://www.youtube.com', self.base_url)
+        return super().send(request, **kwargs)
+
+
+class TestTranscriptBatch(unittest.TestCase):
+    """Test cases for concurrent batch transcript fetching."""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        env = patch.dict(os.environ, {'YT_CLI_CACHE_DIR': self.tmp.name})
+        env.start()
+        self.addCleanup(env.stop)
+        
+        StandInYouTube.throttle = {}
+        StandInYouTube.requests = []
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StandInYouTube)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        
+        host, port = self.server.server_address[:2]
+        self.session = create_session(4)
+        self.session.mount('https://www.youtube.com', LocalAdapter(f'http://{host}:{port}'))
+        self.addCleanup(self.session.close)
+        
+    def run_batch(self, lines, **kwargs):
+        source = os.path.join(self.tmp.name, 'urls.txt')
+        with open(source, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+        output, errors = io.StringIO(), io.StringIO()
+        with patch('yt_cli.transcript.time.sleep'):
+            counts = fetch_transcript_batch(source, output, errors, session=self.session, **kwargs)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        failures = [json.loads(line) for line in errors.getvalue().splitlines()]
+        return counts, records, failures
+        
+    def test_batch_over_shared_session(self):
+        """Test URLs and IDs are fetched concurrently and failures reported per line."""
+        lines = ['https://youtu.be/AAAAAAAAAAA', 'BBBBBBBBBBB', 'nocaptions1', 'not a video']
+        counts, records, failures = self.run_batch(lines, jobs=3)
+        
+        self.assertEqual(counts, (2, 2))
+        texts = {r['video_id']: r['text'] for r in records}
+        self.assertEqual(texts, {'AAAAAAAAAAA': 'Hello AAAAAAAAAAA', 'BBBBBBBBBBB': 'Hello BBBBBBBBBBB'})
+        self.assertEqual({f['url'] for f in failures}, {'nocaptions1', 'not a video'})
+        
+        # A second run is served from the transcript store
+        StandInYouTube.requests = []
+        counts, records, _ = self.run_batch(lines[:2], jobs=2)
+        self.assertEqual({r['source'] for r in records}, {'cache'})
+        self.assertEqual(StandInYouTube.requests, [])
+        
+    def test_throttling_is_retried(self):
+        """Test 429 responses are retried until they stop or the retries run out."""
+        StandInYouTube.throttle = {'AAAAAAAAAAA': 2, 'BBBBBBBBBBB': 100}
+        counts, records, failures = self.run_batch(['AAAAAAAAAAA', 'BBBBBBBBBBB'], retries=3,
+                                                   use_cache=False)
+        self.assertEqual(counts, (1, 1))
+        self.assertEqual(records[0]['video_id'], 'AAAAAAAAAAA')
+        self.assertIn('429', failures[0]['error'])
+        self.assertEqual(StandInYouTube.throttle['BBBBBBBBBBB'], 100 - 4)
+        
+    def test_output_directory(self):
+        """Test each transcript can be written to its own file."""
+        output_dir = os.path.join(self.tmp.name, 'out')
+        counts, records, _ = self.run_batch(['AAAAAAAAAAA'], output_dir=output_dir, summary_type='short')
+        self.assertEqual((counts, records), ((1, 0), []))
+        with open(os.path.join(output_dir, 'AAAAAAAAAAA.json'), encoding='utf-8') as f:
+            record = json.load(f)
+        self.assertEqual(record['segments'][0]['text'], 'Hello AAAAAAAAAAA')
+        self.assertIn('summary', record)
+        
+    def test_backoff_is_jittered(self):
+        """Test retry delays stay within a window that doubles with each attempt."""
+        delays = []
+        
+        def throttled():
+            raise Throttled(429)
+            
+        with self.assertRaises(Throttled):
+            fetch_with_retry(throttled, retries=4, sleep=delays.append)
+        self.assertEqual(len(delays), 4)
+        self.assertTrue(all(0 <= d <= 2 ** i for i, d in enumerate(delays)))
+
 
 if __name__ == '__main__':
     unittest.main()
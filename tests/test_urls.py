@@ -0,0 +1,139 @@
+"""
+Unit tests for URL classification and URL list normalization.
+"""
+
+import io
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+from yt_cli.main import main
+from yt_cli.urls import SeenKeys, normalize_urls
+from yt_cli.utils import extract_video_id, parse_youtube_url, validate_youtube_url
+
+
+VIDEO_ID = 'dQw4w9WgXcQ'
+WATCH_URL = f'https://www.youtube.com/watch?v={VIDEO_ID}'
+CHANNEL_ID = 'UC' + 'a' * 22
+
+
+class TestParseYoutubeUrl(unittest.TestCase):
+    """Test cases for parse_youtube_url."""
+    
+    def test_video_shapes(self):
+        """Test every video shape normalizes to the watch URL."""
+        for url in (WATCH_URL, f'youtu.be/{VIDEO_ID}?t=42', f'http://youtu.be/{VIDEO_ID}/',
+                    f'https://m.youtube.com/watch?feature=share&v={VIDEO_ID}',
+                    f'https://music.youtube.com/watch?v={VIDEO_ID}&si=x',
+                    f'youtube.com/embed/{VIDEO_ID}?start=10', f'https://www.youtube.com/live/{VIDEO_ID}',
+                    f'https://www.youtube-nocookie.com/embed/{VIDEO_ID}',
+                    f'https://www.youtube.com/watch?v={VIDEO_ID}&list=PL123#t=1',
+                    f'youtube.com/watch?list=PL123&v={VIDEO_ID}',
+                    f'  HTTPS://WWW.YouTube.com/watch?v={VIDEO_ID}  '):
+            with self.subTest(url=url):
+                self.assertEqual(parse_youtube_url(url), ('video', VIDEO_ID, WATCH_URL))
+                
+    def test_shorts_playlists_and_channels(self):
+        """Test Shorts, playlists and channels get their own kinds and canonical URLs."""
+        cases = {
+            f'https://www.youtube.com/shorts/{VIDEO_ID}?feature=share':
+                ('shorts', VIDEO_ID, f'https://www.youtube.com/shorts/{VIDEO_ID}'),
+            'https://music.youtube.com/playlist?list=PLabc_-1':
+                ('playlist', 'PLabc_-1', 'https://www.youtube.com/playlist?list=PLabc_-1'),
+            'https://www.youtube.com/watch?list=PLabc':
+                ('playlist', 'PLabc', 'https://www.youtube.com/playlist?list=PLabc'),
+            f'youtube.com/channel/{CHANNEL_ID}/videos':
+                ('channel', CHANNEL_ID, f'https://www.youtube.com/channel/{CHANNEL_ID}'),
+            'https://m.youtube.com/@SomeHandle/shorts':
+                ('channel', '@somehandle', 'https://www.youtube.com/@somehandle'),
+            'https://www.youtube.com/user/OldName':
+                ('channel', 'OldName', 'https://www.youtube.com/user/OldName'),
+        }
+        for url, expected in cases.items():
+            with self.subTest(url=url):
+                self.assertEqual(parse_youtube_url(url), expected)
+                
+    def test_rejected_urls(self):
+        """Test foreign hosts, other schemes, bad IDs and unknown paths are rejected."""
+        for url in (f'https://example.com/watch?v={VIDEO_ID}', f'youtube.com.evil.com/watch?v={VIDEO_ID}',
+                    f'ftp://youtube.com/watch?v={VIDEO_ID}', f'{WATCH_URL}x', 'https://youtu.be/short',
+                    f'https://youtube.com/watch?vv={VIDEO_ID}', 'https://www.youtube.com/',
+                    'youtube.com/feed/subscriptions', 'not a url', ''):
+            with self.subTest(url=url):
+                self.assertIsNone(parse_youtube_url(url))
+                
+    def test_video_helpers(self):
+        """Test validate_youtube_url and extract_video_id accept single videos only."""
+        self.assertTrue(validate_youtube_url(f'https://www.youtube.com/shorts/{VIDEO_ID}'))
+        self.assertEqual(extract_video_id(f'https://m.youtube.com/watch?v={VIDEO_ID}'), VIDEO_ID)
+        self.assertFalse(validate_youtube_url('https://www.youtube.com/playlist?list=PLabc'))
+        self.assertIsNone(extract_video_id('https://www.youtube.com/@handle'))
+
+
+class TestSeenKeys(unittest.TestCase):
+    """Test cases for bounded-memory deduplication."""
+    
+    def test_spilled_keys_are_still_seen(self):
+        """Test keys stay deduplicated after spilling to disk and merging runs."""
+        seen = SeenKeys(memory=0)
+        keys = [f'key{i}' for i in range(12 * seen.max_keys)]
+        self.assertTrue(all(seen.add(key) for key in keys))
+        self.assertGreater(seen.spills, 8)
+        self.assertEqual(len(seen), len(keys))
+        self.assertFalse(any(seen.add(key) for key in keys[::97]))
+        self.assertTrue(seen.add('new'))
+        directory = seen._tmp.name
+        seen.close()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_keys_are_compared_by_hash(self):
+        """Test a key whose hash collides with an earlier key's is reported as seen."""
+        with patch('yt_cli.urls._hash64', lambda key: len(key)), SeenKeys() as seen:
+            self.assertTrue(seen.add('abc'))
+            self.assertFalse(seen.add('xyz'))
+            self.assertTrue(seen.add('abcd'))
+
+
+class TestNormalizeUrls(unittest.TestCase):
+    """Test cases for urls normalize."""
+    
+    LINES = [
+        WATCH_URL,
+        '# a comment',
+        f'https://youtu.be/{VIDEO_ID}',
+        f'https://www.youtube.com/shorts/{VIDEO_ID}',
+        'https://example.com/page',
+        'https://www.youtube.com/@Handle/videos',
+        'https://www.youtube.com/@handle',
+        'https://www.youtube.com/playlist?list=PLabc',
+    ]
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, 'urls.txt')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('\n'.join(self.LINES) + '\n')
+            
+    def test_first_occurrences_in_order(self):
+        """Test each item is written once, in input order, and rejects are collected."""
+        output, rejects = io.StringIO(), io.StringIO()
+        with patch('sys.stderr', io.StringIO()):
+            counts = normalize_urls(self.path, output, rejects)
+        self.assertEqual(output.getvalue().splitlines(), [
+            WATCH_URL, 'https://www.youtube.com/@handle', 'https://www.youtube.com/playlist?list=PLabc'])
+        self.assertEqual(rejects.getvalue(), 'https://example.com/page\n')
+        self.assertEqual((counts['read'], counts['duplicates'], counts['rejected']), (7, 3, 1))
+        
+    def test_kinds_and_ids(self):
+        """Test --kind keeps only the given kinds and --ids writes canonical IDs."""
+        output = io.StringIO()
+        with patch.object(sys, 'argv', ['yt-cli', 'urls', 'normalize', self.path, '--kind', 'shorts,playlist',
+                                        '--ids']), patch('sys.stdout', output), patch('sys.stderr', io.StringIO()):
+            main()
+        self.assertEqual(output.getvalue().splitlines(), [VIDEO_ID, 'PLabc'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,289 @@
+"""
+Shared bandwidth and fragment budget for concurrent downloads.
+
+A ``BandwidthScheduler`` owns two budgets for every download running in
+the process (a batch, a sync, a pipeline stage or the daemon):
+
+* a total rate in bytes per second, enforced by each download's progress
+  hook, which sleeps once the download is ahead of its share, and
+* a number of fragment connections, handed to yt-dlp as
+  ``concurrent_fragment_downloads`` for HLS and DASH formats.
+
+Shares are recomputed whenever a download starts or finishes and once
+per ``interval`` from the measured speeds. The rate is split max-min
+fairly, so a download held back by the server gives its unused share to
+the ones that can go faster.
+"""
+
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from .utils import print_info, format_file_size
+
+
+# Fragment connections shared by all active downloads
+DEFAULT_FRAGMENTS = 16
+
+# Seconds between rebalances
+REBALANCE_INTERVAL = 1.0
+
+# Seconds between throughput reports
+REPORT_INTERVAL = 5.0
+
+# Seconds of unused share a download may spend in one burst
+BURST = 0.5
+
+# A download that did not use its share asks for this much more than it
+# used, so it can speed up again without waiting to be throttled first
+HEADROOM = 1.25
+
+# Fraction of an even split that every download keeps, so one that is
+# still resolving its formats is not starved when it starts
+MIN_SHARE = 0.125
+
+
+def fair_shares(budget: float, demands: List[float]) -> List[float]:
+    """
+    Split a budget max-min fairly between demands.
+    
+    No demand gets more than it asks for, and what the smaller demands
+    leave is split evenly between the larger ones. Budget left once every
+    demand is met is spread evenly over all of them.
+    
+    Args:
+        budget: Total to split
+        demands: What each consumer asks for (``float('inf')`` for no limit)
+        
+    Returns:
+        One share per demand, summing to ``budget`` (if there are demands)
+    """
+    shares = [0.0] * len(demands)
+    remaining = float(budget)
+    order = sorted(range(len(demands)), key=lambda i: demands[i])
+    for position, i in enumerate(order):
+        share = min(demands[i], remaining / (len(order) - position))
+        shares[i] = share
+        remaining -= share
+        
+    if remaining > 0 and shares:
+        extra = remaining / len(shares)
+        shares = [share + extra for share in shares]
+    return shares
+
+
+class Lease:
+    """
+    One active download's share of a ``BandwidthScheduler``.
+    
+    Args:
+        params: The ``YoutubeDL`` params of the download; its
+            ``concurrent_fragment_downloads`` follows the lease's share
+    """
+    
+    def __init__(self, params: Dict[str, Any]):
+        self.params = params
+        self.rate: Optional[float] = None
+        self.fragments = 1
+        self.bytes = 0
+        self.speed = 0.0
+        self.demand = float('inf')
+        self.measured = False
+        self.throttled = False
+        self._interval_bytes = 0
+        self._tokens = 0.0
+        self._last = time.monotonic()
+        self._seen: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        
+    def progress_hook(self, d: Dict[str, Any]) -> None:
+        """yt-dlp progress hook that counts (and throttles) the bytes received."""
+        key = d.get('filename') or ''
+        if d['status'] != 'downloading':
+            # A finished (or skipped, already downloaded) file adds nothing new
+            with self._lock:
+                self._seen.pop(key, None)
+            return
+            
+        done = d.get('downloaded_bytes') or 0
+        with self._lock:
+            # Concurrent fragments may report out of order, so only count growth
+            last = self._seen.get(key, 0)
+            self._seen[key] = max(last, done)
+        if done > last:
+            self.consume(done - last)
+            
+    def consume(self, count: int) -> None:
+        """Account for ``count`` received bytes, sleeping if the lease is over its rate."""
+        with self._lock:
+            self.bytes += count
+            self._interval_bytes += count
+            delay = 0.0
+            if self.rate is not None:
+                self._refill()
+                self._tokens -= count
+                if self._tokens < 0:
+                    delay = -self._tokens / self.rate
+                    self.throttled = True
+        if delay > 0:
+            time.sleep(delay)
+            
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._tokens + (now - self._last) * self.rate, self.rate * BURST)
+        self._last = now
+        
+    def set_rate(self, rate: Optional[float]) -> None:
+        with self._lock:
+            if self.rate is not None:
+                self._refill()
+            elif rate is not None:
+                self._last = time.monotonic()
+                self._tokens = rate * BURST
+            self.rate = rate
+            
+    def set_fragments(self, fragments: int) -> None:
+        self.fragments = fragments
+        self.params['concurrent_fragment_downloads'] = fragments
+        
+    def sample(self, elapsed: float) -> int:
+        """Measure the speed since the last sample and return the bytes received."""
+        with self._lock:
+            received = self._interval_bytes
+            self._interval_bytes = 0
+            self.speed = received / elapsed if elapsed > 0 else 0.0
+            self.demand = float('inf') if self.throttled or not self.measured else self.speed * HEADROOM
+            self.measured = True
+            self.throttled = False
+        return received
+
+
+class BandwidthScheduler:
+    """
+    Shares a rate limit and a fragment budget between concurrent downloads.
+    
+    Args:
+        rate_limit: Total download rate in bytes per second (None for no limit)
+        fragments: Fragment connections shared by all active downloads
+        report: If True, print the aggregate throughput every ``REPORT_INTERVAL`` seconds
+        interval: Seconds between rebalances
+        
+    Raises:
+        ValueError: If the rate limit or the fragment budget is not positive
+    """
+    
+    def __init__(self, rate_limit: Optional[float] = None, fragments: int = DEFAULT_FRAGMENTS,
+                 report: bool = False, interval: float = REBALANCE_INTERVAL):
+        if rate_limit is not None and rate_limit <= 0:
+            raise ValueError("rate limit must be positive")
+        if fragments < 1:
+            raise ValueError("fragments must be at least 1")
+        self.rate_limit = rate_limit
+        self.fragments = fragments
+        self.report = report
+        self.interval = interval
+        self.total_bytes = 0
+        self.speed = 0.0
+        self._active: List[Lease] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_tick = time.monotonic()
+        self._released_bytes = 0
+        self._report_bytes = 0
+        self._report_start = self._last_tick
+        
+    def acquire(self, params: Dict[str, Any]) -> Lease:
+        """
+        Start a download and give it a share of the budget.
+        
+        Args:
+            params: The download's ``YoutubeDL`` params (``ydl.params``)
+            
+        Returns:
+            The lease; install ``lease.progress_hook`` and release it when done
+        """
+        lease = Lease(params)
+        with self._lock:
+            self._active.append(lease)
+            self._rebalance()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._monitor, name='bandwidth', daemon=True)
+                self._thread.start()
+        return lease
+        
+    def release(self, lease: Lease) -> None:
+        """Finish a download and hand its share to the others."""
+        with self._lock:
+            if lease in self._active:
+                self._active.remove(lease)
+                self._released_bytes += lease._interval_bytes
+                self._rebalance()
+                
+    def _rebalance(self) -> None:
+        count = len(self._active)
+        if not count:
+            return
+            
+        per_download, spare = divmod(self.fragments, count)
+        for position, lease in enumerate(self._active):
+            lease.set_fragments(max(1, per_download + (1 if position < spare else 0)))
+            
+        if self.rate_limit is None:
+            return
+        floor = self.rate_limit / count * MIN_SHARE
+        demands = [max(lease.demand, floor) for lease in self._active]
+        for lease, share in zip(self._active, fair_shares(self.rate_limit, demands)):
+            lease.set_rate(share)
+            
+    def _tick(self) -> None:
+        """Measure every active download and recompute the shares."""
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._last_tick
+            self._last_tick = now
+            received = self._released_bytes + sum(lease.sample(elapsed) for lease in self._active)
+            self._released_bytes = 0
+            self.total_bytes += received
+            self.speed = received / elapsed if elapsed > 0 else 0.0
+            self._report_bytes += received
+            self._rebalance()
+            active = len(self._active)
+            
+        if self.report and now - self._report_start >= REPORT_INTERVAL:
+            if active or self._report_bytes:
+                self._print_report(self._report_bytes / (now - self._report_start), active)
+            self._report_bytes = 0
+            self._report_start = now
+            
+    def _print_report(self, speed: float, active: int) -> None:
+        limit = f" of {format_file_size(self.rate_limit)}/s" if self.rate_limit else ""
+        print_info(f"Throughput: {format_file_size(speed)}/s{limit} across {active} download(s)",
+                   file=sys.stderr)
+                   
+    def _monitor(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._tick()
+            
+    def describe(self) -> str:
+        """Describe the budgets, e.g. for a startup message."""
+        limit = f"{format_file_size(self.rate_limit)}/s" if self.rate_limit else "no rate limit"
+        return f"{self.fragments} fragment connection(s), {limit}"
+        
+    def stats(self) -> Dict[str, Any]:
+        """Return the budgets, the active downloads and the last measured speed."""
+        with self._lock:
+            return {
+                'rate_limit': self.rate_limit,
+                'fragments': self.fragments,
+                'active': len(self._active),
+                'bytes_per_second': self.speed,
+                'bytes': self.total_bytes,
+            }
+            
+    def close(self) -> None:
+        """Stop the rebalancing thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,477 @@
+"""
+Persistent on-disk caches for video metadata and transcripts.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .metrics import CACHE_REQUESTS
+from .utils import get_cache_dir
+
+
+# Fields that change over a video's lifetime; everything else is static
+VOLATILE_FIELDS = ('view_count', 'like_count')
+
+# Default time-to-live in seconds for each field class
+DEFAULT_TTLS = {
+    'static': 7 * 24 * 3600,   # Title, duration, description, ...
+    'volatile': 3600,          # View and like counts
+}
+
+DEFAULT_MAX_ENTRIES = 10000
+
+# Metadata lookups counted in memory before the counters are written out
+STATS_FLUSH_LOOKUPS = 256
+
+# Total size of the compressed transcript store
+DEFAULT_TRANSCRIPT_BUDGET = 256 * 1024 * 1024
+
+
+def field_class(field: str) -> str:
+    """Return the TTL class ('static' or 'volatile') of a metadata field."""
+    return 'volatile' if field in VOLATILE_FIELDS else 'static'
+
+
+def _ttls_from_env() -> Dict[str, float]:
+    """Read TTL overrides from ``YT_CLI_CACHE_TTL_<CLASS>`` environment variables."""
+    ttls = dict(DEFAULT_TTLS)
+    for name in ttls:
+        value = os.environ.get(f'YT_CLI_CACHE_TTL_{name.upper()}')
+        if value:
+            ttls[name] = float(value)
+    return ttls
+
+
+class MetadataCache:
+    """
+    SQLite-backed metadata cache keyed by video ID.
+    
+    Each video's fields are stored in one row per TTL class, so volatile
+    counters can expire long before the static fields do. The database runs
+    in WAL mode and every write takes an immediate lock, which makes it safe
+    to share between threads and between concurrent ``yt-cli`` processes.
+    Once more than ``max_entries`` videos are stored, the least recently
+    used ones are evicted.
+    
+    Lookups only read: hit and miss counts and access times are kept in
+    memory and written out every ``STATS_FLUSH_LOOKUPS`` lookups, with the
+    next ``put``, and by ``stats`` and ``close``.
+    """
+    
+    def __init__(self, path: Optional[Path] = None, ttls: Optional[Dict[str, float]] = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = Path(path) if path else get_cache_dir() / 'metadata.sqlite3'
+        self.ttls = dict(_ttls_from_env())
+        if ttls:
+            self.ttls.update(ttls)
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._pending_lock = threading.Lock()
+        self._pending = {'metadata_hits': 0, 'metadata_misses': 0}
+        self._touched: Dict[str, float] = {}
+        
+    def _connect(self) -> sqlite3.Connection:
+        """Return this thread's connection, creating the schema on first use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS metadata (
+                    video_id TEXT NOT NULL,
+                    field_class TEXT NOT NULL,
+                    data TEXT NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (video_id, field_class)
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS metadata_accessed ON metadata (accessed_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS stats (
+                    name TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                )
+            ''')
+            self._local.conn = conn
+        return conn
+        
+    def _count(self, name: str, video_id: Optional[str] = None, now: float = 0.0) -> None:
+        """Count a lookup in memory, remembering when a hit's video was used."""
+        with self._pending_lock:
+            self._pending[name] += 1
+            if video_id is not None:
+                self._touched[video_id] = now
+            due = sum(self._pending.values()) >= STATS_FLUSH_LOOKUPS
+        if due:
+            self.flush()
+            
+    def _write_pending(self, conn: sqlite3.Connection) -> None:
+        """Write the counted lookups; call inside a write transaction."""
+        with self._pending_lock:
+            counts = [(name, value) for name, value in self._pending.items() if value]
+            touched = [(now, video_id) for video_id, now in self._touched.items()]
+            self._pending = dict.fromkeys(self._pending, 0)
+            self._touched = {}
+        conn.executemany(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            counts
+        )
+        conn.executemany('UPDATE metadata SET accessed_at = MAX(accessed_at, ?) WHERE video_id = ?',
+                         touched)
+        
+    def flush(self) -> None:
+        """Write the hit and miss counts and access times kept in memory."""
+        with self._pending_lock:
+            if not any(self._pending.values()) and not self._touched:
+                return
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._write_pending(conn)
+            finally:
+                conn.execute('COMMIT')
+        except sqlite3.Error:
+            pass
+            
+    def get(self, video_id: str, fields: Optional[Iterable[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up cached metadata for a video.
+        
+        Args:
+            video_id: YouTube video ID
+            fields: Fields the caller needs (default: all). Only the TTL
+                classes of these fields have to be fresh for a hit.
+                
+        Returns:
+            Cached fields, or None on a miss or if any needed class is stale
+        """
+        now = time.time()
+        
+        try:
+            conn = self._connect()
+            rows = conn.execute(
+                'SELECT field_class, data, fetched_at FROM metadata WHERE video_id = ?',
+                (video_id,)
+            ).fetchall()
+            
+            needed = {field_class(f) for f in fields} if fields else {row[0] for row in rows}
+            fresh = {}
+            for cls, data, fetched_at in rows:
+                if now - fetched_at <= self.ttls.get(cls, 0):
+                    fresh[cls] = json.loads(data)
+        except sqlite3.Error:
+            return None
+            
+        if not rows or not needed.issubset(fresh):
+            self._count('metadata_misses')
+            CACHE_REQUESTS.inc(cache='metadata', result='miss')
+            return None
+        self._count('metadata_hits', video_id, now)
+        CACHE_REQUESTS.inc(cache='metadata', result='hit')
+        
+        metadata = {}
+        for values in fresh.values():
+            metadata.update(values)
+        return metadata
+        
+    def put(self, video_id: str, metadata: Dict[str, Any]) -> None:
+        """
+        Store metadata for a video, replacing any previous entry.
+        
+        Args:
+            video_id: YouTube video ID
+            metadata: Field values to store
+        """
+        by_class: Dict[str, Dict[str, Any]] = {}
+        for field, value in metadata.items():
+            by_class.setdefault(field_class(field), {})[field] = value
+        now = time.time()
+        
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO metadata '
+                    '(video_id, field_class, data, fetched_at, accessed_at) VALUES (?, ?, ?, ?, ?)',
+                    [(video_id, cls, json.dumps(values), now, now) for cls, values in by_class.items()]
+                )
+                # Recent hits must count before choosing what to evict
+                self._write_pending(conn)
+                self._evict(conn)
+            finally:
+                conn.execute('COMMIT')
+        except sqlite3.Error:
+            pass
+            
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        """Drop the least recently used videos beyond ``max_entries``."""
+        (count,) = conn.execute('SELECT COUNT(DISTINCT video_id) FROM metadata').fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            conn.execute('''
+                DELETE FROM metadata WHERE video_id IN (
+                    SELECT video_id FROM metadata
+                    GROUP BY video_id ORDER BY MAX(accessed_at) LIMIT ?
+                )
+            ''', (excess,))
+            
+    def clear(self) -> None:
+        """Remove every cached entry and reset the hit and miss counters."""
+        with self._pending_lock:
+            self._pending = dict.fromkeys(self._pending, 0)
+            self._touched = {}
+        try:
+            conn = self._connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                conn.execute('DELETE FROM metadata')
+                conn.execute('DELETE FROM stats')
+            finally:
+                conn.execute('COMMIT')
+        except sqlite3.Error:
+            pass
+            
+    def stats(self) -> Dict[str, int]:
+        """
+        Return cache statistics.
+        
+        Returns:
+            Dictionary with entry count, hit and miss counters
+        """
+        self.flush()
+        try:
+            conn = self._connect()
+            (entries,) = conn.execute('SELECT COUNT(DISTINCT video_id) FROM metadata').fetchone()
+            counters = dict(conn.execute('SELECT name, value FROM stats').fetchall())
+        except sqlite3.Error:
+            entries, counters = 0, {}
+        return {
+            'entries': entries,
+            'hits': counters.get('metadata_hits', 0),
+            'misses': counters.get('metadata_misses', 0),
+        }
+        
+    def close(self) -> None:
+        """Write the counted lookups and close the calling thread's connection."""
+        self.flush()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+class TranscriptStore:
+    """
+    Compressed on-disk transcript store with a total byte budget.
+    
+    Each transcript is stored as a gzip-compressed JSON file named after
+    the SHA-256 of its ``video_id:language`` key. Files are written to a
+    temporary name and atomically renamed into place, so concurrent
+    processes never observe partial entries. A file's mtime records its
+    last use; when the store grows beyond ``max_bytes`` the least recently
+    used entries are deleted. The store's size is scanned once, on the first
+    ``put``, and then kept as a running total, so the directory is only
+    listed again when the total exceeds the budget. Hit and miss counts are kept in a small
+    SQLite database next to the entries, through one connection that the
+    store's threads share.
+    """
+    
+    SUFFIX = '.json.gz'
+    
+    def __init__(self, directory: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.directory = Path(directory) if directory else get_cache_dir() / 'transcripts'
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('YT_CLI_TRANSCRIPT_CACHE_BYTES',
+                                           DEFAULT_TRANSCRIPT_BUDGET))
+        self.max_bytes = max_bytes
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._total: Optional[int] = None
+        self._size_lock = threading.Lock()
+        
+    def _entry_path(self, video_id: str, language: str) -> Path:
+        digest = hashlib.sha256(f"{video_id}:{language}".encode('utf-8')).hexdigest()
+        return self.directory / f"{digest}{self.SUFFIX}"
+        
+    def _execute(self, sql: str, params: Tuple = ()) -> List[Tuple]:
+        """Run a statement on the stats database, connecting and creating the table on first use."""
+        with self._lock:
+            if self._conn is None:
+                self.directory.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.directory / 'stats.sqlite3'), timeout=30,
+                                       isolation_level=None, check_same_thread=False)
+                try:
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute('PRAGMA synchronous=NORMAL')
+                    conn.execute('CREATE TABLE IF NOT EXISTS stats '
+                                 '(name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+                except sqlite3.Error:
+                    conn.close()
+                    raise
+                self._conn = conn
+            return self._conn.execute(sql, params).fetchall()
+            
+    def _count(self, name: str) -> None:
+        try:
+            self._execute('INSERT INTO stats (name, value) VALUES (?, 1) '
+                          'ON CONFLICT(name) DO UPDATE SET value = value + 1', (name,))
+        except (OSError, sqlite3.Error):
+            pass
+            
+    def get(self, video_id: str, language: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up a stored transcript.
+        
+        Args:
+            video_id: YouTube video ID
+            language: Language key the transcript was stored under
+            
+        Returns:
+            Transcript segments, or None if not stored
+        """
+        path = self._entry_path(video_id, language)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            self._count('transcript_misses')
+            CACHE_REQUESTS.inc(cache='transcript', result='miss')
+            return None
+            
+        self._count('transcript_hits')
+        CACHE_REQUESTS.inc(cache='transcript', result='hit')
+        return entry['segments']
+        
+    def put(self, video_id: str, language: str, segments: List[Dict[str, Any]]) -> None:
+        """
+        Store a transcript, then evict old entries if over budget.
+        
+        Args:
+            video_id: YouTube video ID
+            language: Language key to store the transcript under
+            segments: Transcript segments as returned by the transcript API
+        """
+        entry = {'video_id': video_id, 'language': language, 'segments': segments}
+        data = gzip.compress(json.dumps(entry, ensure_ascii=False).encode('utf-8'))
+        
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            path = self._entry_path(video_id, language)
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.directory), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                try:
+                    replaced = path.stat().st_size
+                except OSError:
+                    replaced = 0
+                os.replace(tmp_path, path)
+            except OSError:
+                os.unlink(tmp_path)
+                raise
+            self._grow(len(data) - replaced)
+        except OSError:
+            pass
+            
+    def _entries(self) -> List[Tuple[Path, os.stat_result]]:
+        entries = []
+        for path in self.directory.glob(f"*{self.SUFFIX}"):
+            try:
+                entries.append((path, path.stat()))
+            except OSError:
+                pass
+        return entries
+        
+    def _grow(self, delta: int) -> None:
+        """Add ``delta`` bytes to the running total and evict once it exceeds the budget."""
+        with self._size_lock:
+            if self._total is None:
+                # The first put counts what earlier runs stored, including its own entry
+                self._total = sum(st.st_size for _, st in self._entries())
+            else:
+                self._total += delta
+            if self._total > self.max_bytes:
+                self._total = self._evict()
+                
+    def _evict(self) -> int:
+        """
+        Delete least recently used entries until the store fits its budget.
+        
+        The directory is listed again, so entries other processes added or
+        removed are accounted for.
+        
+        Returns:
+            Bytes left in the store
+        """
+        entries = self._entries()
+        total = sum(st.st_size for _, st in entries)
+        if total <= self.max_bytes:
+            return total
+        for path, st in sorted(entries, key=lambda e: e[1].st_mtime):
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= st.st_size
+            if total <= self.max_bytes:
+                break
+        return total
+                
+    def clear(self) -> None:
+        """Remove every stored transcript and reset the hit and miss counters."""
+        with self._size_lock:
+            for path, _ in self._entries():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._total = None
+        if (self.directory / 'stats.sqlite3').exists():
+            try:
+                self._execute('DELETE FROM stats')
+            except sqlite3.Error:
+                pass
+                
+    def stats(self) -> Dict[str, int]:
+        """
+        Return store statistics.
+        
+        Returns:
+            Dictionary with entry count, total bytes, byte budget, hit and miss counters
+        """
+        entries = self._entries() if self.directory.exists() else []
+        counters = {}
+        stats_path = self.directory / 'stats.sqlite3'
+        if stats_path.exists():
+            try:
+                counters = dict(self._execute('SELECT name, value FROM stats'))
+            except sqlite3.Error:
+                pass
+        return {
+            'entries': len(entries),
+            'bytes': sum(st.st_size for _, st in entries),
+            'max_bytes': self.max_bytes,
+            'hits': counters.get('transcript_hits', 0),
+            'misses': counters.get('transcript_misses', 0),
+        }
+
+    def close(self) -> None:
+        """Close the stats connection; it is reopened if the store is used again."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -4,10 +4,220 @@ Media converter and compressor module.
 
 import sys
 import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
 from pathlib import Path
-from typing import List
-import subprocess
-from .utils import print_error, print_success, print_info, format_file_size
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple
+from .ffmpeg import (
+    FFmpegCapabilities, FFmpegError, ProgressEvent, StreamInfo,
+    probe_ffmpeg, probe_media, probe_streams, run_ffmpeg
+)
+from .manifest import CompressManifest, fingerprint
+from .trace import span
+from .utils import print_error, print_success, print_info, format_duration, format_file_size
+
+
+# CRF values (lower = better quality, larger file)
+CRF_VALUES = {
+    "low": "28",      # More compression, lower quality
+    "medium": "23",   # Balanced
+    "high": "18"      # Less compression, higher quality
+}
+
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv']
+
+VIDEO_ENCODER = 'libx264'
+COMPRESS_PRESET = 'medium'
+
+# Chunked compression: segments per parallel job (for load balancing) and
+# the shortest segment worth a separate FFmpeg process
+CHUNKS_PER_JOB = 2
+MIN_CHUNK_SECONDS = 30.0
+
+# Predictive compression: short windows spread through the file are
+# encoded to estimate the size of the full output
+SAMPLE_COUNT = 3
+SAMPLE_SECONDS = 6.0
+DEFAULT_MIN_GAIN = 10.0   # Percent
+
+# Settings tried, fastest preset first, when searching for a size goal
+PRESET_LADDER = ('veryfast', 'faster', 'fast', 'medium', 'slow')
+CRF_STEPS = (0, 3, 6)     # Added to the CRF of the chosen quality
+
+# FFmpeg muxer used for each output extension, where the names differ
+MUXERS = {
+    'mkv': 'matroska',
+    'm4a': 'ipod',
+    'aac': 'adts',
+    'wmv': 'asf',
+    'oga': 'ogg',
+    'ts': 'mpegts',
+}
+
+# Codecs each container accepts as-is, by stream type; None accepts any
+# codec. Stream types missing from a container are dropped.
+CONTAINER_CODECS: Dict[str, Dict[str, Optional[FrozenSet[str]]]] = {
+    'mp4': {
+        'video': frozenset(['h264', 'hevc', 'mpeg4', 'av1', 'vp9', 'mpeg2video']),
+        'audio': frozenset(['aac', 'mp3', 'ac3', 'eac3', 'opus', 'alac', 'flac']),
+        'subtitle': frozenset(['mov_text']),
+    },
+    'mov': {
+        'video': frozenset(['h264', 'hevc', 'mpeg4', 'prores', 'mjpeg', 'mpeg2video']),
+        'audio': frozenset(['aac', 'mp3', 'alac', 'ac3', 'pcm_s16le', 'pcm_s24le']),
+        'subtitle': frozenset(['mov_text']),
+    },
+    'mkv': {
+        'video': None,
+        'audio': None,
+        'subtitle': frozenset(['subrip', 'ass', 'ssa', 'webvtt', 'dvd_subtitle',
+                               'hdmv_pgs_subtitle', 'dvb_subtitle']),
+    },
+    'webm': {
+        'video': frozenset(['vp8', 'vp9', 'av1']),
+        'audio': frozenset(['opus', 'vorbis']),
+        'subtitle': frozenset(['webvtt']),
+    },
+    'avi': {
+        'video': frozenset(['mpeg4', 'h264', 'mjpeg', 'msmpeg4v2', 'msmpeg4v3']),
+        'audio': frozenset(['mp3', 'ac3', 'pcm_s16le']),
+    },
+    'flv': {
+        'video': frozenset(['h264', 'flv1']),
+        'audio': frozenset(['aac', 'mp3']),
+    },
+    'ts': {
+        'video': frozenset(['h264', 'hevc', 'mpeg2video']),
+        'audio': frozenset(['aac', 'mp3', 'mp2', 'ac3', 'eac3']),
+    },
+    'mp3': {'audio': frozenset(['mp3'])},
+    'm4a': {'audio': frozenset(['aac', 'alac'])},
+    'aac': {'audio': frozenset(['aac'])},
+    'wav': {'audio': frozenset(['pcm_s16le', 'pcm_s24le', 'pcm_f32le', 'pcm_u8'])},
+    'flac': {'audio': frozenset(['flac'])},
+    'ogg': {'audio': frozenset(['vorbis', 'opus', 'flac'])},
+    'opus': {'audio': frozenset(['opus'])},
+}
+
+# Subtitle codecs FFmpeg can convert between; bitmap subtitles cannot be
+TEXT_SUBTITLES = frozenset(['subrip', 'ass', 'ssa', 'webvtt', 'mov_text', 'text'])
+
+PLAN_DESCRIPTIONS = {
+    'copy': "remux, all streams copied",
+    'audio': "audio transcode, video copied",
+    'subtitles': "remux, subtitles converted",
+    'full': "full re-encode",
+}
+
+
+ProgressCallback = Callable[[ProgressEvent], None]
+
+
+class ConversionError(Exception):
+    """Raised when an FFmpeg conversion or compression fails."""
+
+
+@dataclass
+class CompressResult:
+    """Outcome of compressing a single file."""
+
+    input_file: Path
+    output_file: Path
+    original_size: int = 0
+    new_size: int = 0
+    elapsed: float = 0.0
+    error: Optional[str] = None
+    mtime_ns: int = 0
+    fingerprint: Optional[str] = None
+    predicted_size: Optional[int] = None
+    skipped: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    @property
+    def reduction(self) -> float:
+        if not self.original_size:
+            return 0.0
+        return ((self.original_size - self.new_size) / self.original_size) * 100
+
+
+@dataclass(frozen=True)
+class PredictOptions:
+    """Goals for predictive compression."""
+
+    min_gain: float = DEFAULT_MIN_GAIN
+    target_size: Optional[int] = None    # Bytes
+    max_bitrate: Optional[int] = None    # Bits per second
+
+    def budget(self, duration: float) -> Optional[int]:
+        """Return the largest acceptable output size in bytes, if there is a goal."""
+        limits = []
+        if self.target_size:
+            limits.append(self.target_size)
+        if self.max_bitrate:
+            limits.append(int(self.max_bitrate * duration / 8))
+        return min(limits) if limits else None
+
+
+@dataclass
+class Prediction:
+    """Encoder settings chosen by sampling, with the output size they predict."""
+
+    crf: str
+    preset: str
+    size: int
+    original_size: int
+    on_target: bool = True
+
+    @property
+    def reduction(self) -> float:
+        if not self.original_size:
+            return 0.0
+        return ((self.original_size - self.size) / self.original_size) * 100
+
+
+@dataclass
+class StreamPlan:
+    """What to do with one input stream: 'copy', 'transcode' or 'drop'."""
+
+    stream: StreamInfo
+    action: str
+
+
+@dataclass
+class ConversionPlan:
+    """Per-stream decisions for converting a file to another container."""
+
+    output_format: str
+    streams: Optional[List[StreamPlan]] = None
+
+    @property
+    def mode(self) -> str:
+        """
+        Overall cost of the plan.
+        
+        'copy' when every kept stream is copied, 'subtitles' when only
+        subtitle streams are converted, 'audio' when audio is re-encoded but
+        the video is copied, and 'full' when video is re-encoded or the input
+        streams are unknown.
+        """
+        if self.streams is None:
+            return 'full'
+        transcoded = {p.stream.codec_type for p in self.streams if p.action == 'transcode'}
+        if not transcoded:
+            return 'copy'
+        if 'video' in transcoded:
+            return 'full'
+        return 'audio' if 'audio' in transcoded else 'subtitles'
+
+    @property
+    def kept(self) -> List[StreamPlan]:
+        return [p for p in self.streams or [] if p.action != 'drop']
 
 
 def check_ffmpeg() -> bool:
@@ -17,28 +227,159 @@ def check_ffmpeg() -> bool:
     Returns:
         True if FFmpeg is available, False otherwise
     """
-    try:
-        subprocess.run(['ffmpeg', '-version'], 
-                      stdout=subprocess.PIPE, 
-                      stderr=subprocess.PIPE,
-                      check=True)
-        return True
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        return False
+    return probe_ffmpeg() is not None
 
 
-def convert_file(input_file: str, output_format: str) -> None:
+def require_ffmpeg(encoders: Iterable[str] = (), muxers: Iterable[str] = ()) -> FFmpegCapabilities:
     """
-    Convert media file to a different format.
+    Exit with a clear message unless FFmpeg supports what a command needs.
     
     Args:
-        input_file: Path to input file
-        output_format: Target format (e.g., 'mp3', 'mp4', 'avi')
+        encoders: Encoders the command will use
+        muxers: Muxers (output formats) the command will use
+        
+    Returns:
+        Capabilities of the installed FFmpeg
     """
-    if not check_ffmpeg():
+    caps = probe_ffmpeg()
+    if caps is None:
         print_error("FFmpeg is not installed. Please install FFmpeg to use this feature.")
         print_info("Download from: https://ffmpeg.org/download.html")
         sys.exit(1)
+        
+    for name in encoders:
+        if not caps.has_encoder(name):
+            print_error(f"FFmpeg {caps.version} was built without the {name} encoder.")
+            sys.exit(1)
+    for name in muxers:
+        if not caps.has_muxer(name):
+            print_error(f"FFmpeg {caps.version} cannot write {name} files.")
+            sys.exit(1)
+    return caps
+
+
+def _stream_action(stream: StreamInfo, codecs: Dict[str, Optional[FrozenSet[str]]]) -> str:
+    """Decide whether a stream can be copied into a container."""
+    if stream.attached_pic or stream.codec_type not in codecs:
+        return 'drop'
+    accepted = codecs[stream.codec_type]
+    if accepted is None or stream.codec_name in accepted:
+        return 'copy'
+    if stream.codec_type == 'subtitle' and stream.codec_name not in TEXT_SUBTITLES:
+        return 'drop'
+    return 'transcode'
+
+
+def plan_conversion(input_path: Path, output_format: str) -> ConversionPlan:
+    """
+    Inspect the input streams and decide how to convert each one.
+    
+    Streams whose codec the target container accepts are copied, other
+    audio, video and text subtitle streams are re-encoded with the
+    container's default encoder, and anything else is dropped. If the
+    target container or the input streams are unknown, the plan leaves
+    every decision to FFmpeg.
+    
+    Args:
+        input_path: File to convert
+        output_format: Target format (e.g., 'mp3', 'mp4', 'mkv')
+        
+    Returns:
+        Conversion plan
+    """
+    codecs = CONTAINER_CODECS.get(output_format)
+    with span('plan', 'converter', format=output_format):
+        streams = probe_streams(str(input_path)) if codecs else None
+    if streams is None:
+        return ConversionPlan(output_format)
+    return ConversionPlan(output_format, [StreamPlan(s, _stream_action(s, codecs)) for s in streams])
+
+
+def build_convert_args(plan: ConversionPlan, input_path: Path, output_file: Path) -> List[str]:
+    """Return the FFmpeg arguments that carry out ``plan``."""
+    args = ['-i', str(input_path)]
+    if plan.streams is not None:
+        for out_index, p in enumerate(plan.kept):
+            args.extend(['-map', f'0:{p.stream.index}'])
+            if p.action == 'copy':
+                args.extend([f'-c:{out_index}', 'copy'])
+    args.extend(['-y', str(output_file)])  # Overwrite output file if exists
+    return args
+
+
+def convert_media(input_path: Path, output_format: str,
+                  progress_callback: Optional[ProgressCallback] = None) -> Path:
+    """
+    Convert a file next to itself without printing, for batch callers.
+    
+    A file that already has the target extension is returned unchanged.
+    FFmpeg's support for ``output_format`` must have been checked by the caller.
+    
+    Args:
+        input_path: File to convert
+        output_format: Target format (e.g., 'mp3', 'mp4')
+        progress_callback: Called with FFmpeg progress events
+        
+    Returns:
+        Path of the converted file
+        
+    Raises:
+        ConversionError: If the file has no streams the target can hold
+        FFmpegError: If FFmpeg fails
+    """
+    output_format = output_format.lower().lstrip('.')
+    output_file = input_path.with_suffix(f'.{output_format}')
+    if output_file == input_path:
+        return input_path
+        
+    plan = plan_conversion(input_path, output_format)
+    if plan.streams is not None and not plan.kept:
+        raise ConversionError(f"{input_path.name} has no streams that can be written to {output_format}")
+    run_ffmpeg(build_convert_args(plan, input_path, output_file), progress_callback)
+    return output_file
+
+
+def print_plan(plan: ConversionPlan) -> None:
+    """Print the per-stream decisions of a conversion plan."""
+    if plan.streams is None:
+        print_info(f"Plan: {PLAN_DESCRIPTIONS['full']} (input streams not inspected)")
+        return
+    print_info(f"Plan: {PLAN_DESCRIPTIONS[plan.mode]}")
+    for p in plan.streams:
+        print(f"  #{p.stream.index} {p.stream.codec_type} {p.stream.codec_name}: {p.action}")
+
+
+def print_ffmpeg_progress(event: ProgressEvent) -> None:
+    """Progress callback that keeps a live FFmpeg progress line on screen."""
+    if event.done:
+        position = "100.0%"
+    elif event.percent is not None:
+        position = f"{event.percent:.1f}%"
+    else:
+        position = format_duration(int(event.out_time))
+    speed = f"{event.speed:.2f}x" if event.speed else "N/A"
+    eta = format_duration(int(event.eta)) if event.eta is not None else "N/A"
+    print(f"\rEncoding: {position} at {speed} ({event.fps:.0f} fps) ETA: {eta}", end='', flush=True)
+    if event.done:
+        print()
+
+
+def convert_file(input_file: str, output_format: str, plan_only: bool = False,
+                 progress_callback: Optional[ProgressCallback] = print_ffmpeg_progress) -> None:
+    """
+    Convert media file to a different format.
+    
+    Streams that the target container can hold are copied instead of
+    re-encoded, so a remux such as mkv to mp4 only rewrites the container.
+    
+    Args:
+        input_file: Path to input file
+        output_format: Target format (e.g., 'mp3', 'mp4', 'avi')
+        plan_only: If True, print the per-stream plan without converting
+        progress_callback: Called with FFmpeg progress events (default: live progress line)
+    """
+    output_format = output_format.lower().lstrip('.')
+    require_ffmpeg(muxers=[MUXERS.get(output_format, output_format)])
     
     input_path = Path(input_file)
     
@@ -49,21 +390,18 @@ def convert_file(input_file: str, output_format: str) -> None:
     # Create output filename
     output_file = input_path.with_suffix(f'.{output_format}')
     
-    print_info(f"Converting {input_path.name} to {output_format}...")
+    plan = plan_conversion(input_path, output_format)
+    if plan_only:
+        print_plan(plan)
+        return
+    if plan.streams is not None and not plan.kept:
+        print_error(f"{input_path.name} has no streams that can be written to {output_format}")
+        sys.exit(1)
+    
+    print_info(f"Converting {input_path.name} to {output_format} ({PLAN_DESCRIPTIONS[plan.mode]})...")
     
     try:
-        # Basic conversion command
-        cmd = [
-            'ffmpeg',
-            '-i', str(input_path),
-            '-y',  # Overwrite output file if exists
-            str(output_file)
-        ]
-        
-        result = subprocess.run(cmd, 
-                              capture_output=True, 
-                              text=True,
-                              check=True)
+        run_ffmpeg(build_convert_args(plan, input_path, output_file), progress_callback)
         
         print_success(f"Converted to {output_file}")
         
@@ -73,26 +411,318 @@ def convert_file(input_file: str, output_format: str) -> None:
         print_info(f"Original: {format_file_size(original_size)}")
         print_info(f"Converted: {format_file_size(new_size)}")
         
-    except subprocess.CalledProcessError as e:
-        print_error(f"Conversion failed: {e.stderr}")
+    except FFmpegError as e:
+        print_error(f"Conversion failed: {e}")
         sys.exit(1)
     except Exception as e:
         print_error(f"An error occurred: {str(e)}")
         sys.exit(1)
 
 
-def compress_file(input_file: str, quality: str = "medium") -> None:
+
+
+def ffmpeg_thread_budget(jobs: int) -> int:
+    """
+    Split the available CPU cores between concurrent FFmpeg processes.
+    
+    Args:
+        jobs: Number of FFmpeg processes running at the same time
+        
+    Returns:
+        Value for FFmpeg's ``-threads`` option (at least 1)
+    """
+    cores = os.cpu_count() or 1
+    return max(1, cores // max(1, jobs))
+
+
+def compressed_output_path(input_path: Path) -> Path:
+    """Return the output path used when compressing ``input_path``."""
+    return input_path.with_name(f"{input_path.stem}_compressed{input_path.suffix}")
+
+
+def partial_output_path(input_path: Path) -> Path:
+    """Return the hidden path an output is written to before being renamed into place."""
+    return input_path.with_name(f".{input_path.stem}_compressed.partial{input_path.suffix}")
+
+
+def compress_settings(quality: str, predict: Optional[PredictOptions] = None) -> Dict[str, Any]:
+    """Return the encoder settings that determine a compressed output."""
+    settings: Dict[str, Any] = {
+        'encoder': VIDEO_ENCODER,
+        'crf': CRF_VALUES.get(quality, "23"),
+        'preset': COMPRESS_PRESET,
+    }
+    if predict is not None:
+        settings['predict'] = asdict(predict)
+    return settings
+
+
+def _compress_args(input_path: Path, output_file: Path, crf: str, preset: str,
+                   threads: Optional[int] = None) -> List[str]:
+    args = [
+        '-i', str(input_path),
+        '-vcodec', VIDEO_ENCODER,
+        '-crf', crf,
+        '-preset', preset,
+    ]
+    if threads:
+        args.extend(['-threads', str(threads)])
+    args.extend(['-y', str(output_file)])
+    return args
+
+
+def _compress(input_path: Path, output_file: Path, quality: str = "medium",
+              threads: Optional[int] = None,
+              progress_callback: Optional[ProgressCallback] = None,
+              crf: Optional[str] = None, preset: Optional[str] = None) -> None:
+    """
+    Run FFmpeg to compress ``input_path`` into ``output_file``.
+    
+    ``crf`` and ``preset`` override the values implied by ``quality``.
+    
+    Raises:
+        ConversionError: If FFmpeg exits with an error
+    """
+    crf = crf or CRF_VALUES.get(quality, "23")
+    
+    preset = preset or COMPRESS_PRESET
+    args = _compress_args(input_path, output_file, crf, preset, threads)
+    
+    try:
+        with span('encode', 'converter', input=input_path.name, crf=crf, preset=preset, threads=threads):
+            run_ffmpeg(args, progress_callback)
+    except FFmpegError as e:
+        raise ConversionError(str(e)) from e
+
+
+def sample_windows(duration: float) -> List[Tuple[float, float]]:
+    """
+    Return the (start, length) windows sampled to predict the output size.
+    
+    Short files are sampled as a whole.
+    """
+    if duration <= SAMPLE_COUNT * SAMPLE_SECONDS * 2:
+        return [(0.0, duration)]
+    return [(duration * (i + 1) / (SAMPLE_COUNT + 1) - SAMPLE_SECONDS / 2, SAMPLE_SECONDS)
+            for i in range(SAMPLE_COUNT)]
+
+
+def _predict_size(input_path: Path, duration: float, sample_dir: Path, crf: str, preset: str,
+                  threads: Optional[int] = None) -> int:
+    """Encode the sample windows and extrapolate their bitrate to the whole file."""
+    encoded_bytes = 0
+    encoded_seconds = 0.0
+    for i, (start, length) in enumerate(sample_windows(duration)):
+        sample = sample_dir / f"sample_{i}{input_path.suffix}"
+        events: List[ProgressEvent] = []
+        try:
+            run_ffmpeg(['-ss', f'{start:.3f}', '-t', f'{length:.3f}'] +
+                       _compress_args(input_path, sample, crf, preset, threads), events.append)
+        except FFmpegError as e:
+            raise ConversionError(str(e)) from e
+        encoded_bytes += sample.stat().st_size
+        encoded_seconds += events[-1].out_time if events and events[-1].out_time else length
+    return int(encoded_bytes / encoded_seconds * duration) if encoded_seconds else 0
+
+
+def predict_compression(input_path: Path, quality: str = "medium",
+                        options: Optional[PredictOptions] = None,
+                        threads: Optional[int] = None) -> Prediction:
+    """
+    Pick encoder settings for a file by encoding a few short samples.
+    
+    Without a size goal, the settings of ``quality`` are sampled to
+    predict the output size. With a ``target_size`` or ``max_bitrate``,
+    presets are tried from fastest to slowest, and within each preset
+    CRF values from the quality's own upwards; the first setting predicted
+    to fit is chosen. If none fits, the smallest prediction is returned
+    with ``on_target`` unset.
+    
+    Args:
+        input_path: Video to compress
+        quality: Compression quality (low, medium, high)
+        options: Prediction goals
+        threads: FFmpeg ``-threads`` value for the sample encodes
+        
+    Returns:
+        Chosen settings and predicted output size
+        
+    Raises:
+        ConversionError: If the input cannot be probed or sampled
+    """
+    options = options or PredictOptions()
+    media = probe_media(str(input_path))
+    if media is None or not media.duration:
+        raise ConversionError(f"Cannot determine the duration of {input_path.name}")
+    original_size = input_path.stat().st_size
+    base_crf = int(CRF_VALUES.get(quality, "23"))
+    budget = options.budget(media.duration)
+    
+    if budget is None:
+        candidates = [(str(base_crf), COMPRESS_PRESET)]
+    else:
+        candidates = [(str(base_crf + step), preset) for preset in PRESET_LADDER for step in CRF_STEPS]
+        
+    best = None
+    with tempfile.TemporaryDirectory(prefix=f".{input_path.stem}_samples.",
+                                     dir=str(input_path.parent)) as tmp:
+        for crf, preset in candidates:
+            with span('predict', 'converter', input=input_path.name, crf=crf, preset=preset) as sampled:
+                size = _predict_size(input_path, media.duration, Path(tmp), crf, preset, threads)
+                sampled.set(size=size)
+            prediction = Prediction(crf=crf, preset=preset, size=size, original_size=original_size)
+            if budget is None or size <= budget:
+                return prediction
+            if best is None or size < best.size:
+                best = prediction
+    best.on_target = False
+    return best
+
+
+class _ChunkProgress:
+    """Merge the progress of concurrently encoded chunks into one event stream."""
+    
+    def __init__(self, duration: float, callback: ProgressCallback):
+        self.duration = duration
+        self.callback = callback
+        self.out_times: Dict[int, float] = {}
+        self.frames: Dict[int, int] = {}
+        self.start = time.monotonic()
+        self._lock = threading.Lock()
+        
+    def _emit(self, done: bool = False) -> None:
+        elapsed = max(time.monotonic() - self.start, 1e-6)
+        out_time = sum(self.out_times.values())
+        frames = sum(self.frames.values())
+        self.callback(ProgressEvent(frame=frames, fps=frames / elapsed, speed=out_time / elapsed,
+                                    out_time=out_time, duration=self.duration, done=done))
+        
+    def for_chunk(self, index: int) -> ProgressCallback:
+        def update(event: ProgressEvent) -> None:
+            with self._lock:
+                self.out_times[index] = event.out_time
+                self.frames[index] = event.frame
+                self._emit()
+        return update
+        
+    def finish(self) -> None:
+        with self._lock:
+            self._emit(done=True)
+
+
+def _compress_chunked(input_path: Path, output_file: Path, quality: str, jobs: int,
+                      progress_callback: Optional[ProgressCallback] = None,
+                      crf: Optional[str] = None, preset: Optional[str] = None) -> int:
+    """
+    Compress a single video by encoding keyframe-aligned chunks in parallel.
+    
+    The video stream is cut at keyframes into segments without
+    re-encoding, the segments are encoded by up to ``jobs`` concurrent
+    FFmpeg processes, and the results are joined losslessly with the
+    concat demuxer. Audio never goes through the segmenter: it is taken
+    from the original input in the final mux, so no gaps or priming
+    samples appear at chunk boundaries.
+    
+    Returns:
+        Number of chunks encoded
+        
+    Raises:
+        ConversionError: If the input cannot be probed or FFmpeg fails
+    """
+    media = probe_media(str(input_path))
+    if media is None or not media.duration or not any(
+            st.codec_type == 'video' and not st.attached_pic for st in media.streams):
+        raise ConversionError(f"Cannot find the video stream and duration of {input_path.name}")
+        
+    segment_time = max(MIN_CHUNK_SECONDS, media.duration / (jobs * CHUNKS_PER_JOB))
+    threads = ffmpeg_thread_budget(jobs)
+    
+    with tempfile.TemporaryDirectory(prefix=f".{input_path.stem}_chunks.",
+                                     dir=str(input_path.parent)) as tmp:
+        tmp_dir = Path(tmp)
+        try:
+            with span('segment', 'converter', input=input_path.name, segment_time=segment_time):
+                run_ffmpeg([
+                    '-i', str(input_path),
+                    '-map', '0:v:0', '-c', 'copy',
+                    '-f', 'segment', '-segment_time', f'{segment_time:.3f}', '-reset_timestamps', '1',
+                    str(tmp_dir / 'part_%05d.mkv'),
+                ])
+        except FFmpegError as e:
+            raise ConversionError(str(e)) from e
+            
+        parts = sorted(tmp_dir.glob('part_*.mkv'))
+        encoded = [part.with_name(f"enc_{part.name}") for part in parts]
+        progress = _ChunkProgress(media.duration, progress_callback) if progress_callback else None
+        
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [
+                executor.submit(_compress, part, out, quality, threads,
+                                progress.for_chunk(i) if progress else None, crf, preset)
+                for i, (part, out) in enumerate(zip(parts, encoded))
+            ]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+        if progress:
+            progress.finish()
+            
+        concat_list = tmp_dir / 'concat.txt'
+        concat_list.write_text(''.join(f"file '{out.name}'\n" for out in encoded), encoding='utf-8')
+        
+        args = ['-f', 'concat', '-safe', '0', '-i', str(concat_list), '-i', str(input_path),
+                '-map', '0:v:0', '-c:0', 'copy', '-map_metadata', '1']
+        codecs = CONTAINER_CODECS.get(output_file.suffix.lstrip('.').lower())
+        out_index = 1
+        for stream in media.streams:
+            if stream.codec_type != 'audio':
+                continue
+            action = _stream_action(stream, codecs) if codecs else 'transcode'
+            if action == 'drop':
+                continue
+            args.extend(['-map', f'1:{stream.index}'])
+            if action == 'copy':
+                args.extend([f'-c:{out_index}', 'copy'])
+            out_index += 1
+        args.extend(['-y', str(output_file)])
+        
+        try:
+            with span('concat', 'converter', chunks=len(parts)):
+                run_ffmpeg(args)
+        except FFmpegError as e:
+            raise ConversionError(str(e)) from e
+            
+    return len(parts)
+
+
+def describe_prediction(prediction: Prediction) -> str:
+    """Return a one-line description of a size prediction."""
+    return (f"{format_file_size(prediction.size)} ({prediction.reduction:.1f}% reduction) "
+            f"with preset {prediction.preset}, CRF {prediction.crf}")
+
+
+def compress_file(input_file: str, quality: str = "medium",
+                  progress_callback: Optional[ProgressCallback] = print_ffmpeg_progress,
+                  chunked: bool = False, jobs: Optional[int] = None,
+                  predict: Optional[PredictOptions] = None) -> None:
     """
     Compress a video file.
     
     Args:
         input_file: Path to input video file
         quality: Compression quality (low, medium, high)
+        progress_callback: Called with FFmpeg progress events (default: live progress line)
+        chunked: If True, split the video at keyframes and encode the
+            chunks in parallel
+        jobs: Number of chunks to encode at once (default: one per CPU core)
+        predict: If given, sample-encode the file first to pick the settings
+            and skip it when the predicted gain is too small
     """
-    if not check_ffmpeg():
-        print_error("FFmpeg is not installed. Please install FFmpeg to use this feature.")
-        print_info("Download from: https://ffmpeg.org/download.html")
-        sys.exit(1)
+    require_ffmpeg(encoders=[VIDEO_ENCODER])
     
     input_path = Path(input_file)
     
@@ -101,34 +731,36 @@ def compress_file(input_file: str, quality: str = "medium") -> None:
         sys.exit(1)
     
     # Create output filename
-    output_file = input_path.with_stem(f"{input_path.stem}_compressed")
-    
-    # CRF values (lower = better quality, larger file)
-    crf_values = {
-        "low": "28",      # More compression, lower quality
-        "medium": "23",   # Balanced
-        "high": "18"      # Less compression, higher quality
-    }
+    output_file = compressed_output_path(input_path)
     
-    crf = crf_values.get(quality, "23")
-    
-    print_info(f"Compressing {input_path.name} (quality: {quality})...")
+    if jobs is not None and jobs < 1:
+        print_error("--jobs must be at least 1")
+        sys.exit(1)
     
     try:
-        cmd = [
-            'ffmpeg',
-            '-i', str(input_path),
-            '-vcodec', 'libx264',
-            '-crf', crf,
-            '-preset', 'medium',
-            '-y',
-            str(output_file)
-        ]
-        
-        result = subprocess.run(cmd,
-                              capture_output=True,
-                              text=True,
-                              check=True)
+        crf = preset = None
+        prediction = None
+        if predict is not None:
+            print_info(f"Sampling {input_path.name} to predict the output size...")
+            prediction = predict_compression(input_path, quality, predict)
+            print_info(f"Predicted {describe_prediction(prediction)}")
+            if not prediction.on_target:
+                print_error("No tried setting is predicted to meet the size goal; using the smallest")
+            if prediction.reduction < predict.min_gain:
+                print_info(f"Skipping {input_path.name}: predicted gain is below {predict.min_gain:g}%")
+                return
+            crf, preset = prediction.crf, prediction.preset
+            
+        print_info(f"Compressing {input_path.name} (quality: {quality})...")
+    
+        if chunked:
+            jobs = jobs or os.cpu_count() or 1
+            chunks = _compress_chunked(input_path, output_file, quality, jobs, progress_callback,
+                                       crf, preset)
+            print_info(f"Encoded {chunks} chunk(s) with {jobs} parallel job(s)")
+        else:
+            _compress(input_path, output_file, quality, progress_callback=progress_callback,
+                      crf=crf, preset=preset)
         
         print_success(f"Compressed to {output_file}")
         
@@ -138,24 +770,136 @@ def compress_file(input_file: str, quality: str = "medium") -> None:
         reduction = ((original_size - new_size) / original_size) * 100
         
         print_info(f"Original: {format_file_size(original_size)}")
-        print_info(f"Compressed: {format_file_size(new_size)}")
+        if prediction is not None:
+            print_info(f"Compressed: {format_file_size(new_size)} "
+                       f"(predicted {format_file_size(prediction.size)})")
+        else:
+            print_info(f"Compressed: {format_file_size(new_size)}")
         print_info(f"Size reduction: {reduction:.1f}%")
         
-    except subprocess.CalledProcessError as e:
-        print_error(f"Compression failed: {e.stderr}")
+    except ConversionError as e:
+        print_error(f"Compression failed: {e}")
         sys.exit(1)
     except Exception as e:
         print_error(f"An error occurred: {str(e)}")
         sys.exit(1)
 
 
-def compress_folder(folder_path: str, quality: str = "medium") -> None:
+def _compress_worker(input_path: Path, quality: str, threads: Optional[int],
+                     predict: Optional[PredictOptions] = None) -> CompressResult:
+    """
+    Compress one file for a batch, capturing failures in the result.
+    
+    The output is encoded under a hidden temporary name and only renamed
+    into place once FFmpeg succeeds, so an interrupted run never leaves a
+    truncated output behind under the final name. With ``predict``, the
+    file is sampled first and marked as skipped if not worth compressing.
+    """
+    output_file = compressed_output_path(input_path)
+    partial_file = partial_output_path(input_path)
+    result = CompressResult(input_file=input_path, output_file=output_file)
+    start = time.monotonic()
+    
+    try:
+        st = input_path.stat()
+        result.original_size = st.st_size
+        result.mtime_ns = st.st_mtime_ns
+        result.fingerprint = fingerprint(input_path)
+        crf = preset = None
+        if predict is not None:
+            prediction = predict_compression(input_path, quality, predict, threads)
+            result.predicted_size = prediction.size
+            if prediction.reduction < predict.min_gain:
+                result.skipped = True
+                result.elapsed = time.monotonic() - start
+                return result
+            crf, preset = prediction.crf, prediction.preset
+        try:
+            _compress(input_path, partial_file, quality, threads, crf=crf, preset=preset)
+            os.replace(partial_file, output_file)
+        finally:
+            if partial_file.exists():
+                partial_file.unlink()
+        result.new_size = output_file.stat().st_size
+    except ConversionError as e:
+        result.error = str(e).strip().splitlines()[-1] if str(e).strip() else "FFmpeg failed"
+    except Exception as e:
+        result.error = str(e)
+    
+    result.elapsed = time.monotonic() - start
+    return result
+
+
+def find_video_files(folder: Path) -> List[Path]:
+    """
+    Find the video files in a folder, skipping compressed and hidden files.
+    
+    Args:
+        folder: Folder to scan
+        
+    Returns:
+        Sorted list of video file paths
+    """
+    video_files = []
+    for ext in VIDEO_EXTENSIONS:
+        video_files.extend(folder.glob(f"*{ext}"))
+    return sorted(f for f in video_files
+                  if not f.stem.endswith("_compressed") and not f.name.startswith("."))
+
+
+def print_compress_summary(results: List[CompressResult], elapsed: float) -> None:
+    """Print aggregate results and throughput for a batch compression."""
+    succeeded = [r for r in results if r.ok and not r.skipped]
+    skipped = [r for r in results if r.skipped]
+    failed = [r for r in results if not r.ok]
+    total_in = sum(r.original_size for r in succeeded)
+    total_out = sum(r.new_size for r in succeeded)
+    
+    print(f"\n{'=' * 80}")
+    print_success(f"Compressed {len(succeeded)}/{len(results)} video file(s) in {elapsed:.1f}s")
+    if skipped:
+        print_info(f"Skipped {len(skipped)} file(s) predicted not to shrink enough")
+    if succeeded:
+        reduction = ((total_in - total_out) / total_in) * 100 if total_in else 0.0
+        throughput = total_in / elapsed if elapsed > 0 else 0.0
+        print_info(f"Input: {format_file_size(total_in)}")
+        print_info(f"Output: {format_file_size(total_out)} ({reduction:.1f}% smaller)")
+        print_info(f"Throughput: {format_file_size(throughput)}/s, "
+                   f"{len(succeeded) / elapsed if elapsed > 0 else 0.0:.2f} file(s)/s")
+    predicted = [r for r in succeeded if r.predicted_size is not None]
+    if predicted:
+        total_predicted = sum(r.predicted_size for r in predicted)
+        total_actual = sum(r.new_size for r in predicted)
+        errors = [abs(r.new_size - r.predicted_size) / r.new_size * 100
+                  for r in predicted if r.new_size]
+        print_info(f"Predicted: {format_file_size(total_predicted)}, "
+                   f"actual: {format_file_size(total_actual)} "
+                   f"(mean error {sum(errors) / len(errors) if errors else 0.0:.1f}%)")
+    for r in failed:
+        print_error(f"{r.input_file.name}: {r.error}")
+
+
+def compress_folder(folder_path: str, quality: str = "medium", jobs: int = 1,
+                    force: bool = False, state_dir: Optional[str] = None,
+                    predict: Optional[PredictOptions] = None) -> None:
     """
     Compress all video files in a folder.
     
+    Files are encoded by up to ``jobs`` concurrent FFmpeg processes, each
+    given an equal share of the CPU cores. A failing file is reported in the
+    final summary instead of aborting the remaining files.
+    
+    Finished files are recorded in a work manifest, so a rerun skips
+    inputs that are unchanged and whose outputs are still intact.
+    
     Args:
         folder_path: Path to folder containing videos
         quality: Compression quality (low, medium, high)
+        jobs: Number of files to compress in parallel
+        force: If True, recompress every file regardless of the manifest
+        state_dir: Directory to keep the manifest in (default: the folder itself)
+        predict: If given, sample-encode each file first to pick its
+            settings, and skip files predicted not to shrink enough
     """
     folder = Path(folder_path)
     
@@ -163,22 +907,70 @@ def compress_folder(folder_path: str, quality: str = "medium") -> None:
         print_error(f"Folder not found: {folder_path}")
         sys.exit(1)
     
-    # Find all video files
-    video_extensions = ['.mp4', '.avi', '.mov', '.mkv', '.flv', '.wmv']
-    video_files = []
+    if jobs < 1:
+        print_error("--jobs must be at least 1")
+        sys.exit(1)
     
-    for ext in video_extensions:
-        video_files.extend(folder.glob(f"*{ext}"))
+    require_ffmpeg(encoders=[VIDEO_ENCODER])
+    
+    manifest = CompressManifest(folder, Path(state_dir) if state_dir else None)
+    manifest.load()
+    settings = compress_settings(quality, predict)
+    
+    # Find all video files, leaving out outputs recorded by earlier runs
+    outputs = manifest.outputs()
+    video_files = [f for f in find_video_files(folder) if f.name not in outputs]
     
     if not video_files:
         print_error(f"No video files found in {folder_path}")
         sys.exit(1)
     
     print_info(f"Found {len(video_files)} video file(s)")
+    if not force:
+        pending = [f for f in video_files if not manifest.is_done(f, settings)]
+        if len(pending) < len(video_files):
+            print_info(f"Skipping {len(video_files) - len(pending)} file(s) already compressed "
+                       f"(use --force to redo them)")
+        video_files = pending
+        if not video_files:
+            print_success("Nothing to do")
+            return
     
-    for video_file in video_files:
-        print(f"\n{'=' * 80}")
-        compress_file(str(video_file), quality)
+    jobs = min(jobs, len(video_files))
+    threads = ffmpeg_thread_budget(jobs) if jobs > 1 else None
     
-    print(f"\n{'=' * 80}")
-    print_success(f"Compressed {len(video_files)} video file(s)")
+    if jobs > 1:
+        print_info(f"Compressing with {jobs} parallel jobs ({threads} thread(s) each)")
+    
+    results = []
+    start = time.monotonic()
+    
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_compress_worker, f, quality, threads, predict)
+                   for f in video_files]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            prefix = f"[{len(results)}/{len(video_files)}]"
+            if result.skipped:
+                manifest.record(result.input_file, None, settings,
+                                result.original_size, result.mtime_ns, result.fingerprint)
+                print_info(f"{prefix} {result.input_file.name} skipped "
+                           f"(predicted {format_file_size(result.original_size)} -> "
+                           f"{format_file_size(result.predicted_size)})")
+            elif result.ok:
+                manifest.record(result.input_file, result.output_file, settings,
+                                result.original_size, result.mtime_ns, result.fingerprint)
+                predicted = (f", predicted {format_file_size(result.predicted_size)}"
+                             if result.predicted_size is not None else "")
+                print_success(f"{prefix} {result.input_file.name} -> {result.output_file.name} "
+                              f"({format_file_size(result.original_size)} -> "
+                              f"{format_file_size(result.new_size)}{predicted}, {result.elapsed:.1f}s)")
+            else:
+                print_error(f"{prefix} {result.input_file.name} failed")
+    
+    manifest.compact()
+    print_compress_summary(results, time.monotonic() - start)
+    
+    if any(not r.ok for r in results):
+        sys.exit(1)
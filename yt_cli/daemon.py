@@ -0,0 +1,640 @@
+"""
+Long-lived daemon that runs jobs on warm, pooled workers.
+
+``yt-cli serve`` keeps yt-dlp, the transcript API, the caches and each
+worker's HTTP connections alive between jobs, so repeated requests skip
+Python startup, imports and connection setup. Jobs are submitted as JSON
+over a localhost HTTP API:
+
+    POST /jobs        {"type": "metadata", "args": {"url": ...}} -> 202 and the job
+    GET  /jobs/<id>   job status and result; ``?wait=SECONDS`` blocks until it finishes
+    GET  /jobs        every job the daemon still holds
+    GET  /health      version, uptime, per-type queue depth and download throughput
+    GET  /metrics     Prometheus metrics (see ``yt_cli.metrics``)
+
+Every job type has its own thread pool and concurrency limit, so a long
+compress never holds up metadata lookups. Paths in job arguments are
+resolved against the daemon's working directory; the client below makes
+them absolute before submitting.
+
+The client functions only use the standard library, and the job handlers
+import their modules when first called, so ``--via-daemon`` does not
+import yt_dlp in the calling process.
+"""
+
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from . import __version__
+from .metrics import send_metrics
+from .utils import print_error, print_info
+
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8737
+
+# Environment variable holding the daemon URL used by --via-daemon
+DAEMON_ENV = 'YT_CLI_DAEMON'
+
+# Jobs of each type that run at the same time
+DEFAULT_LIMITS = {
+    'download': 4,
+    'metadata': 8,
+    'transcript': 4,
+    'convert': 1,
+    'compress': 1,
+}
+
+JOB_TYPES = tuple(DEFAULT_LIMITS)
+
+# Finished jobs kept for status queries before the oldest are forgotten
+MAX_FINISHED_JOBS = 1000
+
+# Longest a single status request blocks with ?wait=
+MAX_WAIT = 60.0
+
+MAX_REQUEST_BYTES = 1024 * 1024
+
+FINISHED = ('done', 'failed')
+
+Handler = Callable[[Dict[str, Any]], Any]
+
+
+class DaemonError(Exception):
+    """Raised by the client when the daemon is unreachable or rejects a request."""
+
+
+@dataclass
+class Job:
+    """A submitted job and, once it finishes, its result or error."""
+    
+    id: str
+    type: str
+    args: Dict[str, Any]
+    status: str = 'queued'
+    result: Any = None
+    error: Optional[str] = None
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+    done: threading.Event = field(default_factory=threading.Event, repr=False)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'type': self.type,
+            'args': self.args,
+            'status': self.status,
+            'result': self.result,
+            'error': self.error,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+        }
+
+
+class JobQueue:
+    """
+    Runs jobs on one bounded thread pool per job type.
+    
+    Worker threads live as long as the queue, so per-thread state such as
+    pooled ``YoutubeDL`` instances stays warm across jobs. Finished jobs are
+    kept for status queries until more than ``max_finished`` have piled up,
+    then the oldest are dropped.
+    
+    Args:
+        handlers: Function run for each job type, given the job's arguments;
+            its return value becomes the job result and any exception its error
+        limits: Concurrent jobs per type (missing types default to 1)
+        max_finished: Finished jobs kept for status queries
+    """
+    
+    def __init__(self, handlers: Dict[str, Handler], limits: Optional[Dict[str, int]] = None,
+                 max_finished: int = MAX_FINISHED_JOBS):
+        limits = limits or {}
+        self._handlers = handlers
+        self.limits = {t: max(1, limits.get(t, 1)) for t in handlers}
+        self._executors = {
+            t: ThreadPoolExecutor(max_workers=self.limits[t], thread_name_prefix=f'yt-cli-{t}')
+            for t in handlers
+        }
+        self._max_finished = max_finished
+        self._lock = threading.Lock()
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        
+    def submit(self, job_type: str, args: Dict[str, Any]) -> Job:
+        """
+        Queue a job.
+        
+        Raises:
+            ValueError: If the job type is unknown or the arguments are not an object
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type: {job_type}. Available: {', '.join(self._handlers)}")
+        if not isinstance(args, dict):
+            raise ValueError("Job arguments must be a JSON object")
+            
+        job = Job(id=uuid.uuid4().hex[:12], type=job_type, args=args)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._evict()
+            self._pending[job.id] = self._executors[job_type].submit(self._run, job)
+        return job
+        
+    def _run(self, job: Job) -> None:
+        with self._lock:
+            self._pending.pop(job.id, None)
+        job.status = 'running'
+        job.started = time.time()
+        try:
+            job.result = self._handlers[job.type](job.args)
+            job.status = 'done'
+        except (Exception, SystemExit) as e:
+            job.error = str(e) or type(e).__name__
+            job.status = 'failed'
+        job.finished = time.time()
+        job.done.set()
+        
+    def _evict(self) -> None:
+        """Forget the oldest finished jobs beyond ``max_finished``; call with the lock held."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED]
+        for job_id in finished[:max(0, len(finished) - self._max_finished)]:
+            del self._jobs[job_id]
+            
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+            
+    def jobs(self) -> List[Job]:
+        with self._lock:
+            return list(self._jobs.values())
+            
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Return the limit and the queued and running job counts of each type."""
+        stats = {t: {'limit': limit, 'queued': 0, 'running': 0} for t, limit in self.limits.items()}
+        for job in self.jobs():
+            if job.status in stats[job.type]:
+                stats[job.type][job.status] += 1
+        return stats
+        
+    def shutdown(self, wait: bool = True) -> None:
+        """
+        Stop the worker threads.
+        
+        Without ``wait``, queued jobs are cancelled and fail instead of
+        starting. ``Executor.shutdown(cancel_futures=...)`` would do this
+        but needs Python 3.9.
+        """
+        if not wait:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            for job_id, future in pending.items():
+                if future.cancel():
+                    job = self._jobs[job_id]
+                    job.error = "Daemon shut down before the job started"
+                    job.status = 'failed'
+                    job.finished = time.time()
+                    job.done.set()
+        for executor in self._executors.values():
+            executor.shutdown(wait=wait)
+
+
+def _flag(args: Dict[str, Any], name: str) -> bool:
+    return bool(args.get(name, False))
+
+
+def _required(args: Dict[str, Any], name: str) -> Any:
+    value = args.get(name)
+    if value in (None, ''):
+        raise ValueError(f"Missing job argument: {name}")
+    return value
+
+
+class Workers:
+    """
+    Job handlers sharing the daemon's warm state.
+    
+    ``YoutubeDL`` pools are created on first use, one per distinct set of
+    options (each metadata strategy, each download destination), as is the
+    HTTP session transcript jobs share, and the metadata cache and
+    transcript store are opened once. Every download job shares one
+    bandwidth and fragment budget.
+    
+    Args:
+        use_cache: If False, jobs never read or write the local caches
+        rate_limit: Total download rate in bytes per second (None for no limit)
+        fragments: Fragment connections shared by the running downloads
+        limits: Concurrent jobs per type, overriding ``DEFAULT_LIMITS``;
+            sizes the transcript session's connection pool
+    """
+    
+    def __init__(self, use_cache: bool = True, rate_limit: Optional[float] = None,
+                 fragments: Optional[int] = None, limits: Optional[Dict[str, int]] = None):
+        from .bandwidth import BandwidthScheduler, DEFAULT_FRAGMENTS
+        from .cache import MetadataCache, TranscriptStore
+        
+        self.metadata_cache = MetadataCache() if use_cache else None
+        self.transcript_store = TranscriptStore() if use_cache else None
+        self.scheduler = BandwidthScheduler(rate_limit, fragments or DEFAULT_FRAGMENTS, report=True)
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self._pools: Dict[Tuple[Any, ...], Any] = {}
+        self._lock = threading.Lock()
+        
+    def handlers(self) -> Dict[str, Handler]:
+        return {t: getattr(self, t) for t in JOB_TYPES}
+        
+    def _pool(self, key: Tuple[Any, ...], factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool is None:
+                pool = self._pools[key] = factory()
+            return pool
+            
+    def close(self) -> None:
+        self.scheduler.close()
+        with self._lock:
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+        if self.metadata_cache is not None:
+            self.metadata_cache.close()
+        if self.transcript_store is not None:
+            self.transcript_store.close()
+            
+    def download(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments: ``url``, ``audio``, ``output`` (directory), ``no_cache``."""
+        from .downloader import build_ydl_opts, _download_one, _setup_worker
+        from .pool import YoutubeDLPool
+        
+        url = _required(args, 'url')
+        audio = _flag(args, 'audio')
+        output = str(args.get('output') or '.')
+        Path(output).mkdir(parents=True, exist_ok=True)
+        
+        def create_pool():
+            ydl_opts = build_ydl_opts(audio, output)
+            ydl_opts.update({'quiet': True, 'no_warnings': True, 'noprogress': True})
+            return YoutubeDLPool(ydl_opts, setup=_setup_worker)
+            
+        pool = self._pool(('download', audio, output), create_pool)
+        cache = None if _flag(args, 'no_cache') else self.metadata_cache
+        result = _download_one(pool, url, cache, self.scheduler)
+        if not result.ok:
+            raise ValueError(result.error)
+        return {'url': result.url, 'title': result.title, 'bytes': result.bytes, 'path': result.path}
+        
+    def metadata(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments: ``url``, ``fields`` (list or comma-separated), ``no_cache``, ``refresh``."""
+        from .metadata import choose_strategy, parse_fields, ydl_opts_for, _fetch_one
+        from .pool import YoutubeDLPool
+        
+        url = _required(args, 'url')
+        fields = args.get('fields')
+        if fields:
+            fields = parse_fields(fields if isinstance(fields, str) else ','.join(fields))
+        strategy = choose_strategy(fields)
+        
+        pool = self._pool(('metadata', strategy), lambda: YoutubeDLPool(ydl_opts_for(strategy)))
+        cache = None if _flag(args, 'no_cache') else self.metadata_cache
+        metadata, source = _fetch_one(pool, url, fields, cache, _flag(args, 'refresh'))
+        return {'metadata': metadata, 'source': source}
+        
+    def transcript(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Arguments: ``url`` (or video ID), ``languages`` (list or comma-separated),
+        ``summary``, ``no_cache``.
+        
+        Requests go over one kept-alive session shared by all transcript
+        jobs and are retried with backoff while YouTube throttles, like
+        ``transcript --batch``. With ``summary`` (short, medium or long) the
+        result holds the summary and its word counts; without it, the full
+        transcript text.
+        """
+        from .summarizer import summarize
+        from .transcript import DEFAULT_RETRIES, _fetch_batch_one, create_session
+        
+        url = _required(args, 'url')
+        languages = args.get('languages') or ['en']
+        if isinstance(languages, str):
+            languages = [lang.strip() for lang in languages.split(',') if lang.strip()]
+        summary_type = args.get('summary')
+        if summary_type not in (None, 'short', 'medium', 'long'):
+            raise ValueError(f"Invalid summary type: {summary_type}")
+            
+        store = None if _flag(args, 'no_cache') else self.transcript_store
+        session = self._pool(('transcript',), lambda: create_session(self.limits['transcript']))
+        record = _fetch_batch_one(session, url, languages, store, DEFAULT_RETRIES)
+        
+        result = {'video_id': record['video_id'], 'source': record['source']}
+        text = record['text']
+        if summary_type:
+            summary = summarize(text, summary_type)
+            result.update(summary=summary.text, total_words=summary.total_words,
+                          summary_words=summary.summary_words)
+        else:
+            result['text'] = text
+        return result
+        
+    def convert(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Arguments: ``file``, ``to`` (target format), ``plan`` (only plan the conversion)."""
+        from .converter import MUXERS, build_convert_args, plan_conversion
+        from .ffmpeg import probe_ffmpeg, run_ffmpeg
+        
+        input_path = Path(_required(args, 'file'))
+        output_format = str(_required(args, 'to')).lower().lstrip('.')
+        caps = probe_ffmpeg()
+        if caps is None:
+            raise RuntimeError("FFmpeg is not installed")
+        if not caps.has_muxer(MUXERS.get(output_format, output_format)):
+            raise RuntimeError(f"This FFmpeg build cannot write {output_format} files")
+        if not input_path.exists():
+            raise FileNotFoundError(f"File not found: {input_path}")
+            
+        plan = plan_conversion(input_path, output_format)
+        streams = [{'index': s.stream.index, 'type': s.stream.codec_type,
+                    'codec': s.stream.codec_name, 'action': s.action}
+                   for s in plan.streams or []]
+        result = {'mode': plan.mode, 'streams': streams}
+        if _flag(args, 'plan'):
+            return result
+        if plan.streams is not None and not plan.kept:
+            raise ValueError(f"{input_path.name} has no streams that can be written to {output_format}")
+            
+        output_file = input_path.with_suffix(f'.{output_format}')
+        run_ffmpeg(build_convert_args(plan, input_path, output_file))
+        result.update(output=str(output_file), original_size=input_path.stat().st_size,
+                      new_size=output_file.stat().st_size)
+        return result
+        
+    def compress(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Arguments: ``path`` (a single video), ``quality``, ``predict``,
+        ``min_gain``, ``target_size`` (bytes) and ``max_bitrate`` (bits/s).
+        """
+        from .converter import VIDEO_ENCODER, PredictOptions, _compress_worker
+        from .ffmpeg import probe_ffmpeg
+        
+        input_path = Path(_required(args, 'path'))
+        if input_path.is_dir():
+            raise ValueError("compress jobs take a single file; submit one job per file")
+        if not input_path.exists():
+            raise FileNotFoundError(f"File not found: {input_path}")
+        quality = args.get('quality') or 'medium'
+        if quality not in ('low', 'medium', 'high'):
+            raise ValueError(f"Invalid quality: {quality}")
+        caps = probe_ffmpeg()
+        if caps is None:
+            raise RuntimeError("FFmpeg is not installed")
+        if not caps.has_encoder(VIDEO_ENCODER):
+            raise RuntimeError(f"This FFmpeg build has no {VIDEO_ENCODER} encoder")
+            
+        predict = None
+        if _flag(args, 'predict') or any(args.get(k) is not None
+                                         for k in ('min_gain', 'target_size', 'max_bitrate')):
+            options = {k: args[k] for k in ('min_gain', 'target_size', 'max_bitrate')
+                       if args.get(k) is not None}
+            predict = PredictOptions(**options)
+            
+        result = _compress_worker(input_path, quality, None, predict)
+        if not result.ok:
+            raise RuntimeError(result.error)
+        return {
+            'output': None if result.skipped else str(result.output_file),
+            'skipped': result.skipped,
+            'original_size': result.original_size,
+            'new_size': result.new_size,
+            'predicted_size': result.predicted_size,
+            'elapsed': round(result.elapsed, 3),
+        }
+
+
+class DaemonServer(ThreadingHTTPServer):
+    """HTTP server exposing a ``JobQueue``."""
+    
+    daemon_threads = True
+    
+    def __init__(self, address: Tuple[str, int], queue: JobQueue,
+                 bandwidth: Optional[Callable[[], Dict[str, Any]]] = None):
+        super().__init__(address, DaemonRequestHandler)
+        self.queue = queue
+        self.bandwidth = bandwidth or dict
+        self.started = time.time()
+        
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class DaemonRequestHandler(BaseHTTPRequestHandler):
+    """Routes the daemon's JSON API."""
+    
+    server: DaemonServer
+    server_version = f"yt-cli/{__version__}"
+    
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+        
+    def _send(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        
+    def _error(self, status: int, message: str) -> None:
+        self._send(status, {'error': message})
+        
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        queue = self.server.queue
+        
+        if url.path == '/health':
+            self._send(200, {
+                'status': 'ok',
+                'version': __version__,
+                'pid': os.getpid(),
+                'uptime': time.time() - self.server.started,
+                'jobs': queue.stats(),
+                'bandwidth': self.server.bandwidth(),
+            })
+        elif url.path == '/metrics':
+            send_metrics(self)
+        elif url.path == '/jobs':
+            self._send(200, {'jobs': [job.to_dict() for job in queue.jobs()]})
+        elif url.path.startswith('/jobs/'):
+            job = queue.get(url.path[len('/jobs/'):])
+            if job is None:
+                self._error(404, "Unknown job")
+                return
+            try:
+                wait = float(parse_qs(url.query).get('wait', ['0'])[0])
+            except ValueError:
+                self._error(400, "wait must be a number of seconds")
+                return
+            if wait > 0:
+                job.done.wait(min(wait, MAX_WAIT))
+            self._send(200, job.to_dict())
+        else:
+            self._error(404, "Not found")
+            
+    def do_POST(self) -> None:
+        if urlparse(self.path).path != '/jobs':
+            self._error(404, "Not found")
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if not 0 < length <= MAX_REQUEST_BYTES:
+            self._error(400, "Request body must be a JSON object")
+            return
+        try:
+            request = json.loads(self.rfile.read(length))
+        except ValueError:
+            self._error(400, "Invalid JSON")
+            return
+        if not isinstance(request, dict):
+            self._error(400, "Request body must be a JSON object")
+            return
+        try:
+            job = self.server.queue.submit(request.get('type'), request.get('args', {}))
+        except ValueError as e:
+            self._error(400, str(e))
+            return
+        self._send(202, job.to_dict())
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          limits: Optional[Dict[str, int]] = None, use_cache: bool = True,
+          rate_limit: Optional[float] = None, fragments: Optional[int] = None) -> None:
+    """
+    Run the daemon until interrupted.
+    
+    Args:
+        host: Address to listen on (keep it on loopback: the API has no authentication)
+        port: Port to listen on (0 picks a free one)
+        limits: Concurrent jobs per type, overriding ``DEFAULT_LIMITS``
+        use_cache: If False, jobs never read or write the local caches
+        rate_limit: Total download rate in bytes per second, shared by all download jobs
+        fragments: Fragment connections shared by all running download jobs
+    """
+    # Pay for the heavy imports once, before the first job arrives
+    from . import downloader, metadata, transcript, converter  # noqa: F401
+    
+    workers = Workers(use_cache, rate_limit, fragments, limits)
+    queue = JobQueue(workers.handlers(), workers.limits)
+    try:
+        server = DaemonServer((host, port), queue, workers.scheduler.stats)
+    except OSError as e:
+        print_error(f"Cannot listen on {host}:{port}: {e}")
+        queue.shutdown(wait=False)
+        sys.exit(1)
+        
+    limits_text = ', '.join(f"{t}={n}" for t, n in queue.limits.items())
+    print_info(f"yt-cli daemon listening on {server.url} ({limits_text})")
+    print_info(f"Downloads share {workers.scheduler.describe()}")
+    print_info(f"Use --via-daemon, or set {DAEMON_ENV}={server.url} for a non-default address")
+    
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+        
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print_info("Shutting down...")
+    finally:
+        server.server_close()
+        queue.shutdown(wait=False)
+        workers.close()
+
+
+def daemon_url() -> str:
+    """Return the daemon URL from ``YT_CLI_DAEMON``, or the default local address."""
+    return (os.environ.get(DAEMON_ENV) or f"http://{DEFAULT_HOST}:{DEFAULT_PORT}").rstrip('/')
+
+
+def _request(method: str, path: str, body: Optional[Dict[str, Any]] = None,
+             timeout: float = 30.0) -> Dict[str, Any]:
+    """Send one API request to the daemon and return the decoded response."""
+    url = daemon_url()
+    data = json.dumps(body).encode('utf-8') if body is not None else None
+    request = urllib.request.Request(url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.load(e).get('error', e.reason)
+        except ValueError:
+            message = e.reason
+        raise DaemonError(f"Daemon rejected the request: {message}")
+    except (urllib.error.URLError, OSError) as e:
+        reason = getattr(e, 'reason', e)
+        raise DaemonError(f"Cannot reach the daemon at {url} ({reason}); start it with 'yt-cli serve'")
+
+
+def submit_job(job_type: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Submit a job to the daemon.
+    
+    Returns:
+        The queued job
+        
+    Raises:
+        DaemonError: If the daemon is unreachable or rejects the job
+    """
+    return _request('POST', '/jobs', {'type': job_type, 'args': args})
+
+
+def wait_for_job(job_id: str, poll: float = MAX_WAIT) -> Dict[str, Any]:
+    """
+    Block until a job finishes, long-polling the daemon.
+    
+    Returns:
+        The finished job
+        
+    Raises:
+        DaemonError: If the daemon is unreachable or no longer knows the job
+    """
+    while True:
+        job = _request('GET', f"/jobs/{job_id}?wait={poll:g}", timeout=poll + 30.0)
+        if job['status'] in FINISHED:
+            return job
+
+
+def run_via_daemon(job_type: str, args: Dict[str, Any]) -> None:
+    """
+    Run a job on the daemon, print its result as JSON and exit 1 if it failed.
+    
+    Args:
+        job_type: One of ``JOB_TYPES``
+        args: Job arguments; paths must already be absolute
+    """
+    try:
+        job = wait_for_job(submit_job(job_type, args)['id'])
+    except DaemonError as e:
+        print_error(str(e))
+        sys.exit(1)
+        
+    if job['status'] == 'failed':
+        print_error(f"{job_type} job failed: {job['error']}")
+        sys.exit(1)
+    print(json.dumps(job['result'], indent=2, ensure_ascii=False))
@@ -4,38 +4,47 @@ YouTube video and audio downloader module.
 
 import sys
 import os
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, List, Optional
 import yt_dlp
-from .utils import print_error, print_success, print_info, validate_youtube_url
+from .bandwidth import BandwidthScheduler, DEFAULT_FRAGMENTS
+from .cache import MetadataCache
+from .metadata import build_metadata, cache_metadata
+from .metrics import DOWNLOAD_BYTES, DOWNLOADS, FAILURES, count_failure
+from .pool import YoutubeDLPool
+from .resume import ResumeTracker, VerificationError
+from .trace import instrument_ydl_opts, span
+from .utils import (
+    print_error, print_success, print_info, validate_youtube_url,
+    format_file_size, iter_urls, run_bounded
+)
 
 
-def download_video(video_url: str, audio_only: bool = False, output_path: str = ".") -> None:
+def build_ydl_opts(audio_only: bool = False, output_path: str = ".") -> Dict[str, Any]:
     """
-    Download YouTube video or audio.
+    Build the yt-dlp options used for downloads.
+    
+    Files are named after the video ID rather than the title, so a rerun
+    finds (and resumes) the same file and two videos never collide.
     
     Args:
-        video_url: YouTube video URL
         audio_only: If True, download audio only
         output_path: Directory to save the download
+        
+    Returns:
+        Options dictionary for ``yt_dlp.YoutubeDL``
     """
-    if not validate_youtube_url(video_url):
-        print_error("Invalid YouTube URL")
-        sys.exit(1)
-    
-    # Ensure output directory exists
-    Path(output_path).mkdir(parents=True, exist_ok=True)
-    
-    # Configure download options
     ydl_opts = {
-        'outtmpl': os.path.join(output_path, '%(title)s.%(ext)s'),
+        'outtmpl': os.path.join(output_path, '%(id)s.%(ext)s'),
         'quiet': False,
         'no_warnings': False,
         'progress_hooks': [download_progress_hook],
     }
     
     if audio_only:
-        print_info("Downloading audio only...")
         ydl_opts.update({
             'format': 'bestaudio/best',
             'postprocessors': [{
@@ -45,32 +54,125 @@ def download_video(video_url: str, audio_only: bool = False, output_path: str =
             }],
         })
     else:
-        print_info("Downloading video...")
         ydl_opts.update({
             'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
         })
+        
+    return ydl_opts
+
+
+def download_video(video_url: str, audio_only: bool = False, output_path: str = ".",
+                   use_cache: bool = True, rate_limit: Optional[float] = None,
+                   fragments: Optional[int] = None) -> None:
+    """
+    Download YouTube video or audio.
+    
+    An interrupted download of the same video into the same directory is
+    resumed, and the finished file is verified before it is marked complete.
     
+    Args:
+        video_url: YouTube video URL
+        audio_only: If True, download audio only
+        output_path: Directory to save the download
+        use_cache: If True, store the extracted metadata in the metadata cache
+        rate_limit: Download rate limit in bytes per second (None for no limit)
+        fragments: Concurrent fragment connections for HLS and DASH formats
+            (None for yt-dlp's default, or ``DEFAULT_FRAGMENTS`` with a rate limit)
+    """
+    if not validate_youtube_url(video_url):
+        print_error("Invalid YouTube URL")
+        sys.exit(1)
+        
+    # Ensure output directory exists
+    Path(output_path).mkdir(parents=True, exist_ok=True)
+    
+    # Configure download options
+    ydl_opts = instrument_ydl_opts(build_ydl_opts(audio_only, output_path))
+    
+    if audio_only:
+        print_info("Downloading audio only...")
+    else:
+        print_info("Downloading video...")
+        
+    # Without a rate or fragment budget, yt-dlp keeps its own defaults
+    scheduler = None
+    if rate_limit is not None or fragments is not None:
+        scheduler = BandwidthScheduler(rate_limit, fragments or DEFAULT_FRAGMENTS)
     try:
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+            if scheduler:
+                lease = scheduler.acquire(ydl.params)
+                ydl.add_progress_hook(lease.progress_hook)
+            tracker = ResumeTracker(output_path)
+            tracker.attach(ydl)
+            # Resolve the page once and reuse the result for both the info
+            # printout and the download, instead of letting ydl.download()
+            # fetch the page, player and formats a second time.
+            with span('extract_info', 'downloader', url=video_url):
+                info = ydl.extract_info(video_url, download=False, process=False)
             print_info(f"Title: {info.get('title', 'Unknown')}")
             print_info(f"Duration: {info.get('duration', 0)} seconds")
             
-            ydl.download([video_url])
+            kept = tracker.begin(info)
+            if kept:
+                print_info(f"Resuming an interrupted download ({format_file_size(kept)} already downloaded)")
+            try:
+                with span('download', 'downloader', video_id=info.get('id')):
+                    info = ydl.process_ie_result(info, download=True)
+                with span('verify', 'downloader'):
+                    path = tracker.finish(info)
+            finally:
+                tracker.end()
+                
+        if use_cache:
+            cache = MetadataCache()
+            try:
+                cache_metadata(cache, build_metadata(info, video_url))
+            finally:
+                cache.close()
             
+        DOWNLOADS.inc(result='ok')
         file_type = "audio" if audio_only else "video"
-        print_success(f"Successfully downloaded {file_type} to {output_path}")
+        print_success(f"Successfully downloaded {file_type} to {path or output_path}")
         
-    except yt_dlp.utils.DownloadError as e:
-        print_error(f"Download failed: {str(e)}")
-        sys.exit(1)
     except Exception as e:
-        print_error(f"An error occurred: {str(e)}")
+        DOWNLOADS.inc(result='failed')
+        count_failure('download', e)
+        if isinstance(e, VerificationError):
+            print_error(f"Download failed verification: {str(e)}")
+        elif isinstance(e, yt_dlp.utils.DownloadError):
+            print_error(f"Download failed: {str(e)}")
+        else:
+            print_error(f"An error occurred: {str(e)}")
         sys.exit(1)
+    finally:
+        if scheduler:
+            scheduler.close()
+
+
+# Bytes of each file already counted in DOWNLOAD_BYTES
+_counted: Dict[str, int] = {}
+_counted_lock = threading.Lock()
+
+
+def count_download_progress(d: Dict[str, Any]) -> None:
+    """Add the bytes received since a file's previous progress event to the download metrics."""
+    key = d.get('filename') or ''
+    if d['status'] != 'downloading':
+        with _counted_lock:
+            _counted.pop(key, None)
+        return
+    done = d.get('downloaded_bytes') or 0
+    with _counted_lock:
+        last = _counted.get(key, 0)
+        _counted[key] = max(last, done)
+    if done > last:
+        DOWNLOAD_BYTES.inc(done - last)
 
 
 def download_progress_hook(d):
     """Hook function to display download progress."""
+    count_download_progress(d)
     if d['status'] == 'downloading':
         percent = d.get('_percent_str', 'N/A')
         speed = d.get('_speed_str', 'N/A')
@@ -79,3 +181,164 @@ def download_progress_hook(d):
     elif d['status'] == 'finished':
         print("\n", end='')
         print_info("Download completed, processing...")
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of downloading a single URL in a batch."""
+    
+    url: str
+    title: Optional[str] = None
+    bytes: int = 0
+    error: Optional[str] = None
+    path: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _setup_worker(opts: Dict[str, Any]) -> Dict[str, Any]:
+    """Give a batch worker its own byte counter fed by a progress hook, and its resume tracker."""
+    output_dir = os.path.dirname(opts.get('outtmpl', '')) or '.'
+    state = {'bytes': 0, 'lease': None, 'tracker': ResumeTracker(output_dir)}
+    opts['progress_hooks'] = [lambda d: _record_bytes(state, d)]
+    instrument_ydl_opts(opts)
+    return state
+
+
+def _record_bytes(state: Dict[str, Any], d: Dict[str, Any]) -> None:
+    """Progress hook that accumulates the size of finished files."""
+    count_download_progress(d)
+    if state.get('lease') is not None:
+        state['lease'].progress_hook(d)
+    if d['status'] == 'finished':
+        state['bytes'] += d.get('total_bytes') or d.get('downloaded_bytes') or 0
+
+
+def _download_one(pool: YoutubeDLPool, video_url: str, cache: Optional[MetadataCache] = None,
+                  scheduler: Optional[BandwidthScheduler] = None) -> DownloadResult:
+    """Download (or resume) one URL with the calling thread's ``YoutubeDL`` instance."""
+    if not validate_youtube_url(video_url):
+        DOWNLOADS.inc(result='failed')
+        FAILURES.inc(operation='download', error='InvalidURL')
+        return DownloadResult(url=video_url, error="Invalid YouTube URL")
+        
+    ydl, state = pool.get()
+    state['bytes'] = 0
+    state['lease'] = scheduler.acquire(ydl.params) if scheduler is not None else None
+    tracker = state['tracker']
+    tracker.attach(ydl)
+    try:
+        with span('extract_info', 'downloader', url=video_url):
+            info = ydl.extract_info(video_url, download=False, process=False)
+        tracker.begin(info)
+        with span('download', 'downloader', video_id=info.get('id')):
+            info = ydl.process_ie_result(info, download=True)
+        with span('verify', 'downloader'):
+            tracker.finish(info)
+    except Exception as e:
+        DOWNLOADS.inc(result='failed')
+        count_failure('download', e)
+        raise
+    finally:
+        tracker.end()
+        if state['lease'] is not None:
+            scheduler.release(state['lease'])
+            state['lease'] = None
+    DOWNLOADS.inc(result='ok')
+    if cache is not None:
+        cache_metadata(cache, build_metadata(info, video_url))
+    # After post-processing (e.g. audio extraction) the last download holds the final path
+    downloads = info.get('requested_downloads') or [{}]
+    path = downloads[-1].get('filepath') or ydl.prepare_filename(info)
+    return DownloadResult(url=video_url, title=info.get('title'), bytes=state['bytes'], path=path)
+
+
+def download_batch(source: str, audio_only: bool = False, output_path: str = ".",
+                   jobs: int = 4, use_cache: bool = True, rate_limit: Optional[float] = None,
+                   fragments: int = DEFAULT_FRAGMENTS) -> List[DownloadResult]:
+    """
+    Download every URL listed in a file (or stdin) with a pool of workers.
+    
+    Each URL is downloaded independently: a failure is recorded and the
+    batch continues. The workers share one bandwidth and fragment budget,
+    and the aggregate throughput is printed while they run. A report is
+    printed once all URLs are processed.
+    
+    Args:
+        source: Path to a file with one URL per line, or ``-`` for stdin
+        audio_only: If True, download audio only
+        output_path: Directory to save the downloads
+        jobs: Number of concurrent downloads
+        use_cache: If True, store the extracted metadata in the metadata cache
+        rate_limit: Total download rate in bytes per second (None for no limit)
+        fragments: Fragment connections shared by the active downloads
+        
+    Returns:
+        One result per URL, in completion order
+    """
+    if jobs < 1:
+        print_error("--jobs must be at least 1")
+        sys.exit(1)
+        
+    try:
+        urls = iter_urls(source)
+        first = next(urls, None)
+    except OSError as e:
+        print_error(f"Cannot read URL list: {e}")
+        sys.exit(1)
+        
+    if first is None:
+        print_error("No URLs to download")
+        sys.exit(1)
+        
+    Path(output_path).mkdir(parents=True, exist_ok=True)
+    
+    ydl_opts = build_ydl_opts(audio_only, output_path)
+    ydl_opts.update({'quiet': True, 'no_warnings': True, 'noprogress': True})
+    pool = YoutubeDLPool(ydl_opts, setup=_setup_worker)
+    cache = MetadataCache() if use_cache else None
+    scheduler = BandwidthScheduler(rate_limit, fragments, report=True)
+    
+    print_info(f"Downloading with {jobs} worker(s), {scheduler.describe()}...")
+    
+    def all_urls():
+        yield first
+        yield from urls
+        
+    results = []
+    start = time.monotonic()
+    
+    try:
+        for url, result, error in run_bounded(lambda u: _download_one(pool, u, cache, scheduler),
+                                              all_urls(), jobs):
+            if error is not None:
+                result = DownloadResult(url=url, error=str(error))
+            results.append(result)
+            if result.ok:
+                print_success(f"{result.title or url} ({format_file_size(result.bytes)})")
+            else:
+                print_error(f"{url}: {result.error}")
+    finally:
+        scheduler.close()
+        pool.close()
+        if cache is not None:
+            cache.close()
+        
+    print_batch_report(results, time.monotonic() - start)
+    return results
+
+
+def print_batch_report(results: List[DownloadResult], elapsed: float) -> None:
+    """Print the final report for a batch download."""
+    succeeded = sum(1 for r in results if r.ok)
+    failed = len(results) - succeeded
+    total_bytes = sum(r.bytes for r in results)
+    rate = total_bytes / elapsed if elapsed > 0 else 0.0
+    
+    print(f"\n{'=' * 80}")
+    print_info(f"Succeeded: {succeeded}")
+    print_info(f"Failed: {failed}")
+    print_info(f"Downloaded: {format_file_size(total_bytes)} ({format_file_size(rate)}/s)")
+    print_info(f"Wall time: {elapsed:.1f}s")
@@ -0,0 +1,501 @@
+"""
+FFmpeg capability and media stream probes, and a progress-reporting runner.
+
+Finding out what the installed FFmpeg can do takes a handful of
+subprocess calls, so the answer is computed once per process and also
+persisted in the cache directory. Both copies are keyed on the binary's
+resolved path, mtime and size, so upgrading or swapping FFmpeg
+invalidates them automatically.
+"""
+
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+from .metrics import ENCODE_SPEED, FFMPEG_RUNS, FFMPEG_SECONDS, count_failure
+from .trace import span
+from .utils import get_cache_dir
+
+
+CACHE_FILE = 'ffmpeg.json'
+
+# Options involved in machine-readable progress reporting
+PROGRESS_OPTIONS = ('progress', 'stats', 'stats_period')
+
+# "Stream #0:1[0x2](eng): Audio: aac (LC) ..." in ``ffmpeg -i`` output
+_STREAM_LINE = re.compile(r'^\s*Stream #0:(\d+)\S*: (\w+): (\w+)(.*)$', re.MULTILINE)
+
+# "  Duration: 01:02:03.45, start: ..." in FFmpeg's input summary
+_DURATION_LINE = re.compile(r'^\s*Duration: (\d+):(\d\d):(\d\d(?:\.\d+)?)', re.MULTILINE)
+
+# Number of stderr lines kept for error reports, and their maximum length
+STDERR_TAIL_LINES = 40
+STDERR_LINE_LENGTH = 1000
+
+_memo: Dict[Tuple[str, int, int], 'FFmpegCapabilities'] = {}
+_lock = threading.Lock()
+
+
+@dataclass(frozen=True)
+class FFmpegCapabilities:
+    """What the installed FFmpeg binary supports."""
+    
+    path: str
+    mtime_ns: int
+    size: int
+    version: str
+    encoders: FrozenSet[str]
+    muxers: FrozenSet[str]
+    progress_options: FrozenSet[str]
+    
+    @property
+    def key(self) -> Tuple[str, int, int]:
+        return (self.path, self.mtime_ns, self.size)
+        
+    def has_encoder(self, name: str) -> bool:
+        return name in self.encoders
+        
+    def has_muxer(self, name: str) -> bool:
+        return name in self.muxers
+        
+    def supports_option(self, name: str) -> bool:
+        """Return True if FFmpeg accepts the progress option ``-<name>``."""
+        return name in self.progress_options
+        
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            'path': self.path,
+            'mtime_ns': self.mtime_ns,
+            'size': self.size,
+            'version': self.version,
+            'encoders': sorted(self.encoders),
+            'muxers': sorted(self.muxers),
+            'progress_options': sorted(self.progress_options),
+        }
+        
+    @classmethod
+    def from_dict(cls, data: Dict[str, object]) -> 'FFmpegCapabilities':
+        return cls(
+            path=data['path'],
+            mtime_ns=data['mtime_ns'],
+            size=data['size'],
+            version=data['version'],
+            encoders=frozenset(data['encoders']),
+            muxers=frozenset(data['muxers']),
+            progress_options=frozenset(data['progress_options']),
+        )
+
+
+def _listing(output: str) -> Iterable[List[str]]:
+    """Yield the split rows that follow the dashed separator of an FFmpeg listing."""
+    rows = False
+    for line in output.splitlines():
+        stripped = line.strip()
+        if not rows:
+            rows = bool(stripped) and set(stripped) == {'-'}
+            continue
+        parts = stripped.split()
+        if len(parts) >= 2:
+            yield parts
+
+
+def parse_version(output: str) -> str:
+    """Extract the version string from ``ffmpeg -version`` output."""
+    parts = output.split(None, 3)
+    if len(parts) >= 3 and parts[1] == 'version':
+        return parts[2]
+    return 'unknown'
+
+
+def parse_encoders(output: str) -> FrozenSet[str]:
+    """Extract encoder names from ``ffmpeg -encoders`` output."""
+    return frozenset(parts[1] for parts in _listing(output))
+
+
+def parse_muxers(output: str) -> FrozenSet[str]:
+    """Extract muxer names from ``ffmpeg -muxers`` output."""
+    muxers = set()
+    for flags, names, *_ in _listing(output):
+        if 'E' in flags:
+            muxers.update(names.split(','))
+    return frozenset(muxers)
+
+
+def parse_progress_options(output: str) -> FrozenSet[str]:
+    """Extract the supported progress options from ``ffmpeg -h long`` output."""
+    options = set()
+    for line in output.splitlines():
+        if line.startswith('-'):
+            name = line.split()[0][1:]
+            if name in PROGRESS_OPTIONS:
+                options.add(name)
+    return frozenset(options)
+
+
+def _run(path: str, *args: str) -> str:
+    return subprocess.run([path, '-hide_banner', *args],
+                          capture_output=True,
+                          text=True,
+                          check=True).stdout
+
+
+def _run_probe(path: str, mtime_ns: int, size: int) -> Optional[FFmpegCapabilities]:
+    """Query the FFmpeg binary at ``path`` for its capabilities."""
+    try:
+        with span('probe_ffmpeg', 'ffmpeg', path=path):
+            return FFmpegCapabilities(
+                path=path,
+                mtime_ns=mtime_ns,
+                size=size,
+                version=parse_version(_run(path, '-version')),
+                encoders=parse_encoders(_run(path, '-encoders')),
+                muxers=parse_muxers(_run(path, '-muxers')),
+                progress_options=parse_progress_options(_run(path, '-h', 'long')),
+            )
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+
+def _load(key: Tuple[str, int, int]) -> Optional[FFmpegCapabilities]:
+    """Read a persisted probe result matching ``key``."""
+    try:
+        with open(get_cache_dir() / CACHE_FILE, encoding='utf-8') as f:
+            caps = FFmpegCapabilities.from_dict(json.load(f)[key[0]])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    return caps if caps.key == key else None
+
+
+def _save(caps: FFmpegCapabilities) -> None:
+    """Persist a probe result next to those of other FFmpeg binaries."""
+    path = get_cache_dir() / CACHE_FILE
+    try:
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+        if not isinstance(entries, dict):
+            entries = {}
+    except (OSError, ValueError):
+        entries = {}
+    entries[caps.path] = caps.to_dict()
+    
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=str(path.parent), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(entries, f, indent=2)
+            os.replace(tmp_path, path)
+        except OSError:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+
+
+def probe_ffmpeg(refresh: bool = False) -> Optional[FFmpegCapabilities]:
+    """
+    Return the capabilities of the FFmpeg binary on ``PATH``.
+    
+    The result is memoized per process and persisted in the cache
+    directory; FFmpeg is only run again when its path, mtime or size
+    change, or when ``refresh`` is set.
+    
+    Args:
+        refresh: If True, ignore any memoized or persisted result
+        
+    Returns:
+        Capabilities, or None if FFmpeg is not installed or not runnable
+    """
+    which = shutil.which('ffmpeg')
+    if which is None:
+        return None
+    path = os.path.realpath(which)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    key = (path, st.st_mtime_ns, st.st_size)
+    
+    with _lock:
+        caps = None if refresh else (_memo.get(key) or _load(key))
+        if caps is None:
+            caps = _run_probe(*key)
+            if caps is None:
+                return None
+            _save(caps)
+        _memo[key] = caps
+        return caps
+
+
+@dataclass(frozen=True)
+class StreamInfo:
+    """One stream of a media file."""
+    
+    index: int
+    codec_type: str
+    codec_name: str
+    attached_pic: bool = False
+
+
+def parse_ffprobe_streams(output: str) -> List[StreamInfo]:
+    """Extract the streams from ``ffprobe -of json -show_entries stream=...`` output."""
+    streams = []
+    for stream in json.loads(output).get('streams', []):
+        streams.append(StreamInfo(
+            index=stream['index'],
+            codec_type=stream.get('codec_type', 'data'),
+            codec_name=stream.get('codec_name', 'none'),
+            attached_pic=bool(stream.get('disposition', {}).get('attached_pic')),
+        ))
+    return streams
+
+
+def parse_ffmpeg_streams(output: str) -> List[StreamInfo]:
+    """Extract the streams of the first input from ``ffmpeg -i`` output."""
+    return [
+        StreamInfo(
+            index=int(index),
+            codec_type=codec_type.lower(),
+            codec_name=codec_name,
+            attached_pic='(attached pic)' in rest,
+        )
+        for index, codec_type, codec_name, rest in _STREAM_LINE.findall(output)
+    ]
+
+
+@dataclass
+class MediaInfo:
+    """Streams and duration of a media file."""
+    
+    streams: List[StreamInfo]
+    duration: Optional[float] = None
+
+
+def probe_media(path: str) -> Optional[MediaInfo]:
+    """
+    Inspect the streams and duration of a media file.
+    
+    ffprobe is used when installed. Otherwise the stream listing FFmpeg
+    prints for an input without an output file is parsed.
+    
+    Args:
+        path: Media file to inspect
+        
+    Returns:
+        Media information, or None if the file could not be probed
+    """
+    with span('probe', 'ffmpeg', path=str(path)):
+        return _probe_media(path)
+
+
+def _probe_media(path: str) -> Optional[MediaInfo]:
+    ffprobe = shutil.which('ffprobe')
+    try:
+        if ffprobe:
+            output = subprocess.run(
+                [ffprobe, '-v', 'error',
+                 '-show_entries',
+                 'format=duration:stream=index,codec_type,codec_name:stream_disposition=attached_pic',
+                 '-of', 'json', str(path)],
+                capture_output=True,
+                text=True,
+                check=True).stdout
+            duration = json.loads(output).get('format', {}).get('duration')
+            return MediaInfo(parse_ffprobe_streams(output), float(duration) if duration else None)
+            
+        ffmpeg = shutil.which('ffmpeg')
+        if ffmpeg is None:
+            return None
+        # Exits with an error because no output is given, after listing the streams
+        output = subprocess.run([ffmpeg, '-hide_banner', '-i', str(path)],
+                                capture_output=True,
+                                text=True).stderr
+        streams = parse_ffmpeg_streams(output)
+        if not streams:
+            return None
+        match = _DURATION_LINE.search(output)
+        return MediaInfo(streams, parse_duration(match.group(0)) if match else None)
+    except (subprocess.CalledProcessError, OSError, ValueError, KeyError):
+        return None
+
+
+def probe_streams(path: str) -> Optional[List[StreamInfo]]:
+    """
+    List the streams of a media file.
+    
+    Args:
+        path: Media file to inspect
+        
+    Returns:
+        Streams in file order, or None if the file could not be probed
+    """
+    media = probe_media(path)
+    return media.streams if media else None
+
+
+class FFmpegError(Exception):
+    """Raised when FFmpeg exits with an error; carries the tail of its log."""
+    
+    def __init__(self, returncode: int, stderr_tail: Sequence[str]):
+        self.returncode = returncode
+        self.stderr_tail = list(stderr_tail)
+        super().__init__('\n'.join(self.stderr_tail) or f"FFmpeg exited with status {returncode}")
+
+
+@dataclass
+class ProgressEvent:
+    """One progress report from a running FFmpeg process."""
+    
+    frame: int = 0
+    fps: float = 0.0
+    speed: Optional[float] = None       # Media seconds encoded per wall-clock second
+    out_time: float = 0.0               # Media seconds written so far
+    total_size: int = 0
+    duration: Optional[float] = None    # Input duration in seconds, if known
+    done: bool = False
+    
+    @property
+    def percent(self) -> Optional[float]:
+        if not self.duration:
+            return None
+        return min(100.0, self.out_time / self.duration * 100)
+        
+    @property
+    def eta(self) -> Optional[float]:
+        """Estimated wall-clock seconds until the encode finishes."""
+        if not self.duration or not self.speed:
+            return None
+        return max(0.0, self.duration - self.out_time) / self.speed
+
+
+def _number(value: Optional[str], kind=float, default=0):
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def parse_progress(block: Dict[str, str], duration: Optional[float]) -> ProgressEvent:
+    """Build a progress event from one block of ``-progress`` key=value lines."""
+    speed = block.get('speed', '').rstrip('x')
+    return ProgressEvent(
+        frame=_number(block.get('frame'), int),
+        fps=_number(block.get('fps')),
+        speed=_number(speed, default=None) or None,
+        out_time=max(0, _number(block.get('out_time_us'), int)) / 1_000_000,
+        total_size=_number(block.get('total_size'), int),
+        duration=duration,
+        done=block.get('progress') == 'end',
+    )
+
+
+def parse_duration(line: str) -> Optional[float]:
+    """Extract the input duration in seconds from an FFmpeg log line."""
+    match = _DURATION_LINE.match(line)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def run_ffmpeg(args: Sequence[str],
+               progress_callback: Optional[Callable[[ProgressEvent], None]] = None) -> None:
+    """
+    Run FFmpeg, streaming its progress instead of buffering its output.
+    
+    FFmpeg writes machine-readable progress to stdout (``-progress pipe:1``),
+    which is parsed as it arrives and passed to ``progress_callback``. It is
+    parsed even without a callback, so the encode speed of every run is
+    recorded in the ``ENCODE_SPEED`` metric. FFmpeg's log on stderr is
+    drained by a background thread into a ring buffer, so memory stays
+    bounded however long the encode runs.
+    
+    Args:
+        args: FFmpeg arguments, without the program name
+        progress_callback: Called with each progress event
+        
+    Raises:
+        FFmpegError: If FFmpeg exits with an error
+        OSError: If FFmpeg cannot be started
+    """
+    caps = probe_ffmpeg()
+    # Without -nostats, \r-separated status updates share one stderr line with the error
+    cmd = [caps.path if caps else 'ffmpeg', '-hide_banner', '-nostdin', '-nostats']
+    use_progress = caps is None or caps.supports_option('progress')
+    if use_progress:
+        cmd.extend(['-progress', 'pipe:1'])
+    cmd.extend(args)
+    
+    args = list(args)
+    preset = args[args.index('-preset') + 1] if '-preset' in args[:-1] else 'none'
+    start = time.monotonic()
+    try:
+        with span('ffmpeg', 'ffmpeg', args=' '.join(args)):
+            last = _run_ffmpeg(cmd, use_progress, progress_callback)
+    except Exception as e:
+        FFMPEG_RUNS.inc(preset=preset, result='failed')
+        count_failure('ffmpeg', e)
+        raise
+    finally:
+        elapsed = time.monotonic() - start
+        FFMPEG_SECONDS.inc(elapsed, preset=preset)
+        
+    FFMPEG_RUNS.inc(preset=preset, result='ok')
+    if last is not None and last.out_time and elapsed > 0:
+        ENCODE_SPEED.observe(last.out_time / elapsed, preset=preset)
+
+
+def _run_ffmpeg(cmd: List[str], use_progress: bool,
+                progress_callback: Optional[Callable[[ProgressEvent], None]]) -> Optional[ProgressEvent]:
+    """Run an FFmpeg command line and return its last progress event."""
+    last = None
+    tail: Deque[str] = deque(maxlen=STDERR_TAIL_LINES)
+    duration: List[Optional[float]] = [None]
+    
+    proc = subprocess.Popen(cmd,
+                            stdin=subprocess.DEVNULL,
+                            stdout=subprocess.PIPE if use_progress else subprocess.DEVNULL,
+                            stderr=subprocess.PIPE)
+    
+    def drain_stderr():
+        for raw in proc.stderr:
+            line = raw.decode('utf-8', 'replace').rstrip()[:STDERR_LINE_LENGTH]
+            if duration[0] is None:
+                duration[0] = parse_duration(line)
+            tail.append(line)
+            
+    reader = threading.Thread(target=drain_stderr, daemon=True)
+    reader.start()
+    
+    try:
+        if use_progress:
+            block: Dict[str, str] = {}
+            for raw in proc.stdout:
+                key, _, value = raw.decode('utf-8', 'replace').strip().partition('=')
+                block[key] = value
+                if key == 'progress':
+                    last = parse_progress(block, duration[0])
+                    if progress_callback is not None:
+                        progress_callback(last)
+                    block = {}
+        returncode = proc.wait()
+    except BaseException:
+        proc.kill()
+        proc.wait()
+        raise
+    finally:
+        reader.join()
+        if proc.stdout:
+            proc.stdout.close()
+        proc.stderr.close()
+        
+    if returncode != 0:
+        raise FFmpegError(returncode, tail)
+    return last
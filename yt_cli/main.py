@@ -1,15 +1,95 @@
 """
 Main CLI entry point for YT CLI Tools.
+
+Subcommand modules are imported only when their command runs, so that
+commands like ``convert`` and ``--version`` do not pay for importing
+``yt_dlp`` or ``youtube_transcript_api``.
 """
 
 import argparse
+import importlib
+import os
 import sys
 from . import __version__
-from .transcript import generate_summary
-from .downloader import download_video
-from .converter import convert_file, compress_file, compress_folder
-from .metadata import extract_metadata
-from .utils import print_error
+from .trace import PROFILE_SORT_KEYS, enabled, profile_call, span, start_tracing, stop_tracing
+from .utils import print_error, print_info, print_success, format_file_size, parse_size
+
+
+def _fields_arg(value: str):
+    """argparse type for ``--fields``."""
+    from .metadata import parse_fields
+    
+    try:
+        return parse_fields(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def _size_arg(base: int):
+    """Return an argparse type for sizes like ``500M`` (``base`` 1024) or bitrates (``base`` 1000)."""
+    def parse(value: str) -> int:
+        try:
+            return parse_size(value, base)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid size: {value}")
+    return parse
+
+
+def _kinds_arg(value: str):
+    """argparse type for ``urls normalize --kind``."""
+    from .utils import URL_KINDS
+    
+    kinds = tuple(k.strip() for k in value.split(',') if k.strip())
+    unknown = [k for k in kinds if k not in URL_KINDS]
+    if not kinds or unknown:
+        raise argparse.ArgumentTypeError(
+            f"invalid kind: {', '.join(unknown) or value} (expected {', '.join(URL_KINDS)})")
+    return kinds
+
+
+def _limit_arg(value: str):
+    """argparse type for ``serve --limit TYPE=N``."""
+    from .daemon import JOB_TYPES
+    
+    job_type, _, count = value.partition('=')
+    if job_type not in JOB_TYPES or not count.isdigit() or int(count) < 1:
+        raise argparse.ArgumentTypeError(
+            f"invalid limit: {value} (expected TYPE=N with TYPE one of {', '.join(JOB_TYPES)})")
+    return job_type, int(count)
+
+
+def _add_bandwidth_args(subparser: argparse.ArgumentParser) -> None:
+    subparser.add_argument(
+        '--limit-rate',
+        type=_size_arg(1024),
+        metavar='RATE',
+        help='Total download rate in bytes per second shared by all concurrent downloads, '
+             'e.g. 50M or 1.2G (default: unlimited)'
+    )
+    subparser.add_argument(
+        '--fragments',
+        type=int,
+        metavar='N',
+        help='Fragment connections for HLS/DASH formats shared by all concurrent downloads '
+             '(default: 16; a single download without --limit-rate uses yt-dlp\'s default of 1)'
+    )
+
+
+def _bandwidth(args: argparse.Namespace, parser: argparse.ArgumentParser):
+    """Return the validated ``(rate_limit, fragments)`` budget of a command."""
+    if args.fragments is not None and args.fragments < 1:
+        parser.error("--fragments must be at least 1")
+    if args.limit_rate is not None and args.limit_rate < 1:
+        parser.error("--limit-rate must be positive")
+    return args.limit_rate, 16 if args.fragments is None else args.fragments
+
+
+def _add_via_daemon(subparser: argparse.ArgumentParser) -> None:
+    subparser.add_argument(
+        '--via-daemon',
+        action='store_true',
+        help='Run the job on a running "yt-cli serve" daemon and print its result as JSON'
+    )
 
 
 def create_parser() -> argparse.ArgumentParser:
@@ -26,6 +106,42 @@ def create_parser() -> argparse.ArgumentParser:
         version=f'%(prog)s {__version__}'
     )
     
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        help='Time each phase (imports, extraction, transfer, post-processing, encoding) and '
+             'write the spans to FILE as Chrome trace-event JSON (open in chrome://tracing or '
+             'ui.perfetto.dev)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        help='Run the command under cProfile and print its slowest functions to stderr '
+             '(main thread only)'
+    )
+    
+    parser.add_argument(
+        '--profile-sort',
+        choices=PROFILE_SORT_KEYS,
+        default='cumulative',
+        help='Order of the --profile listing (default: cumulative)'
+    )
+    
+    parser.add_argument(
+        '--metrics-file',
+        metavar='FILE',
+        help='Write Prometheus metrics to FILE (e.g. a .prom file in the node_exporter textfile '
+             'directory) while the command runs and when it ends'
+    )
+    
+    parser.add_argument(
+        '--metrics-port',
+        type=int,
+        metavar='PORT',
+        help='Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while the command runs'
+    )
+    
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
     
     # Transcript command
@@ -35,14 +151,57 @@ def create_parser() -> argparse.ArgumentParser:
     )
     transcript_parser.add_argument(
         'url',
+        nargs='?',
         help='YouTube video URL'
     )
     transcript_parser.add_argument(
         '--summary',
         choices=['short', 'medium', 'long'],
-        default='medium',
-        help='Summary length (default: medium)'
+        help='Summary length (default: medium; in batch mode, only summarize when given)'
+    )
+    transcript_parser.add_argument(
+        '--batch',
+        metavar='FILE',
+        help='Fetch transcripts for every URL or video ID listed in FILE (one per line, "-" for stdin)'
+    )
+    transcript_parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=4,
+        help='Number of concurrent fetches in batch mode (default: 4)'
+    )
+    transcript_parser.add_argument(
+        '--output',
+        '-o',
+        help='Write batch NDJSON records to this file instead of stdout'
+    )
+    transcript_parser.add_argument(
+        '--output-dir',
+        metavar='DIR',
+        help='Write each batch transcript to DIR/VIDEO_ID.json instead of NDJSON'
+    )
+    transcript_parser.add_argument(
+        '--errors',
+        help='Write batch failures to this file instead of stderr'
+    )
+    transcript_parser.add_argument(
+        '--retries',
+        type=int,
+        default=5,
+        help='Retries per video with jittered backoff while YouTube throttles requests (default: 5)'
+    )
+    transcript_parser.add_argument(
+        '--lang',
+        default='en',
+        help='Comma-separated transcript languages in order of preference (default: en)'
+    )
+    transcript_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Bypass the local transcript store'
     )
+    _add_via_daemon(transcript_parser)
     
     # Download command
     download_parser = subparsers.add_parser(
@@ -51,8 +210,26 @@ def create_parser() -> argparse.ArgumentParser:
     )
     download_parser.add_argument(
         'url',
+        nargs='?',
         help='YouTube video URL'
     )
+    download_parser.add_argument(
+        '--batch',
+        metavar='FILE',
+        help='Download every URL listed in FILE (one per line, "-" for stdin)'
+    )
+    download_parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=4,
+        help='Number of concurrent downloads in batch mode (default: 4)'
+    )
+    download_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not store the extracted metadata in the metadata cache'
+    )
     download_parser.add_argument(
         '--audio',
         action='store_true',
@@ -64,6 +241,56 @@ def create_parser() -> argparse.ArgumentParser:
         default='.',
         help='Output directory (default: current directory)'
     )
+    _add_bandwidth_args(download_parser)
+    _add_via_daemon(download_parser)
+    
+    # Sync command
+    sync_parser = subparsers.add_parser(
+        'sync',
+        help='Download the new videos of a playlist or channel'
+    )
+    sync_parser.add_argument(
+        'url',
+        help='YouTube playlist, channel or channel tab URL'
+    )
+    sync_parser.add_argument(
+        '--output',
+        '-o',
+        default='.',
+        help='Output directory (default: current directory)'
+    )
+    sync_parser.add_argument(
+        '--audio',
+        action='store_true',
+        help='Download audio only (MP3 format)'
+    )
+    sync_parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=4,
+        help='Number of concurrent downloads (default: 4)'
+    )
+    sync_parser.add_argument(
+        '--archive',
+        metavar='FILE',
+        help='Archive of downloaded video IDs, in yt-dlp --download-archive format '
+             '(default: .yt-cli-archive.txt in the output directory)'
+    )
+    sync_parser.add_argument(
+        '--stop-after',
+        type=int,
+        default=20,
+        metavar='N',
+        help='Stop listing a channel tab after N videos in a row that are already archived; '
+             '0 lists everything (default: 20; playlists are always listed in full)'
+    )
+    sync_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not store the extracted metadata in the metadata cache'
+    )
+    _add_bandwidth_args(sync_parser)
     
     # Convert command
     convert_parser = subparsers.add_parser(
@@ -79,6 +306,12 @@ def create_parser() -> argparse.ArgumentParser:
         required=True,
         help='Target format (e.g., mp3, mp4, avi)'
     )
+    convert_parser.add_argument(
+        '--plan',
+        action='store_true',
+        help='Show which streams would be copied or re-encoded, without converting'
+    )
+    _add_via_daemon(convert_parser)
     
     # Compress command
     compress_parser = subparsers.add_parser(
@@ -95,6 +328,52 @@ def create_parser() -> argparse.ArgumentParser:
         default='medium',
         help='Compression quality (default: medium)'
     )
+    compress_parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        help='Number of parallel FFmpeg processes: files at once for a folder (default: 1), '
+             'chunks at once with --chunked (default: one per CPU core)'
+    )
+    compress_parser.add_argument(
+        '--predict',
+        action='store_true',
+        help='Sample-encode each file first and skip files predicted not to shrink enough'
+    )
+    compress_parser.add_argument(
+        '--min-gain',
+        type=float,
+        metavar='PCT',
+        help='Smallest predicted size reduction worth encoding for, in percent (default: 10); '
+             'implies --predict'
+    )
+    compress_parser.add_argument(
+        '--target-size',
+        type=_size_arg(1024),
+        metavar='SIZE',
+        help='Pick the fastest settings predicted to fit SIZE (e.g. 500M); implies --predict'
+    )
+    compress_parser.add_argument(
+        '--max-bitrate',
+        type=_size_arg(1000),
+        metavar='RATE',
+        help='Pick the fastest settings predicted to stay under RATE bits/s (e.g. 2M); implies --predict'
+    )
+    compress_parser.add_argument(
+        '--chunked',
+        action='store_true',
+        help='Split a single file at keyframes and encode the chunks in parallel'
+    )
+    compress_parser.add_argument(
+        '--force',
+        action='store_true',
+        help='Recompress every file in the folder, even those already done'
+    )
+    compress_parser.add_argument(
+        '--state-dir',
+        help='Directory for the work manifest (default: the folder itself)'
+    )
+    _add_via_daemon(compress_parser)
     
     # Metadata command
     metadata_parser = subparsers.add_parser(
@@ -103,17 +382,511 @@ def create_parser() -> argparse.ArgumentParser:
     )
     metadata_parser.add_argument(
         'url',
+        nargs='?',
         help='YouTube video URL'
     )
+    metadata_parser.add_argument(
+        '--batch',
+        metavar='FILE',
+        help='Extract metadata for every URL listed in FILE (one per line, "-" for stdin)'
+    )
+    metadata_parser.add_argument(
+        '--jobs',
+        '-j',
+        type=int,
+        default=4,
+        help='Number of concurrent extractions in batch mode (default: 4)'
+    )
+    metadata_parser.add_argument(
+        '--format',
+        choices=['ndjson', 'csv'],
+        default='ndjson',
+        help='Record format in batch mode (default: ndjson)'
+    )
+    metadata_parser.add_argument(
+        '--output',
+        '-o',
+        help='Write batch records to this file instead of stdout'
+    )
+    metadata_parser.add_argument(
+        '--errors',
+        help='Write batch failures to this file instead of stderr'
+    )
     metadata_parser.add_argument(
         '--json',
         action='store_true',
         help='Output as JSON'
     )
+    metadata_parser.add_argument(
+        '--fields',
+        type=_fields_arg,
+        help='Comma-separated fields to extract (e.g. title,duration,view_count); '
+             'the cheapest extraction strategy that can fill them is used'
+    )
+    metadata_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Bypass the on-disk metadata cache'
+    )
+    metadata_parser.add_argument(
+        '--refresh',
+        action='store_true',
+        help='Ignore cached metadata and re-extract it, updating the cache'
+    )
+    _add_via_daemon(metadata_parser)
+    
+    # Cache command
+    cache_parser = subparsers.add_parser(
+        'cache',
+        help='Inspect or clear the local caches'
+    )
+    cache_parser.add_argument(
+        'action',
+        choices=['stats', 'clear'],
+        help='Show cache statistics or remove all cached entries'
+    )
+    
+    
+    # URLs command
+    urls_parser = subparsers.add_parser(
+        'urls',
+        help='Normalize and deduplicate YouTube URL lists'
+    )
+    urls_parser.add_argument(
+        'action',
+        choices=['normalize'],
+        help='Write the normalized URL of the first occurrence of each video, playlist and channel'
+    )
+    urls_parser.add_argument(
+        'input',
+        nargs='?',
+        default='-',
+        help='File with one URL per line (default: "-" for stdin)'
+    )
+    urls_parser.add_argument(
+        '--output',
+        '-o',
+        help='Write the URLs to this file instead of stdout'
+    )
+    urls_parser.add_argument(
+        '--rejects',
+        metavar='FILE',
+        help='Write the lines that are not YouTube URLs to this file'
+    )
+    urls_parser.add_argument(
+        '--kind',
+        type=_kinds_arg,
+        help='Comma-separated kinds to keep: video, shorts, playlist, channel (default: all)'
+    )
+    urls_parser.add_argument(
+        '--ids',
+        action='store_true',
+        help='Write canonical IDs instead of URLs'
+    )
+    urls_parser.add_argument(
+        '--memory',
+        type=_size_arg(1024),
+        default='64M',
+        help='Memory for deduplication before it spills to temporary files (default: 64M)'
+    )
+    
+    # Pipeline command
+    pipeline_parser = subparsers.add_parser(
+        'pipeline',
+        help='Stream URLs or files through download, convert and compress stages'
+    )
+    pipeline_parser.add_argument(
+        'spec',
+        help='Pipeline spec (JSON, or YAML with PyYAML installed)'
+    )
+    pipeline_parser.add_argument(
+        '--input',
+        '-i',
+        metavar='FILE',
+        help='Read the items from FILE (one per line, "-" for stdin) instead of the spec\'s input'
+    )
+    
+    # Serve command
+    serve_parser = subparsers.add_parser(
+        'serve',
+        help='Run a daemon that executes jobs on warm, pooled workers'
+    )
+    serve_parser.add_argument(
+        '--host',
+        default='127.0.0.1',
+        help='Address to listen on (default: 127.0.0.1)'
+    )
+    serve_parser.add_argument(
+        '--port',
+        type=int,
+        default=8737,
+        help='Port to listen on (default: 8737)'
+    )
+    serve_parser.add_argument(
+        '--limit',
+        type=_limit_arg,
+        action='append',
+        default=[],
+        metavar='TYPE=N',
+        help='Concurrent jobs of one type, e.g. download=8 (repeatable; defaults: download=4, '
+             'metadata=8, transcript=4, convert=1, compress=1)'
+    )
+    serve_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not read or write the local caches'
+    )
+    _add_bandwidth_args(serve_parser)
     
     return parser
 
 
+def show_cache_stats() -> None:
+    """Print statistics for the metadata cache and transcript store."""
+    from .cache import MetadataCache, TranscriptStore
+    
+    def hit_rate(stats):
+        lookups = stats['hits'] + stats['misses']
+        return f"{stats['hits'] / lookups * 100:.1f}%" if lookups else "n/a"
+    
+    metadata = MetadataCache().stats()
+    transcripts = TranscriptStore().stats()
+    
+    print("Metadata cache")
+    print(f"  Entries:   {metadata['entries']:,}")
+    print(f"  Hits:      {metadata['hits']:,}")
+    print(f"  Misses:    {metadata['misses']:,}")
+    print(f"  Hit rate:  {hit_rate(metadata)}")
+    print("Transcript store")
+    print(f"  Entries:   {transcripts['entries']:,}")
+    print(f"  Size:      {format_file_size(transcripts['bytes'])} "
+          f"of {format_file_size(transcripts['max_bytes'])}")
+    print(f"  Hits:      {transcripts['hits']:,}")
+    print(f"  Misses:    {transcripts['misses']:,}")
+    print(f"  Hit rate:  {hit_rate(transcripts)}")
+
+
+def run_metadata_batch(args: argparse.Namespace) -> None:
+    """Run ``metadata --batch`` with the output and error streams from ``args``."""
+    from .metadata import extract_metadata_batch
+    
+    if args.jobs < 1:
+        print_error("--jobs must be at least 1")
+        sys.exit(1)
+    
+    output = open(args.output, 'w', encoding='utf-8', newline='') if args.output else sys.stdout
+    errors = open(args.errors, 'w', encoding='utf-8') if args.errors else sys.stderr
+    try:
+        _, failed = extract_metadata_batch(args.batch, output, errors, args.format, args.jobs,
+                                           use_cache=not args.no_cache, refresh=args.refresh,
+                                           fields=args.fields)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if errors is not sys.stderr:
+            errors.close()
+    
+    if failed:
+        sys.exit(1)
+
+
+def via_daemon(args: argparse.Namespace, parser: argparse.ArgumentParser,
+               job_type: str, job_args: dict) -> bool:
+    """
+    Forward a command to the daemon if ``--via-daemon`` was given.
+    
+    Returns:
+        True if the command was run by the daemon
+    """
+    if not args.via_daemon:
+        return False
+    if getattr(args, 'batch', None):
+        parser.error("--via-daemon cannot be combined with --batch")
+        
+    from .daemon import run_via_daemon
+    
+    run_via_daemon(job_type, job_args)
+    return True
+
+
+def run_transcript_batch(args: argparse.Namespace, languages: list) -> None:
+    """Run ``transcript --batch`` with the output and error streams from ``args``."""
+    from .transcript import fetch_transcript_batch
+    
+    if args.jobs < 1:
+        print_error("--jobs must be at least 1")
+        sys.exit(1)
+        
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    errors = open(args.errors, 'w', encoding='utf-8') if args.errors else sys.stderr
+    try:
+        _, failed = fetch_transcript_batch(args.batch, output, errors, args.output_dir, languages,
+                                           args.jobs, use_cache=not args.no_cache,
+                                           retries=max(0, args.retries), summary_type=args.summary)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if errors is not sys.stderr:
+            errors.close()
+            
+    if failed:
+        sys.exit(1)
+
+
+def run_transcript(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``transcript`` command."""
+    if not args.batch and not args.url:
+        parser.error("transcript requires a URL or --batch FILE")
+    languages = [lang.strip() for lang in args.lang.split(',') if lang.strip()]
+    summary = args.summary or 'medium'
+    if via_daemon(args, parser, 'transcript', {'url': args.url, 'languages': languages,
+                                               'summary': summary, 'no_cache': args.no_cache}):
+        return
+    if args.batch:
+        run_transcript_batch(args, languages)
+        return
+        
+    from .transcript import generate_summary
+    
+    generate_summary(args.url, summary, languages, use_cache=not args.no_cache)
+
+
+def run_download(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``download`` command."""
+    if not args.batch and not args.url:
+        parser.error("download requires a URL or --batch FILE")
+    if via_daemon(args, parser, 'download', {'url': args.url, 'audio': args.audio,
+                                             'output': os.path.abspath(args.output),
+                                             'no_cache': args.no_cache}):
+        return
+        
+    rate_limit, fragments = _bandwidth(args, parser)
+    
+    from .downloader import download_video, download_batch
+    
+    if args.batch:
+        results = download_batch(args.batch, args.audio, args.output, args.jobs,
+                                 use_cache=not args.no_cache, rate_limit=rate_limit,
+                                 fragments=fragments)
+        if any(not r.ok for r in results):
+            sys.exit(1)
+    else:
+        download_video(args.url, args.audio, args.output, use_cache=not args.no_cache,
+                       rate_limit=rate_limit, fragments=args.fragments)
+
+
+def run_sync(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``sync`` command."""
+    rate_limit, fragments = _bandwidth(args, parser)
+    
+    from .sync import sync_collection
+    
+    results = sync_collection(args.url, args.output, args.audio, args.jobs, args.archive,
+                              use_cache=not args.no_cache, stop_after=max(0, args.stop_after),
+                              rate_limit=rate_limit, fragments=fragments)
+    if any(not r.ok for r in results):
+        sys.exit(1)
+
+
+def run_convert(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``convert`` command."""
+    if via_daemon(args, parser, 'convert', {'file': os.path.abspath(args.file), 'to': args.to,
+                                            'plan': args.plan}):
+        return
+        
+    from .converter import convert_file
+    
+    convert_file(args.file, args.to, plan_only=args.plan)
+
+
+def run_compress(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``compress`` command."""
+    if args.via_daemon:
+        # Daemon compress jobs encode one file in one process; the rest needs the local runner
+        local_only = [flag for flag, given in (('--chunked', args.chunked), ('--jobs', args.jobs),
+                                               ('--force', args.force), ('--state-dir', args.state_dir))
+                      if given]
+        if os.path.isdir(args.path):
+            parser.error("--via-daemon compresses a single file; run folders without it")
+        if local_only:
+            parser.error(f"--via-daemon cannot be combined with {', '.join(local_only)}")
+    if via_daemon(args, parser, 'compress', {'path': os.path.abspath(args.path),
+                                             'quality': args.quality, 'predict': args.predict,
+                                             'min_gain': args.min_gain,
+                                             'target_size': args.target_size,
+                                             'max_bitrate': args.max_bitrate}):
+        return
+        
+    from .converter import compress_file, compress_folder, PredictOptions
+    
+    predict = None
+    if args.predict or args.min_gain is not None or args.target_size or args.max_bitrate:
+        options = {'target_size': args.target_size, 'max_bitrate': args.max_bitrate}
+        if args.min_gain is not None:
+            options['min_gain'] = args.min_gain
+        predict = PredictOptions(**options)
+    
+    if os.path.isdir(args.path):
+        compress_folder(args.path, args.quality, args.jobs or 1, args.force, args.state_dir, predict)
+    else:
+        compress_file(args.path, args.quality, chunked=args.chunked, jobs=args.jobs, predict=predict)
+
+
+def run_metadata(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``metadata`` command."""
+    if not args.batch and not args.url:
+        parser.error("metadata requires a URL or --batch FILE")
+    if via_daemon(args, parser, 'metadata', {'url': args.url, 'fields': args.fields,
+                                             'no_cache': args.no_cache, 'refresh': args.refresh}):
+        return
+        
+    if args.batch:
+        run_metadata_batch(args)
+    else:
+        from .metadata import extract_metadata
+        
+        extract_metadata(args.url, args.json, use_cache=not args.no_cache,
+                         refresh=args.refresh, fields=args.fields)
+
+
+def run_cache(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``cache`` command."""
+    if args.action == 'stats':
+        show_cache_stats()
+    else:
+        from .cache import MetadataCache, TranscriptStore
+        
+        MetadataCache().clear()
+        TranscriptStore().clear()
+        print_success("Caches cleared")
+
+
+def run_urls(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``urls`` command."""
+    from .urls import normalize_urls
+    
+    output = open(args.output, 'w', encoding='utf-8') if args.output else sys.stdout
+    rejects = open(args.rejects, 'w', encoding='utf-8') if args.rejects else None
+    try:
+        normalize_urls(args.input, output, rejects, memory=args.memory, kinds=args.kind, ids=args.ids)
+    except OSError as e:
+        print_error(str(e))
+        sys.exit(1)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if rejects is not None:
+            rejects.close()
+
+
+def run_pipeline(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``pipeline`` command."""
+    from .pipeline import run_pipeline_spec
+    
+    run_pipeline_spec(args.spec, args.input)
+
+
+def run_serve(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the ``serve`` command."""
+    rate_limit, fragments = _bandwidth(args, parser)
+    
+    from .daemon import serve
+    
+    serve(args.host, args.port, dict(args.limit), use_cache=not args.no_cache,
+          rate_limit=rate_limit, fragments=fragments)
+
+
+# Module each command imports, timed separately when tracing
+COMMAND_MODULES = {
+    'transcript': 'transcript',
+    'download': 'downloader',
+    'sync': 'sync',
+    'convert': 'converter',
+    'compress': 'converter',
+    'metadata': 'metadata',
+    'cache': 'cache',
+    'urls': 'urls',
+    'pipeline': 'pipeline',
+    'serve': 'daemon',
+}
+
+COMMANDS = {
+    'transcript': run_transcript,
+    'download': run_download,
+    'sync': run_sync,
+    'convert': run_convert,
+    'compress': run_compress,
+    'metadata': run_metadata,
+    'cache': run_cache,
+    'urls': run_urls,
+    'pipeline': run_pipeline,
+    'serve': run_serve,
+}
+
+
+def run_command(args: argparse.Namespace, parser: argparse.ArgumentParser) -> None:
+    """Run the selected command, traced and profiled as requested."""
+    with span(f"yt-cli {args.command}", 'cli'):
+        if enabled():
+            # Import the command's module up front, so its import time is a phase of its own
+            module = COMMAND_MODULES[args.command]
+            with span('import', 'cli', module=module):
+                importlib.import_module(f'.{module}', __package__)
+                
+        if args.profile:
+            profile_call(COMMANDS[args.command], args, parser, sort=args.profile_sort)
+        else:
+            COMMANDS[args.command](args, parser)
+
+
+def write_trace(path: str) -> None:
+    """Stop tracing, write the spans to ``path`` and summarize them on stderr."""
+    tracer = stop_tracing()
+    if tracer is None:
+        return
+    try:
+        tracer.write(path)
+    except OSError as e:
+        print_error(f"Cannot write trace: {e}")
+        return
+    print_info(f"Trace written to {path} ({len(tracer.events)} spans)", file=sys.stderr)
+    for name, count, seconds in tracer.totals():
+        print(f"  {name:<24} {count:>6}x {seconds:>10.3f}s", file=sys.stderr)
+
+
+def start_metrics(args: argparse.Namespace, parser: argparse.ArgumentParser) -> list:
+    """Start the metrics exporters requested on the command line and return them."""
+    if args.metrics_port is not None and not 0 < args.metrics_port < 65536:
+        parser.error("--metrics-port must be between 1 and 65535")
+    if args.metrics_file is None and args.metrics_port is None:
+        return []
+        
+    from .metrics import MetricsServer, TextfileExporter
+    
+    exporters = []
+    try:
+        if args.metrics_file:
+            exporters.append(TextfileExporter(args.metrics_file))
+        if args.metrics_port is not None:
+            exporters.append(MetricsServer(('127.0.0.1', args.metrics_port)))
+            print_info(f"Serving metrics at {exporters[-1].url}", file=sys.stderr)
+    except OSError as e:
+        for exporter in exporters:
+            exporter.close()
+        print_error(f"Cannot export metrics: {e}")
+        sys.exit(1)
+    return exporters
+
+
+def stop_metrics(exporters: list) -> None:
+    """Stop the exporters, writing the final values of the metrics."""
+    for exporter in exporters:
+        try:
+            exporter.close()
+        except OSError as e:
+            print_error(f"Cannot write metrics: {e}")
+
+
 def main():
     """Main CLI entry point."""
     parser = create_parser()
@@ -123,25 +896,12 @@ def main():
         parser.print_help()
         sys.exit(0)
     
+    exporters = start_metrics(args, parser)
+    if args.trace:
+        start_tracing()
+        
     try:
-        if args.command == 'transcript':
-            generate_summary(args.url, args.summary)
-            
-        elif args.command == 'download':
-            download_video(args.url, args.audio, args.output)
-            
-        elif args.command == 'convert':
-            convert_file(args.file, args.to)
-            
-        elif args.command == 'compress':
-            import os
-            if os.path.isdir(args.path):
-                compress_folder(args.path, args.quality)
-            else:
-                compress_file(args.path, args.quality)
-                
-        elif args.command == 'metadata':
-            extract_metadata(args.url, args.json)
+        run_command(args, parser)
             
     except KeyboardInterrupt:
         print("\n\nOperation cancelled by user.")
@@ -149,6 +909,10 @@ def main():
     except Exception as e:
         print_error(f"Unexpected error: {str(e)}")
         sys.exit(1)
+    finally:
+        if args.trace:
+            write_trace(args.trace)
+        stop_metrics(exporters)
 
 
 if __name__ == '__main__':
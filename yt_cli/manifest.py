@@ -0,0 +1,168 @@
+"""
+Work manifest that makes folder compression incremental and resumable.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+
+MANIFEST_NAME = '.yt-cli-manifest.jsonl'
+
+# Bytes hashed from each end of a file for its fingerprint
+FINGERPRINT_CHUNK = 1024 * 1024
+
+
+def fingerprint(path: Path, chunk: int = FINGERPRINT_CHUNK) -> str:
+    """
+    Return a content fingerprint of a file.
+    
+    Only the size and the first and last ``chunk`` bytes are hashed, which
+    is enough to notice a replaced file without reading multi-gigabyte
+    videos in full.
+    
+    Args:
+        path: File to fingerprint
+        chunk: Bytes read from the start and from the end of the file
+        
+    Returns:
+        Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        digest.update(str(size).encode('ascii'))
+        digest.update(f.read(chunk))
+        if size > chunk:
+            f.seek(max(chunk, size - chunk))
+            digest.update(f.read(chunk))
+    return digest.hexdigest()
+
+
+class CompressManifest:
+    """
+    Record of the files a folder compression has finished.
+    
+    Each finished input gets one JSON line holding its size, mtime and
+    fingerprint, the output it produced and the encoder settings. Lines
+    are appended as files finish, so a crash loses at most the line being
+    written; later lines override earlier ones, and ``compact`` rewrites
+    the file with one line per input. The manifest lives in the folder
+    itself unless a separate state directory is given.
+    """
+    
+    def __init__(self, folder: Path, state_dir: Optional[Path] = None):
+        self.folder = Path(folder)
+        if state_dir:
+            key = hashlib.sha256(str(self.folder.resolve()).encode('utf-8')).hexdigest()[:16]
+            self.path = Path(state_dir) / f"compress-{key}.jsonl"
+        else:
+            self.path = self.folder / MANIFEST_NAME
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        
+    def load(self) -> None:
+        """Read the manifest, ignoring a torn last line."""
+        self.entries = {}
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry['input']] = entry
+                    except (ValueError, KeyError, TypeError):
+                        continue
+        except OSError:
+            pass
+            
+    def outputs(self) -> Set[str]:
+        """Return the names of every output the manifest knows about."""
+        return {entry['output'] for entry in self.entries.values() if entry.get('output')}
+        
+    def is_done(self, input_path: Path, settings: Dict[str, Any]) -> bool:
+        """
+        Check whether an input was already compressed and can be skipped.
+        
+        The input must be unchanged (same size, and the same mtime or the
+        same fingerprint), the settings must match, and the recorded output
+        must still exist with the size it had when it was finished. Inputs
+        recorded without an output were skipped on purpose and stay done
+        while unchanged.
+        
+        Args:
+            input_path: Input video
+            settings: Encoder settings of the current run
+            
+        Returns:
+            True if the recorded output is still valid
+        """
+        entry = self.entries.get(input_path.name)
+        if entry is None or entry.get('settings') != settings:
+            return False
+        try:
+            st = input_path.stat()
+            if st.st_size != entry['size']:
+                return False
+            if entry['output'] is not None:
+                output_size = (self.folder / entry['output']).stat().st_size
+                if output_size != entry['output_size']:
+                    return False
+            if st.st_mtime_ns != entry['mtime_ns'] and fingerprint(input_path) != entry['fingerprint']:
+                return False
+        except (OSError, KeyError):
+            return False
+        return True
+        
+    def record(self, input_path: Path, output_path: Optional[Path], settings: Dict[str, Any],
+               size: int, mtime_ns: int, input_fingerprint: str) -> None:
+        """
+        Append the entry for a finished input.
+        
+        The input's size, mtime and fingerprint must be captured before
+        encoding starts, so that a file modified mid-encode is redone.
+        
+        Args:
+            input_path: Input video
+            output_path: Output that was produced, or None if the input was skipped
+            settings: Encoder settings used
+            size: Input size
+            mtime_ns: Input mtime in nanoseconds
+            input_fingerprint: Input fingerprint
+        """
+        try:
+            entry = {
+                'input': input_path.name,
+                'size': size,
+                'mtime_ns': mtime_ns,
+                'fingerprint': input_fingerprint,
+                'output': output_path.name if output_path else None,
+                'output_size': output_path.stat().st_size if output_path else None,
+                'settings': settings,
+            }
+            self.entries[entry['input']] = entry
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+        except OSError:
+            pass
+            
+    def compact(self) -> None:
+        """Atomically rewrite the manifest with one line per input."""
+        if not self.entries:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=str(self.path.parent), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    for entry in self.entries.values():
+                        f.write(json.dumps(entry) + '\n')
+                os.replace(tmp_path, self.path)
+            except OSError:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass
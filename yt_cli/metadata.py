@@ -3,91 +3,446 @@ YouTube video metadata extraction module.
 """
 
 import sys
+import csv
 import json
-from typing import Dict, Any
+import time
+from typing import Dict, Any, List, Optional, Sequence, TextIO, Tuple
+from urllib.parse import quote
 import yt_dlp
-from .utils import print_error, print_success, print_info, validate_youtube_url, format_duration
+from .cache import MetadataCache
+from .metrics import count_failure
+from .pool import YoutubeDLPool
+from .trace import span
+from .utils import (
+    print_error, print_success, print_info, validate_youtube_url, format_duration,
+    extract_video_id, iter_urls, run_bounded
+)
 
 
-def extract_metadata(video_url: str, output_json: bool = False) -> None:
+# Column order for CSV output
+METADATA_FIELDS = [
+    'video_id', 'url', 'title', 'channel', 'channel_id', 'duration',
+    'duration_formatted', 'view_count', 'like_count', 'upload_date',
+    'thumbnail', 'categories', 'tags', 'description',
+]
+
+BATCH_FORMATS = ('ndjson', 'csv')
+
+# Extraction strategies from cheapest to most expensive, with the fields
+# each one can fill. 'url' needs no network access at all, 'oembed' makes
+# a single small JSON request, 'lightweight' extracts the watch page
+# without resolving formats or downloading the player JavaScript, and
+# 'full' is the regular yt-dlp extraction with format selection.
+STRATEGY_FIELDS = {
+    'url': {'video_id', 'url'},
+    'oembed': {'video_id', 'url', 'title', 'channel', 'thumbnail'},
+    'lightweight': set(METADATA_FIELDS),
+    'full': set(METADATA_FIELDS),
+}
+
+STRATEGIES = list(STRATEGY_FIELDS)
+
+OEMBED_URL = 'https://www.youtube.com/oembed?format=json&url='
+
+
+def parse_fields(value: str) -> List[str]:
     """
-    Extract and display metadata from a YouTube video.
+    Parse a comma-separated ``--fields`` value.
     
     Args:
-        video_url: YouTube video URL
-        output_json: If True, output as JSON
+        value: Field names separated by commas
+        
+    Returns:
+        List of field names, in the given order
+        
+    Raises:
+        ValueError: If a field name is unknown
     """
-    if not validate_youtube_url(video_url):
-        print_error("Invalid YouTube URL")
-        sys.exit(1)
-    
-    print_info("Extracting metadata...")
+    fields = [f.strip() for f in value.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in METADATA_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}. "
+                         f"Available: {', '.join(METADATA_FIELDS)}")
+    if not fields:
+        raise ValueError("No fields given")
+    return fields
+
+
+def choose_strategy(fields: Optional[Sequence[str]] = None) -> str:
+    """
+    Pick the cheapest extraction strategy able to fill ``fields``.
     
+    Args:
+        fields: Requested fields (None requests the full record)
+        
+    Returns:
+        Strategy name, one of ``STRATEGIES``
+    """
+    if not fields:
+        return 'full'
+    for strategy in STRATEGIES:
+        if STRATEGY_FIELDS[strategy].issuperset(fields):
+            return strategy
+    return 'full'
+
+
+def ydl_opts_for(strategy: str) -> Dict[str, Any]:
+    """Return the yt-dlp options used by an extraction strategy."""
     ydl_opts = {
         'quiet': True,
         'no_warnings': True,
         'extract_flat': False,
     }
+    if strategy == 'lightweight':
+        ydl_opts['extractor_args'] = {
+            'youtube': {
+                'skip': ['dash', 'hls', 'translated_subs'],
+                'player_skip': ['js', 'configs'],
+            },
+        }
+    return ydl_opts
+
+
+def build_metadata(info: Dict[str, Any], video_url: str) -> Dict[str, Any]:
+    """
+    Build the metadata record for a video from a yt-dlp info dict.
+    
+    Args:
+        info: Info dictionary returned by ``YoutubeDL.extract_info``
+        video_url: URL the metadata was requested for
+        
+    Returns:
+        Metadata dictionary
+    """
+    thumbnail = info.get('thumbnail')
+    if not thumbnail and info.get('thumbnails'):
+        # Unprocessed results only carry the list of candidates
+        thumbnail = info['thumbnails'][-1].get('url')
+        
+    return {
+        'title': info.get('title', 'N/A'),
+        'channel': info.get('uploader', 'N/A'),
+        'channel_id': info.get('channel_id', 'N/A'),
+        'duration': info.get('duration', 0),
+        'duration_formatted': format_duration(info.get('duration', 0)),
+        'view_count': info.get('view_count', 0),
+        'like_count': info.get('like_count', 0),
+        'upload_date': info.get('upload_date', 'N/A'),
+        'description': info.get('description', 'N/A'),
+        'thumbnail': thumbnail or 'N/A',
+        'video_id': info.get('id', 'N/A'),
+        'url': video_url,
+        'categories': info.get('categories', []),
+        'tags': info.get('tags', []),
+    }
+
+
+def cache_metadata(cache: MetadataCache, metadata: Dict[str, Any]) -> None:
+    """Store a metadata record, minus its per-request and derived fields."""
+    video_id = metadata.get('video_id')
+    if video_id and video_id != 'N/A':
+        cache.put(video_id, {k: v for k, v in metadata.items()
+                             if k not in ('url', 'duration_formatted')})
+
+
+def _extract_info(ydl: Any, video_url: str, video_id: Optional[str],
+                  strategy: str) -> Dict[str, Any]:
+    """Run an extraction strategy and return a yt-dlp style info dict."""
+    if strategy == 'url':
+        if not video_id:
+            raise ValueError("Could not extract a video ID from the URL")
+        return {'id': video_id}
+        
+    if strategy == 'oembed':
+        if not video_id:
+            raise ValueError("Could not extract a video ID from the URL")
+        watch_url = f'https://www.youtube.com/watch?v={video_id}'
+        with ydl.urlopen(OEMBED_URL + quote(watch_url, safe='')) as response:
+            data = json.load(response)
+        return {
+            'id': video_id,
+            'title': data.get('title', 'N/A'),
+            'uploader': data.get('author_name', 'N/A'),
+            'thumbnail': data.get('thumbnail_url'),
+        }
+        
+    if strategy == 'lightweight':
+        # Skip yt-dlp's format processing; the extractor arguments from
+        # ydl_opts_for() also skip the player JavaScript and manifests
+        return ydl.extract_info(video_url, download=False, process=False)
+        
+    return ydl.extract_info(video_url, download=False)
+
+
+def fetch_metadata_with_strategy(video_url: str, fields: Optional[Sequence[str]] = None,
+                                 ydl: Optional[Any] = None,
+                                 cache: Optional[MetadataCache] = None,
+                                 refresh: bool = False) -> Tuple[Dict[str, Any], str]:
+    """
+    Fetch a (possibly projected) metadata record and report how it was obtained.
     
-    try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(video_url, download=False)
+    Args:
+        video_url: YouTube video URL
+        fields: Fields to return (None returns the full record)
+        ydl: ``YoutubeDL`` instance to reuse, configured with
+            ``ydl_opts_for(choose_strategy(fields))`` (created if None)
+        cache: Metadata cache to read from and write to (None disables caching)
+        refresh: If True, skip the cache lookup but still store the result
+        
+    Returns:
+        Tuple of (metadata, source), where source is 'cache' or the
+        extraction strategy that was used
+        
+    Raises:
+        yt_dlp.utils.DownloadError: If extraction fails
+    """
+    video_id = extract_video_id(video_url)
+    strategy = choose_strategy(fields)
+    
+    metadata = None
+    source = strategy
+    
+    if cache is not None and video_id and not refresh and strategy != 'url':
+        with span('cache_lookup', 'metadata') as lookup:
+            cached = cache.get(video_id, fields)
+            lookup.set(hit=cached is not None)
+        if cached is not None:
+            cached['url'] = video_url
+            cached['duration_formatted'] = format_duration(cached.get('duration') or 0)
+            metadata, source = cached, 'cache'
             
-            # Extract relevant metadata
-            metadata = {
-                'title': info.get('title', 'N/A'),
-                'channel': info.get('uploader', 'N/A'),
-                'channel_id': info.get('channel_id', 'N/A'),
-                'duration': info.get('duration', 0),
-                'duration_formatted': format_duration(info.get('duration', 0)),
-                'view_count': info.get('view_count', 0),
-                'like_count': info.get('like_count', 0),
-                'upload_date': info.get('upload_date', 'N/A'),
-                'description': info.get('description', 'N/A'),
-                'thumbnail': info.get('thumbnail', 'N/A'),
-                'video_id': info.get('id', 'N/A'),
-                'url': video_url,
-                'categories': info.get('categories', []),
-                'tags': info.get('tags', []),
-            }
+    if metadata is None:
+        try:
+            with span('extract_info', 'metadata', url=video_url, strategy=strategy):
+                if ydl is None:
+                    with yt_dlp.YoutubeDL(ydl_opts_for(strategy)) as own_ydl:
+                        info = _extract_info(own_ydl, video_url, video_id, strategy)
+                else:
+                    info = _extract_info(ydl, video_url, video_id, strategy)
+        except Exception as e:
+            count_failure('metadata', e)
+            raise
             
-            if output_json:
-                # Output as JSON
-                print(json.dumps(metadata, indent=2))
-            else:
-                # Output as formatted text
-                print_success("Metadata extracted:\n")
-                print("=" * 80)
-                print(f"Title:        {metadata['title']}")
-                print(f"Channel:      {metadata['channel']}")
-                print(f"Video ID:     {metadata['video_id']}")
-                print(f"Duration:     {metadata['duration_formatted']}")
-                print(f"Views:        {metadata['view_count']:,}")
-                print(f"Likes:        {metadata['like_count']:,}")
-                print(f"Upload Date:  {metadata['upload_date']}")
-                print(f"Thumbnail:    {metadata['thumbnail']}")
-                
-                if metadata['categories']:
-                    print(f"Categories:   {', '.join(metadata['categories'])}")
-                
-                if metadata['tags']:
-                    tags_preview = ', '.join(metadata['tags'][:5])
-                    if len(metadata['tags']) > 5:
-                        tags_preview += f"... (+{len(metadata['tags']) - 5} more)"
-                    print(f"Tags:         {tags_preview}")
-                
-                print(f"\nDescription:")
-                print("-" * 80)
-                # Limit description to first 500 characters
-                desc = metadata['description']
-                if len(desc) > 500:
-                    desc = desc[:500] + "..."
-                print(desc)
-                print("=" * 80)
+        metadata = build_metadata(info, video_url)
+        # Only complete records are cached; partial ones would shadow them
+        if cache is not None and STRATEGY_FIELDS[strategy] == set(METADATA_FIELDS):
+            cache_metadata(cache, metadata)
             
+    if fields:
+        metadata = {f: metadata.get(f) for f in fields}
+    return metadata, source
+
+
+def fetch_metadata(video_url: str, ydl: Optional[Any] = None,
+                   cache: Optional[MetadataCache] = None,
+                   refresh: bool = False,
+                   fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Fetch the metadata record for a video, using the cache when possible.
+    
+    Args:
+        video_url: YouTube video URL
+        ydl: ``YoutubeDL`` instance to reuse (a new one is created if None)
+        cache: Metadata cache to read from and write to (None disables caching)
+        refresh: If True, skip the cache lookup but still store the result
+        fields: Fields to return (None returns the full record)
+        
+    Returns:
+        Metadata dictionary
+        
+    Raises:
+        yt_dlp.utils.DownloadError: If extraction fails
+    """
+    metadata, _ = fetch_metadata_with_strategy(video_url, fields, ydl, cache, refresh)
+    return metadata
+
+
+def print_metadata(metadata: Dict[str, Any], output_json: bool = False) -> None:
+    """
+    Display a metadata record.
+    
+    Args:
+        metadata: Metadata dictionary (possibly projected to a subset of fields)
+        output_json: If True, output as JSON
+    """
+    if output_json:
+        # Output as JSON
+        print(json.dumps(metadata, indent=2))
+    elif set(metadata) != set(METADATA_FIELDS):
+        # Projected record: list just the requested fields
+        print_success("Metadata extracted:\n")
+        width = max(len(k) for k in metadata) + 2
+        for key, value in metadata.items():
+            if isinstance(value, list):
+                value = ', '.join(value)
+            print(f"{key + ':':<{width}}{value}")
+    else:
+        # Output as formatted text
+        print_success("Metadata extracted:\n")
+        print("=" * 80)
+        print(f"Title:        {metadata['title']}")
+        print(f"Channel:      {metadata['channel']}")
+        print(f"Video ID:     {metadata['video_id']}")
+        print(f"Duration:     {metadata['duration_formatted']}")
+        print(f"Views:        {metadata['view_count']:,}")
+        print(f"Likes:        {metadata['like_count']:,}")
+        print(f"Upload Date:  {metadata['upload_date']}")
+        print(f"Thumbnail:    {metadata['thumbnail']}")
+        
+        if metadata['categories']:
+            print(f"Categories:   {', '.join(metadata['categories'])}")
+            
+        if metadata['tags']:
+            tags_preview = ', '.join(metadata['tags'][:5])
+            if len(metadata['tags']) > 5:
+                tags_preview += f"... (+{len(metadata['tags']) - 5} more)"
+            print(f"Tags:         {tags_preview}")
+            
+        print(f"\nDescription:")
+        print("-" * 80)
+        # Limit description to first 500 characters
+        desc = metadata['description']
+        if len(desc) > 500:
+            desc = desc[:500] + "..."
+        print(desc)
+        print("=" * 80)
+
+
+def extract_metadata(video_url: str, output_json: bool = False,
+                     use_cache: bool = True, refresh: bool = False,
+                     fields: Optional[Sequence[str]] = None) -> None:
+    """
+    Extract and display metadata from a YouTube video.
+    
+    Args:
+        video_url: YouTube video URL
+        output_json: If True, output as JSON
+        use_cache: If False, bypass the on-disk metadata cache entirely
+        refresh: If True, re-extract and overwrite the cached entry
+        fields: Fields to extract (None extracts the full record)
+    """
+    if not validate_youtube_url(video_url):
+        print_error("Invalid YouTube URL")
+        sys.exit(1)
+        
+    print_info("Extracting metadata...")
+    
+    cache = MetadataCache() if use_cache else None
+    
+    try:
+        metadata, source = fetch_metadata_with_strategy(video_url, fields, cache=cache,
+                                                        refresh=refresh)
+        if fields:
+            print_info(f"Strategy: {source}")
+        print_metadata(metadata, output_json)
+        
     except yt_dlp.utils.DownloadError as e:
         print_error(f"Failed to extract metadata: {str(e)}")
         sys.exit(1)
     except Exception as e:
         print_error(f"An error occurred: {str(e)}")
         sys.exit(1)
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+class MetadataWriter:
+    """
+    Streams metadata records to an output as NDJSON or CSV.
+    
+    Each record is written and flushed as soon as it is received, so
+    nothing is accumulated in memory.
+    """
+    
+    def __init__(self, stream: TextIO, output_format: str = 'ndjson',
+                 fields: Optional[Sequence[str]] = None):
+        if output_format not in BATCH_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+        self.stream = stream
+        self.output_format = output_format
+        self._csv = None
+        if output_format == 'csv':
+            self._csv = csv.DictWriter(stream, fieldnames=list(fields or METADATA_FIELDS),
+                                       extrasaction='ignore')
+            self._csv.writeheader()
+            
+    def write(self, metadata: Dict[str, Any]) -> None:
+        """Write one record."""
+        if self._csv is not None:
+            row = {k: '|'.join(v) if isinstance(v, list) else v
+                   for k, v in metadata.items()}
+            self._csv.writerow(row)
+        else:
+            self.stream.write(json.dumps(metadata, ensure_ascii=False) + '\n')
+        self.stream.flush()
+
+
+def _fetch_one(pool: YoutubeDLPool, video_url: str, fields: Optional[Sequence[str]],
+               cache: Optional[MetadataCache], refresh: bool) -> Tuple[Dict[str, Any], str]:
+    """Fetch one record with the calling thread's ``YoutubeDL`` instance."""
+    if not validate_youtube_url(video_url):
+        raise ValueError("Invalid YouTube URL")
+    ydl, _ = pool.get()
+    return fetch_metadata_with_strategy(video_url, fields, ydl, cache, refresh)
+
+
+def extract_metadata_batch(source: str, output: TextIO = sys.stdout,
+                           errors: TextIO = sys.stderr, output_format: str = 'ndjson',
+                           jobs: int = 4, use_cache: bool = True,
+                           refresh: bool = False,
+                           fields: Optional[Sequence[str]] = None) -> Tuple[int, int]:
+    """
+    Extract metadata for every URL listed in a file (or stdin) concurrently.
+    
+    Records are streamed to ``output`` in completion order as soon as each
+    one is ready. Failed URLs are written to ``errors`` as NDJSON objects
+    with ``url`` and ``error`` keys and do not stop the run. URLs are read
+    lazily and only a bounded number are in flight, so memory use does not
+    grow with the size of the input.
+    
+    Args:
+        source: Path to a file with one URL per line, or ``-`` for stdin
+        output: Stream receiving the records
+        errors: Stream receiving the failures
+        output_format: 'ndjson' or 'csv'
+        jobs: Number of concurrent extractions
+        use_cache: If False, bypass the on-disk metadata cache entirely
+        refresh: If True, re-extract and overwrite cached entries
+        fields: Fields to extract (None extracts the full record)
+        
+    Returns:
+        Tuple of (succeeded, failed) counts
+    """
+    writer = MetadataWriter(output, output_format, fields)
+    pool = YoutubeDLPool(ydl_opts_for(choose_strategy(fields)))
+    cache = MetadataCache() if use_cache else None
+    
+    succeeded = failed = 0
+    sources: Dict[str, int] = {}
+    start = time.monotonic()
+    
+    try:
+        for url, result, error in run_bounded(
+                lambda u: _fetch_one(pool, u, fields, cache, refresh), iter_urls(source), jobs):
+            if error is None:
+                metadata, used = result
+                writer.write(metadata)
+                sources[used] = sources.get(used, 0) + 1
+                succeeded += 1
+            else:
+                errors.write(json.dumps({'url': url, 'error': str(error)}) + '\n')
+                errors.flush()
+                failed += 1
+    finally:
+        pool.close()
+        if cache is not None:
+            cache.close()
+        
+    elapsed = time.monotonic() - start
+    print_info(f"Extracted {succeeded} record(s), {failed} failed, in {elapsed:.1f}s",
+               file=sys.stderr)
+    if sources:
+        used = ', '.join(f"{name}: {count}" for name, count in sorted(sources.items()))
+        print_info(f"Strategy: {used}", file=sys.stderr)
+    return succeeded, failed
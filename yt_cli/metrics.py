@@ -0,0 +1,361 @@
+"""
+Prometheus metrics for batch runs and long-running workers.
+
+Counters, gauges and histograms are kept in a process-wide registry and
+exported in the Prometheus text format (0.0.4), which OpenMetrics
+scrapers also accept:
+
+* ``TextfileExporter`` writes them to a ``.prom`` file for node_exporter's
+  textfile collector (``yt-cli --metrics-file``), rewriting it atomically
+  every few seconds and once more when the command ends, and
+* ``MetricsServer`` serves ``GET /metrics`` on localhost
+  (``yt-cli --metrics-port``); ``yt-cli serve`` also serves ``/metrics``
+  on its own port.
+
+Updating a metric takes a lock and a dictionary update, so metrics can be
+fed from progress hooks.
+"""
+
+import math
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+from . import __version__
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds between rewrites of the textfile
+TEXTFILE_INTERVAL = 15.0
+
+# Encode speed buckets, in media seconds per wall-clock second
+SPEED_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0, 64.0, 128.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str, quotes: bool = True) -> str:
+    value = value.replace('\\', r'\\').replace('\n', r'\n')
+    return value.replace('"', r'\"') if quotes else value
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class Metric:
+    """
+    Base class of the metric types.
+    
+    Args:
+        name: Metric name, e.g. ``yt_cli_download_bytes_total``
+        documentation: ``# HELP`` text
+        labelnames: Names of the labels every update must give
+        registry: Registry to add the metric to (None to keep it unregistered)
+    """
+    
+    kind = 'untyped'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional['Registry'] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # A metric without labels is exported (as zero) before its first update
+            self._values[()] = self._initial()
+        if registry is not None:
+            registry.register(self)
+            
+    def _initial(self) -> object:
+        return 0.0
+        
+    def _key(self, labels: Dict[str, object]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes the labels {', '.join(self.labelnames) or '(none)'}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+        
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        """Yield ``(name, labels, value)`` samples for the exposition."""
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            yield self.name, _format_labels(self.labelnames, key), value
+            
+    def get(self, **labels: object) -> float:
+        """Current value of one label combination (0 if never updated)."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+            
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(Metric):
+    """A total that only goes up."""
+    
+    kind = 'counter'
+    
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError("counters can only increase")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(Metric):
+    """A value that can go up and down."""
+    
+    kind = 'gauge'
+    
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+            
+    def inc(self, amount: float = 1.0, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+            
+    def dec(self, amount: float = 1.0, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    """
+    Counts observations in cumulative buckets, with their sum and count.
+    
+    Args:
+        buckets: Upper bounds of the buckets, in increasing order (``+Inf`` is added)
+    """
+    
+    kind = 'histogram'
+    
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional['Registry'] = None, buckets: Sequence[float] = SPEED_BUCKETS):
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        super().__init__(name, documentation, labelnames, registry)
+        
+    def _initial(self) -> object:
+        return [0] * len(self.buckets) + [0.0]
+        
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.setdefault(key, self._initial())
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-1] += value
+            
+    def get(self, **labels: object) -> float:
+        """Number of observations of one label combination."""
+        with self._lock:
+            counts = self._values.get(self._key(labels))
+        return counts[-2] if counts else 0
+        
+    def samples(self) -> Iterator[Tuple[str, str, float]]:
+        with self._lock:
+            values = sorted((key, list(counts)) for key, counts in self._values.items())
+        names = self.labelnames + ('le',)
+        for key, counts in values:
+            for bound, count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket", _format_labels(names, key + (_format_value(bound),)), count
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum", labels, counts[-1]
+            yield f"{self.name}_count", labels, counts[-2]
+
+
+class Registry:
+    """The metrics of a process, in registration order."""
+    
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._lock = threading.Lock()
+        
+    def register(self, metric: Metric) -> None:
+        with self._lock:
+            if any(m.name == metric.name for m in self._metrics):
+                raise ValueError(f"Duplicate metric: {metric.name}")
+            self._metrics.append(metric)
+            
+    def metrics(self) -> List[Metric]:
+        with self._lock:
+            return list(self._metrics)
+            
+    def exposition(self) -> str:
+        """Render every metric in the Prometheus text format."""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation, quotes=False)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+BUILD_INFO = Gauge('yt_cli_build_info', 'yt-cli version', ['version'], REGISTRY)
+START_TIME = Gauge('yt_cli_start_time_seconds', 'Unix time the process started', registry=REGISTRY)
+DOWNLOAD_BYTES = Counter('yt_cli_download_bytes_total', 'Bytes received by downloads', registry=REGISTRY)
+DOWNLOADS = Counter('yt_cli_downloads_total', 'Finished downloads by result', ['result'], REGISTRY)
+FAILURES = Counter('yt_cli_failures_total', 'Failed operations by operation and error type',
+                   ['operation', 'error'], REGISTRY)
+CACHE_REQUESTS = Counter('yt_cli_cache_requests_total', 'Cache lookups by cache and result',
+                         ['cache', 'result'], REGISTRY)
+FFMPEG_RUNS = Counter('yt_cli_ffmpeg_runs_total', 'FFmpeg processes by preset and result',
+                      ['preset', 'result'], REGISTRY)
+FFMPEG_SECONDS = Counter('yt_cli_ffmpeg_seconds_total', 'Wall-clock seconds spent in FFmpeg by preset',
+                         ['preset'], REGISTRY)
+ENCODE_SPEED = Histogram('yt_cli_encode_speed_ratio',
+                         'FFmpeg speed in media seconds per wall-clock second, by preset',
+                         ['preset'], REGISTRY, SPEED_BUCKETS)
+
+BUILD_INFO.set(1, version=__version__)
+START_TIME.set(time.time())
+
+
+def error_type(error: BaseException) -> str:
+    """
+    Name the type of an error for the ``error`` label.
+    
+    yt-dlp wraps extraction and network errors in ``DownloadError``; the
+    wrapped error is named instead, e.g. ``ExtractorError`` or ``HTTPError``.
+    """
+    cause = getattr(error, 'exc_info', None)
+    if isinstance(cause, tuple) and len(cause) > 1 and isinstance(cause[1], BaseException):
+        error = cause[1]
+    return type(error).__name__
+
+
+def count_failure(operation: str, error: BaseException) -> None:
+    """Count a failed operation by the type of its error."""
+    FAILURES.inc(operation=operation, error=error_type(error))
+
+
+def write_textfile(path: str, registry: Registry = REGISTRY) -> None:
+    """Write the metrics to ``path`` atomically, as the textfile collector expects."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(registry.exposition())
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+class TextfileExporter:
+    """
+    Rewrites a textfile every ``interval`` seconds until closed.
+    
+    Args:
+        path: File to write, e.g. ``/var/lib/node_exporter/textfile/yt-cli.prom``
+        interval: Seconds between rewrites
+        registry: Metrics to export
+        
+    Raises:
+        OSError: If the file cannot be written
+    """
+    
+    def __init__(self, path: str, interval: float = TEXTFILE_INTERVAL, registry: Registry = REGISTRY):
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        write_textfile(path, registry)
+        self._thread = threading.Thread(target=self._run, name='metrics-textfile', daemon=True)
+        self._thread.start()
+        
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                write_textfile(self.path, self.registry)
+            except OSError:
+                pass
+                
+    def close(self) -> None:
+        """Stop rewriting and write the final values."""
+        self._stop.set()
+        self._thread.join()
+        write_textfile(self.path, self.registry)
+
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """Serves ``GET /metrics``."""
+    
+    server: 'MetricsServer'
+    
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+        
+    def do_GET(self) -> None:
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        send_metrics(self, self.server.registry)
+
+
+def send_metrics(handler: BaseHTTPRequestHandler, registry: Registry = REGISTRY) -> None:
+    """Answer an HTTP request with the metrics."""
+    data = registry.exposition().encode('utf-8')
+    handler.send_response(200)
+    handler.send_header('Content-Type', CONTENT_TYPE)
+    handler.send_header('Content-Length', str(len(data)))
+    handler.end_headers()
+    handler.wfile.write(data)
+
+
+class MetricsServer(ThreadingHTTPServer):
+    """
+    Background HTTP server for ``GET /metrics``.
+    
+    Args:
+        address: ``(host, port)`` to listen on; keep it on loopback
+        registry: Metrics to serve
+        
+    Raises:
+        OSError: If the address cannot be bound
+    """
+    
+    daemon_threads = True
+    
+    def __init__(self, address: Tuple[str, int], registry: Registry = REGISTRY):
+        super().__init__(address, MetricsRequestHandler)
+        self.registry = registry
+        self._thread = threading.Thread(target=self.serve_forever, name='metrics-server', daemon=True)
+        self._thread.start()
+        
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+        
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
@@ -0,0 +1,437 @@
+"""
+Streaming pipeline that chains download, convert and compress stages.
+
+Items flow through the stages one by one instead of stage by stage: as
+soon as a URL is downloaded it is handed to the converter while the next
+downloads are still running, so network-bound and CPU-bound work overlap.
+Each stage has its own concurrency limit and its own worker threads (a
+download slot keeps a warm ``YoutubeDL`` instance, a converter slot waits
+on one FFmpeg process). Stages are connected by bounded queues: when a
+slow stage falls behind, the stages before it block instead of piling up
+finished work.
+
+A pipeline is described by a JSON (or, with PyYAML installed, YAML) spec:
+
+    {
+        "input": "urls.txt",
+        "queue_size": 2,
+        "stages": [
+            {"type": "download", "output": "videos", "jobs": 4, "limit_rate": "50M"},
+            {"type": "convert", "to": "mp4"},
+            {"type": "compress", "quality": "medium", "jobs": 2}
+        ]
+    }
+
+``input`` is a list of URLs (or file paths when there is no download
+stage) or a file listing them, one per line. A download stage's
+``limit_rate`` and ``fragments`` are budgets shared by its jobs.
+"""
+
+import asyncio
+import contextlib
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .utils import (
+    print_error, print_info, print_success, format_file_size, iter_urls, parse_size
+)
+
+
+DEFAULT_QUEUE_SIZE = 2
+
+STAGE_TYPES = ('download', 'convert', 'compress')
+
+# Concurrent items per stage unless the spec sets "jobs"
+DEFAULT_STAGE_JOBS = {
+    'download': 4,
+    'convert': 1,
+    'compress': 1,
+}
+
+_DONE = object()
+
+
+class PipelineError(Exception):
+    """Raised for an invalid pipeline spec."""
+
+
+@dataclass
+class Stage:
+    """
+    One step of a pipeline.
+    
+    ``func`` is a blocking callable run on the stage's worker threads. It is
+    given the value produced by the previous stage (or the input item) and
+    returns the value for the next one; an exception fails the item.
+    """
+    
+    name: str
+    func: Callable[[Any], Any]
+    concurrency: int = 1
+
+
+@dataclass
+class StageStats:
+    """Work done by one stage during a run."""
+    
+    name: str
+    concurrency: int
+    processed: int = 0
+    failed: int = 0
+    busy: float = 0.0
+    peak_queue: int = 0
+    
+    def utilization(self, elapsed: float) -> float:
+        """Fraction of the stage's slot-time spent working, from 0 to 1."""
+        if elapsed <= 0:
+            return 0.0
+        return min(1.0, self.busy / (elapsed * self.concurrency))
+
+
+@dataclass
+class ItemResult:
+    """Outcome of one input item: the last stage's value, or where it failed."""
+    
+    item: Any
+    value: Any = None
+    error: Optional[str] = None
+    stage: Optional[str] = None
+    
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+async def _run_stage(stage: Stage, stats: StageStats, inbox: asyncio.Queue,
+                     outbox: Optional[asyncio.Queue], executor: ThreadPoolExecutor,
+                     finish: Callable[[ItemResult], None]) -> None:
+    """Worker coroutine: move items from ``inbox`` through ``stage`` to ``outbox``."""
+    loop = asyncio.get_running_loop()
+    while True:
+        stats.peak_queue = max(stats.peak_queue, inbox.qsize())
+        entry = await inbox.get()
+        if entry is _DONE:
+            return
+        item, value = entry
+        start = time.monotonic()
+        try:
+            value = await loop.run_in_executor(executor, stage.func, value)
+        except Exception as e:
+            stats.failed += 1
+            finish(ItemResult(item, error=str(e) or type(e).__name__, stage=stage.name))
+            continue
+        finally:
+            stats.busy += time.monotonic() - start
+        stats.processed += 1
+        if outbox is None:
+            finish(ItemResult(item, value))
+        else:
+            # Blocks while the next stage is saturated: this is the backpressure
+            await outbox.put((item, value))
+
+
+async def run_pipeline_async(items: Iterable[Any], stages: List[Stage],
+                             queue_size: int = DEFAULT_QUEUE_SIZE,
+                             on_result: Optional[Callable[[ItemResult], None]] = None
+                             ) -> Tuple[List[ItemResult], List[StageStats]]:
+    """
+    Stream ``items`` through ``stages``; see ``run_pipeline``.
+    """
+    if not stages:
+        raise PipelineError("A pipeline needs at least one stage")
+        
+    results: List[ItemResult] = []
+    
+    def finish(result: ItemResult) -> None:
+        results.append(result)
+        if on_result:
+            on_result(result)
+            
+    stats = [StageStats(s.name, max(1, s.concurrency)) for s in stages]
+    queues = [asyncio.Queue(maxsize=max(1, queue_size)) for _ in stages]
+    executors = [ThreadPoolExecutor(max_workers=st.concurrency, thread_name_prefix=f'pipeline-{st.name}')
+                 for st in stats]
+    workers = []
+    for i, stage in enumerate(stages):
+        outbox = queues[i + 1] if i + 1 < len(stages) else None
+        workers.append([
+            asyncio.ensure_future(_run_stage(stage, stats[i], queues[i], outbox, executors[i], finish))
+            for _ in range(stats[i].concurrency)
+        ])
+        
+    try:
+        # Items are read lazily, off the event loop in case they come from
+        # stdin; the first queue blocks the feed when it is full
+        loop = asyncio.get_running_loop()
+        items = iter(items)
+        while True:
+            item = await loop.run_in_executor(None, next, items, _DONE)
+            if item is _DONE:
+                break
+            await queues[0].put((item, item))
+        # Each stage is told to stop once everything before it has drained
+        for i in range(len(stages)):
+            for _ in workers[i]:
+                await queues[i].put(_DONE)
+            await asyncio.gather(*workers[i])
+    finally:
+        for tasks in workers:
+            for task in tasks:
+                task.cancel()
+        for executor in executors:
+            executor.shutdown(wait=True)
+    return results, stats
+
+
+def run_pipeline(items: Iterable[Any], stages: List[Stage],
+                 queue_size: int = DEFAULT_QUEUE_SIZE,
+                 on_result: Optional[Callable[[ItemResult], None]] = None
+                 ) -> Tuple[List[ItemResult], List[StageStats]]:
+    """
+    Stream ``items`` through ``stages``, running the stages concurrently.
+    
+    An item enters a stage as soon as the previous stage is done with it.
+    Up to ``stage.concurrency`` items are processed by a stage at once, and
+    at most ``queue_size`` finished items wait in front of the next stage.
+    A failing item is reported and dropped without stopping the others.
+    
+    Args:
+        items: Input items, read lazily
+        stages: Stages in order
+        queue_size: Capacity of the queue in front of each stage
+        on_result: Called with each item's result as soon as it is known
+        
+    Returns:
+        Tuple of (results in completion order, per-stage statistics)
+    """
+    return asyncio.run(run_pipeline_async(items, stages, queue_size, on_result))
+
+
+def load_spec(path: str) -> Dict[str, Any]:
+    """
+    Read and validate a pipeline spec.
+    
+    Args:
+        path: JSON spec, or YAML if the name ends in ``.yaml``/``.yml``
+        
+    Returns:
+        Spec dictionary
+        
+    Raises:
+        PipelineError: If the spec cannot be read or is invalid
+    """
+    try:
+        with open(path, encoding='utf-8') as f:
+            if path.endswith(('.yaml', '.yml')):
+                try:
+                    import yaml
+                except ImportError:
+                    raise PipelineError("YAML specs need PyYAML (pip install pyyaml); "
+                                        "or write the spec as JSON")
+                spec = yaml.safe_load(f)
+            else:
+                spec = json.load(f)
+    except OSError as e:
+        raise PipelineError(f"Cannot read pipeline spec: {e}")
+    except ValueError as e:
+        raise PipelineError(f"Invalid pipeline spec: {e}")
+        
+    if not isinstance(spec, dict):
+        raise PipelineError("A pipeline spec must be a mapping")
+    stages = spec.get('stages')
+    if not isinstance(stages, list) or not stages:
+        raise PipelineError("A pipeline spec needs a non-empty 'stages' list")
+    queue_size = spec.get('queue_size', DEFAULT_QUEUE_SIZE)
+    if not isinstance(queue_size, int) or queue_size < 1:
+        raise PipelineError("A pipeline spec needs a 'queue_size' of at least 1")
+    for i, stage in enumerate(stages):
+        if not isinstance(stage, dict) or stage.get('type') not in STAGE_TYPES:
+            raise PipelineError(f"Stage {i + 1} needs a 'type' of {', '.join(STAGE_TYPES)}")
+        if stage['type'] == 'download' and i > 0:
+            raise PipelineError("The download stage must come first")
+        if stage['type'] == 'convert' and not stage.get('to'):
+            raise PipelineError(f"Stage {i + 1} (convert) needs a target format in 'to'")
+        jobs = stage.get('jobs', 1)
+        if not isinstance(jobs, int) or jobs < 1:
+            raise PipelineError(f"Stage {i + 1} ({stage['type']}) needs 'jobs' of at least 1")
+    return spec
+
+
+def spec_inputs(spec: Dict[str, Any], source: Optional[str] = None) -> Iterator[str]:
+    """
+    Return the pipeline's input items.
+    
+    Args:
+        spec: Pipeline spec
+        source: File (or ``-`` for stdin) overriding the spec's ``input``
+        
+    Returns:
+        Iterator over URLs or file paths
+    """
+    source = source or spec.get('input')
+    if isinstance(source, list):
+        return iter(str(item) for item in source)
+    if not source:
+        raise PipelineError("No pipeline input: set 'input' in the spec or pass --input")
+    return iter_urls(str(source))
+
+
+def _download_stage(options: Dict[str, Any], cleanup: contextlib.ExitStack) -> Callable[[str], Path]:
+    from .bandwidth import BandwidthScheduler, DEFAULT_FRAGMENTS
+    from .cache import MetadataCache
+    from .downloader import build_ydl_opts, _download_one, _setup_worker
+    from .pool import YoutubeDLPool
+    
+    output = str(options.get('output') or '.')
+    Path(output).mkdir(parents=True, exist_ok=True)
+    ydl_opts = build_ydl_opts(bool(options.get('audio')), output)
+    ydl_opts.update({'quiet': True, 'no_warnings': True, 'noprogress': True})
+    pool = YoutubeDLPool(ydl_opts, setup=_setup_worker)
+    cache = None if options.get('no_cache') else MetadataCache()
+    if cache is not None:
+        cleanup.callback(cache.close)
+    rate_limit = options.get('limit_rate')
+    scheduler = BandwidthScheduler(parse_size(str(rate_limit)) if rate_limit else None,
+                                   int(options.get('fragments', DEFAULT_FRAGMENTS)))
+    cleanup.callback(scheduler.close)
+    
+    def download(url: str) -> Path:
+        result = _download_one(pool, url, cache, scheduler)
+        if not result.ok:
+            raise ValueError(result.error)
+        return Path(result.path)
+    return download
+
+
+def _convert_stage(options: Dict[str, Any], cleanup: contextlib.ExitStack) -> Callable[[Path], Path]:
+    from .converter import MUXERS, convert_media, require_ffmpeg
+    
+    output_format = str(options['to']).lower().lstrip('.')
+    require_ffmpeg(muxers=[MUXERS.get(output_format, output_format)])
+    
+    def convert(path: Path) -> Path:
+        return convert_media(Path(path), output_format)
+    return convert
+
+
+def _compress_stage(options: Dict[str, Any], cleanup: contextlib.ExitStack) -> Callable[[Path], Path]:
+    from .converter import (
+        VIDEO_ENCODER, PredictOptions, _compress_worker, ffmpeg_thread_budget, require_ffmpeg
+    )
+    
+    quality = options.get('quality', 'medium')
+    if quality not in ('low', 'medium', 'high'):
+        raise PipelineError(f"Invalid compress quality: {quality}")
+    require_ffmpeg(encoders=[VIDEO_ENCODER])
+    threads = ffmpeg_thread_budget(options.get('jobs', DEFAULT_STAGE_JOBS['compress']))
+    
+    predict = None
+    goals = {}
+    for key, base in (('target_size', 1024), ('max_bitrate', 1000)):
+        value = options.get(key)
+        if value is not None:
+            goals[key] = parse_size(str(value), base)
+    if options.get('min_gain') is not None:
+        goals['min_gain'] = float(options['min_gain'])
+    if options.get('predict') or goals:
+        predict = PredictOptions(**goals)
+        
+    def compress(path: Path) -> Path:
+        result = _compress_worker(Path(path), quality, threads, predict)
+        if not result.ok:
+            raise RuntimeError(result.error)
+        return result.input_file if result.skipped else result.output_file
+    return compress
+
+
+STAGE_BUILDERS = {
+    'download': _download_stage,
+    'convert': _convert_stage,
+    'compress': _compress_stage,
+}
+
+
+def build_stages(spec: Dict[str, Any], cleanup: contextlib.ExitStack) -> List[Stage]:
+    """
+    Create the stages described by a validated spec.
+    
+    Args:
+        spec: Validated pipeline spec
+        cleanup: Receives the callbacks closing what the stages opened
+            (caches, bandwidth schedulers); close it once the run is over
+    
+    Raises:
+        PipelineError: If a stage's options are invalid
+    """
+    stages = []
+    for options in spec['stages']:
+        jobs = options.get('jobs', DEFAULT_STAGE_JOBS[options['type']])
+        try:
+            func = STAGE_BUILDERS[options['type']](dict(options, jobs=jobs), cleanup)
+        except ValueError as e:
+            raise PipelineError(f"Invalid {options['type']} stage: {e}")
+        stages.append(Stage(options['type'], func, jobs))
+    return stages
+
+
+def print_pipeline_report(stats: List[StageStats], results: List[ItemResult], elapsed: float) -> None:
+    """Print per-stage throughput and utilization for a finished run."""
+    succeeded = sum(1 for r in results if r.ok)
+    
+    print(f"\n{'=' * 80}")
+    print(f"{'Stage':<10} {'Jobs':>4} {'Done':>6} {'Failed':>6} {'Busy':>9} {'Utilization':>12} {'Peak queue':>11}")
+    for st in stats:
+        print(f"{st.name:<10} {st.concurrency:>4} {st.processed:>6} {st.failed:>6} "
+              f"{st.busy:>8.1f}s {st.utilization(elapsed) * 100:>11.0f}% {st.peak_queue:>11}")
+    print()
+    print_info(f"Succeeded: {succeeded}")
+    print_info(f"Failed: {len(results) - succeeded}")
+    print_info(f"Wall time: {elapsed:.1f}s")
+
+
+def run_pipeline_spec(spec_path: str, source: Optional[str] = None) -> None:
+    """
+    Run the pipeline described by a spec file and print a report.
+    
+    Args:
+        spec_path: Path to the JSON or YAML spec
+        source: File (or ``-`` for stdin) overriding the spec's ``input``
+    """
+    def report(result: ItemResult) -> None:
+        if not result.ok:
+            # FFmpeg errors carry the tail of its log; the last line says what went wrong
+            reason = result.error.strip().splitlines()[-1] if result.error.strip() else result.error
+            print_error(f"{result.item}: {result.stage} failed: {reason}")
+            return
+        try:
+            size = f" ({format_file_size(Path(result.value).stat().st_size)})"
+        except (OSError, TypeError):
+            size = ""
+        print_success(f"{result.item} -> {result.value}{size}")
+        
+    # Closes the download stage's metadata cache and bandwidth scheduler however the run ends
+    with contextlib.ExitStack() as cleanup:
+        try:
+            spec = load_spec(spec_path)
+            stages = build_stages(spec, cleanup)
+            items = spec_inputs(spec, source)
+        except PipelineError as e:
+            print_error(str(e))
+            sys.exit(1)
+        queue_size = spec.get('queue_size', DEFAULT_QUEUE_SIZE)
+        
+        print_info("Pipeline: " + " -> ".join(f"{s.name} x{s.concurrency}" for s in stages))
+        start = time.monotonic()
+        try:
+            results, stats = run_pipeline(items, stages, queue_size, report)
+        except OSError as e:
+            print_error(f"Cannot read pipeline input: {e}")
+            sys.exit(1)
+    print_pipeline_report(stats, results, time.monotonic() - start)
+    
+    if any(not r.ok for r in results):
+        sys.exit(1)
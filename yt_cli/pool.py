@@ -0,0 +1,49 @@
+"""
+Per-thread pool of reusable yt-dlp instances.
+"""
+
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import yt_dlp
+
+
+class YoutubeDLPool:
+    """
+    Hands out one reusable ``YoutubeDL`` instance per worker thread.
+    
+    Reusing an instance keeps its HTTP connections, cookie jar and loaded
+    extractors warm across the URLs a worker processes.
+    
+    Args:
+        ydl_opts: Options shared by every instance
+        setup: Optional callable given a copy of the options for a new
+            instance; it may modify them (e.g. to install per-worker hooks)
+            and returns a per-worker state object
+    """
+    
+    def __init__(self, ydl_opts: Dict[str, Any],
+                 setup: Optional[Callable[[Dict[str, Any]], Any]] = None):
+        self._ydl_opts = ydl_opts
+        self._setup = setup
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._instances: List[Any] = []
+    
+    def get(self) -> Tuple[Any, Any]:
+        """Return this thread's ``(ydl, state)`` pair, creating it on first use."""
+        worker = getattr(self._local, 'worker', None)
+        if worker is None:
+            opts = dict(self._ydl_opts)
+            state = self._setup(opts) if self._setup else None
+            ydl = yt_dlp.YoutubeDL(opts)
+            worker = self._local.worker = (ydl, state)
+            with self._lock:
+                self._instances.append(ydl)
+        return worker
+    
+    def close(self) -> None:
+        """Close every instance created by the pool."""
+        with self._lock:
+            for ydl in self._instances:
+                ydl.close()
+            self._instances.clear()
@@ -0,0 +1,347 @@
+"""
+Resumable, verified downloads that survive process restarts.
+
+Downloads are saved as ``VIDEO_ID.ext``. Next to each one a sidecar file,
+``.VIDEO_ID.yt-cli.json``, holds the download's state:
+
+* the formats yt-dlp selected, with their expected sizes,
+* the byte ranges of each ``.part`` file known to be safely on disk, and
+* whether the finished file passed verification.
+
+A rerun after a crash or a kill pins the same formats, so it continues
+the same ``.part`` files. Each ``.part`` is cut back to its last
+checkpoint before yt-dlp resumes it with an HTTP range request, so bytes
+written after the last checkpoint (which a crash may have torn) are
+fetched again. A download is only marked complete once the size of each
+format and the duration of the final file have been checked.
+"""
+
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from yt_dlp.postprocessor import PostProcessor
+from .ffmpeg import probe_media
+
+
+STATE_SUFFIX = '.yt-cli.json'
+
+# Bytes downloaded between checkpoints of a .part file
+CHECKPOINT_BYTES = 8 * 1024 * 1024
+
+# Largest difference between the expected and the probed duration, in
+# seconds and as a fraction of the duration (whichever is larger)
+DURATION_TOLERANCE = 2.0
+DURATION_TOLERANCE_RATIO = 0.01
+
+
+class VerificationError(Exception):
+    """A finished download does not match what was expected."""
+
+
+@dataclass
+class PartState:
+    """Progress of one selected format."""
+    
+    tmpfilename: Optional[str] = None
+    expected_size: Optional[int] = None
+    completed: List[List[int]] = field(default_factory=list)
+    finished: bool = False
+    size: Optional[int] = None
+    
+    @property
+    def good_bytes(self) -> int:
+        """Length of the prefix of the ``.part`` file known to be on disk."""
+        if self.completed and self.completed[0][0] == 0:
+            return self.completed[0][1]
+        return 0
+        
+    def add_range(self, start: int, end: int) -> None:
+        """Record ``[start, end)`` as safely written, merging overlapping ranges."""
+        ranges = sorted(self.completed + [[start, end]])
+        merged: List[List[int]] = []
+        for low, high in ranges:
+            if merged and low <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], high)
+            else:
+                merged.append([low, high])
+        self.completed = merged
+
+
+@dataclass
+class DownloadState:
+    """Sidecar state of one video's download."""
+    
+    video_id: str
+    format_id: Optional[str] = None
+    duration: Optional[float] = None
+    parts: Dict[str, PartState] = field(default_factory=dict)
+    status: str = 'downloading'
+    filepath: Optional[str] = None
+    
+    @staticmethod
+    def path_for(directory: Path, video_id: str) -> Path:
+        return Path(directory) / f".{video_id}{STATE_SUFFIX}"
+        
+    @classmethod
+    def load(cls, path: Path) -> Optional['DownloadState']:
+        """Read a sidecar file, or return None if it is missing or unreadable."""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            parts = {fid: PartState(**part) for fid, part in data.pop('parts', {}).items()}
+            return cls(parts=parts, **data)
+        except (OSError, ValueError, TypeError):
+            return None
+            
+    def save(self, path: Path) -> None:
+        """Write the sidecar file atomically and durably."""
+        path = Path(path)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(asdict(self), f, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+
+def _sync_size(path: str) -> Optional[int]:
+    """Flush a file to disk and return its size, or None if it does not exist."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        os.fsync(fd)
+        return os.fstat(fd).st_size
+    finally:
+        os.close(fd)
+
+
+class ResumeTracker(PostProcessor):
+    """
+    Keeps the sidecar state of the downloads of one ``YoutubeDL`` instance.
+    
+    Call ``attach`` once per instance, then wrap each download in ``begin``
+    (after extracting with ``process=False``), ``finish`` (after
+    processing) and ``end``. Runs as a ``before_dl`` post-processor to
+    record the formats yt-dlp selected, and as a progress hook to
+    checkpoint the ``.part`` files.
+    
+    Args:
+        output_dir: Directory the downloads (and their sidecar files) are saved in
+        checkpoint_bytes: Bytes downloaded between checkpoints
+    """
+    
+    def __init__(self, output_dir: str, checkpoint_bytes: int = CHECKPOINT_BYTES):
+        super().__init__(None)
+        self.output_dir = Path(output_dir)
+        self.checkpoint_bytes = checkpoint_bytes
+        self.state: Optional[DownloadState] = None
+        self._path: Optional[Path] = None
+        self._attached: List[Any] = []
+        
+    @classmethod
+    def pp_key(cls) -> str:
+        return 'ResumeTracker'
+        
+    def attach(self, ydl: Any) -> None:
+        """Install the tracker on a ``YoutubeDL`` instance (once)."""
+        if any(attached is ydl for attached in self._attached):
+            return
+        ydl.add_post_processor(self, when='before_dl')
+        ydl.add_progress_hook(self.progress_hook)
+        self._attached.append(ydl)
+        
+    def begin(self, info: Dict[str, Any]) -> int:
+        """
+        Load the state of an extracted (unprocessed) video and prepare its resume.
+        
+        The formats chosen by the interrupted run are pinned, so yt-dlp
+        continues the same ``.part`` files, and each ``.part`` is cut back
+        to its last checkpoint.
+        
+        Args:
+            info: Result of ``extract_info(url, download=False, process=False)``
+            
+        Returns:
+            Bytes kept from earlier runs (0 for a fresh download)
+        """
+        self.state = None
+        video_id = info.get('id')
+        if not video_id or info.get('_type', 'video') != 'video':
+            return 0
+        self._path = DownloadState.path_for(self.output_dir, video_id)
+        state = DownloadState.load(self._path)
+        if state is None:
+            return 0
+            
+        if state.status == 'complete':
+            if state.filepath and os.path.exists(state.filepath):
+                self.state = state
+                return 0
+            state = DownloadState(video_id)
+            
+        pinned = (state.format_id or '').split('+')
+        formats = info.get('formats') or []
+        if state.format_id and all(any(f.get('format_id') == fid for f in formats) for fid in pinned):
+            info['formats'] = [f for f in formats if f.get('format_id') in pinned]
+        else:
+            # The formats changed since the interrupted run, so its parts are useless
+            self._discard_parts(state)
+            state = DownloadState(video_id)
+            
+        kept = 0
+        for part in state.parts.values():
+            if part.finished or not part.tmpfilename:
+                continue
+            kept += self._trim_part(part)
+        self.state = state
+        state.save(self._path)
+        return kept
+        
+    @staticmethod
+    def _trim_part(part: PartState) -> int:
+        """Cut a ``.part`` file back to its last good byte and return its new size."""
+        try:
+            size = os.path.getsize(part.tmpfilename)
+        except OSError:
+            part.completed = []
+            return 0
+        good = part.good_bytes
+        if part.expected_size is not None and size > part.expected_size:
+            good = 0
+        if size > good:
+            with open(part.tmpfilename, 'r+b') as f:
+                f.truncate(good)
+        part.completed = [[0, good]] if good else []
+        return good
+        
+    @staticmethod
+    def _discard_parts(state: DownloadState) -> None:
+        for part in state.parts.values():
+            if part.tmpfilename and not part.finished:
+                try:
+                    os.unlink(part.tmpfilename)
+                except OSError:
+                    pass
+                    
+    def run(self, info: Dict[str, Any]):
+        """Record the selected formats before yt-dlp starts downloading them."""
+        if self._path is None or info.get('id') is None:
+            return [], info
+        state = self.state
+        if state is None or state.status == 'complete' or state.video_id != info['id']:
+            state = DownloadState(info['id'])
+        requested = info.get('requested_formats') or [info]
+        state.format_id = info.get('format_id')
+        state.duration = info.get('duration')
+        for fmt in requested:
+            part = state.parts.setdefault(str(fmt.get('format_id')), PartState())
+            part.expected_size = fmt.get('filesize')
+        self.state = state
+        state.save(self._path)
+        return [], info
+        
+    def progress_hook(self, d: Dict[str, Any]) -> None:
+        """Checkpoint the ``.part`` file of the format being downloaded."""
+        state = self.state
+        if state is None or state.status == 'complete':
+            return
+        format_id = str((d.get('info_dict') or {}).get('format_id'))
+        part = state.parts.setdefault(format_id, PartState())
+        
+        if d['status'] == 'downloading' and d.get('tmpfilename'):
+            part.tmpfilename = d['tmpfilename']
+            if (d.get('downloaded_bytes') or 0) - part.good_bytes >= self.checkpoint_bytes:
+                size = _sync_size(part.tmpfilename)
+                if size:
+                    part.add_range(0, size)
+                    state.save(self._path)
+        elif d['status'] == 'finished':
+            part.finished = True
+            part.size = d.get('total_bytes') or d.get('downloaded_bytes')
+            if d.get('filename') and os.path.exists(d['filename']):
+                part.size = os.path.getsize(d['filename'])
+            if part.size:
+                part.completed = [[0, part.size]]
+            state.save(self._path)
+            
+    def finish(self, info: Dict[str, Any]) -> Optional[str]:
+        """
+        Verify a processed download and mark it complete.
+        
+        Args:
+            info: Result of ``process_ie_result(..., download=True)``
+            
+        Returns:
+            Path of the final file, or None if nothing was tracked
+            
+        Raises:
+            VerificationError: If a format has the wrong size, or the final
+                file is missing or has the wrong duration; the file and the
+                state are removed so the next run downloads it again
+        """
+        state = self.state
+        if state is None:
+            return None
+        downloads = info.get('requested_downloads') or [{}]
+        path = downloads[-1].get('filepath') or state.filepath
+        if state.status == 'complete' and path == state.filepath:
+            return path
+            
+        try:
+            verify_download(state, path)
+        except VerificationError:
+            for stale in (path, self._path):
+                try:
+                    os.unlink(stale)
+                except (OSError, TypeError):
+                    pass
+            raise
+            
+        state.status = 'complete'
+        state.filepath = path
+        state.save(self._path)
+        return path
+        
+    def end(self) -> None:
+        """Forget the current download."""
+        self.state = None
+        self._path = None
+
+
+def verify_download(state: DownloadState, path: Optional[str]) -> None:
+    """
+    Check a finished download against its recorded state.
+    
+    Args:
+        state: State holding the expected size of each format and the duration
+        path: Final file
+        
+    Raises:
+        VerificationError: If a check fails
+    """
+    if not path or not os.path.isfile(path):
+        raise VerificationError(f"Downloaded file is missing: {path}")
+    for format_id, part in state.parts.items():
+        if part.expected_size and part.size is not None and part.size != part.expected_size:
+            raise VerificationError(
+                f"Format {format_id} has {part.size} bytes, expected {part.expected_size}")
+                
+    if state.duration:
+        media = probe_media(path)
+        if media is not None and media.duration is not None:
+            tolerance = max(DURATION_TOLERANCE, state.duration * DURATION_TOLERANCE_RATIO)
+            if abs(media.duration - state.duration) > tolerance:
+                raise VerificationError(
+                    f"Downloaded file lasts {media.duration:.1f}s, expected {state.duration:.1f}s")
@@ -0,0 +1,220 @@
+"""
+Extractive transcript summarizer.
+
+Sentences are weighted with TF-IDF and ranked with TextRank over their
+cosine-similarity graph. The graph is never materialized: with unit-length
+sentence vectors, the weighted neighbour sum TextRank needs for sentence
+``i`` equals ``s_i . sum_j(c_j * s_j)`` minus the self-loop, so each
+power iteration is one pass over the sparse vectors. Total cost is linear
+in the transcript length, which keeps multi-hour transcripts fast.
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from operator import mul
+from typing import Dict, List, Tuple
+from .trace import span
+
+
+# Sentences longer than this are split into windows of this many words.
+# Auto-generated captions often have no punctuation at all.
+MAX_SENTENCE_WORDS = 30
+
+DAMPING = 0.85
+MAX_ITERATIONS = 30
+TOLERANCE = 1e-4
+
+# Sparse vector: (term ids, weights)
+SparseVector = Tuple[Tuple[int, ...], Tuple[float, ...]]
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+_TOKEN = re.compile(r"[a-z0-9']+")
+
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been
+before being below between both but by can could did do does doing down during
+each few for from further had has have having he her here hers herself him
+himself his how i if in into is it its itself just like me more most my myself
+no nor not now of off on once only or other our ours ourselves out over own
+really right so some such than that the their theirs them themselves then there
+these they this those through to too under until up very was we were what when
+where which while who whom why will with would you your yours yourself
+yourselves gonna yeah okay oh um uh
+""".split())
+
+
+@dataclass
+class Summary:
+    """Result of summarizing a text."""
+    
+    text: str
+    total_words: int
+    summary_words: int
+
+
+def split_sentences(text: str) -> List[List[str]]:
+    """
+    Split text into sentences, each given as its list of words.
+    
+    Sentences are split after ``.``, ``!`` and ``?``; any sentence longer than
+    ``MAX_SENTENCE_WORDS`` is cut into consecutive windows of that size.
+    
+    Args:
+        text: Text to split
+        
+    Returns:
+        List of sentences, each a list of whitespace-separated words
+    """
+    sentences = []
+    for chunk in _SENTENCE_END.split(text):
+        words = chunk.split()
+        for start in range(0, len(words), MAX_SENTENCE_WORDS):
+            sentences.append(words[start:start + MAX_SENTENCE_WORDS])
+    return sentences
+
+
+def _tfidf_vectors(sentences: List[List[str]]) -> Tuple[List[SparseVector], int]:
+    """
+    Return a unit-length TF-IDF vector for each sentence.
+    
+    Terms are mapped to integer ids so that dense per-term accumulators
+    can be plain lists.
+    
+    Returns:
+        Tuple of (vectors, vocabulary size)
+    """
+    term_ids: Dict[str, int] = {}
+    term_counts = []
+    document_frequency: List[int] = []
+    for words in sentences:
+        counts: Dict[int, int] = {}
+        for term in _TOKEN.findall(' '.join(words).lower()):
+            if term not in STOP_WORDS:
+                term_id = term_ids.setdefault(term, len(term_ids))
+                counts[term_id] = counts.get(term_id, 0) + 1
+        term_counts.append(counts)
+        document_frequency.extend([0] * (len(term_ids) - len(document_frequency)))
+        for term_id in counts:
+            document_frequency[term_id] += 1
+            
+    n = len(sentences)
+    idf = [math.log(n / df) + 1.0 for df in document_frequency]
+    
+    vectors = []
+    for counts in term_counts:
+        ids = tuple(counts)
+        weights = [(1.0 + math.log(counts[t])) * idf[t] for t in ids]
+        norm = math.sqrt(sum(w * w for w in weights))
+        if norm:
+            weights = [w / norm for w in weights]
+        vectors.append((ids, tuple(weights)))
+    return vectors, len(term_ids)
+
+
+def _weighted_sum(vectors: List[SparseVector], coefficients: List[float], size: int) -> List[float]:
+    """Return ``sum_j(coefficients[j] * vectors[j])`` as a dense list."""
+    total = [0.0] * size
+    for (ids, weights), c in zip(vectors, coefficients):
+        if c:
+            for t, w in zip(ids, weights):
+                total[t] += c * w
+    return total
+
+
+def _dot(vector: SparseVector, dense: List[float]) -> float:
+    ids, weights = vector
+    return sum(map(mul, weights, map(dense.__getitem__, ids)))
+
+
+def rank_sentences(sentences: List[List[str]]) -> List[float]:
+    """
+    Score sentences with TextRank over their TF-IDF cosine similarities.
+    
+    Args:
+        sentences: Sentences as lists of words
+        
+    Returns:
+        One score per sentence; higher is more central
+    """
+    n = len(sentences)
+    if n == 0:
+        return []
+        
+    vectors, size = _tfidf_vectors(sentences)
+    self_similarity = [1.0 if ids else 0.0 for ids, _ in vectors]
+    
+    # Weighted degree of each node: similarity to every other sentence
+    centroid = _weighted_sum(vectors, [1.0] * n, size)
+    degree = [_dot(v, centroid) - s for v, s in zip(vectors, self_similarity)]
+    
+    scores = [1.0] * n
+    for _ in range(MAX_ITERATIONS):
+        contribution = [score / d if d > 1e-12 else 0.0 for score, d in zip(scores, degree)]
+        flow = _weighted_sum(vectors, contribution, size)
+        new_scores = [
+            (1 - DAMPING) + DAMPING * (_dot(v, flow) - c * s)
+            for v, c, s in zip(vectors, contribution, self_similarity)
+        ]
+        delta = max(abs(a - b) for a, b in zip(new_scores, scores))
+        scores = new_scores
+        if delta < TOLERANCE:
+            break
+    return scores
+
+
+def summarize(text: str, summary_type: str = "medium") -> Summary:
+    """
+    Build an extractive summary of ``text``.
+    
+    The highest-ranked sentences are selected until the word budget for
+    ``summary_type`` is used up, then emitted in their original order.
+    
+    Args:
+        text: Text to summarize
+        summary_type: Type of summary (short, medium, long)
+        
+    Returns:
+        Summary with its word counts
+    """
+    with span('summarize', 'summarizer', characters=len(text), summary_type=summary_type):
+        return _summarize(text, summary_type)
+
+
+def _summarize(text: str, summary_type: str) -> Summary:
+    sentences = split_sentences(text)
+    lengths = [len(words) for words in sentences]
+    total_words = sum(lengths)
+    
+    # Define summary lengths
+    summary_lengths = {
+        "short": min(100, total_words // 10),
+        "medium": min(300, total_words // 4),
+        "long": min(600, total_words // 2)
+    }
+    
+    target_length = summary_lengths.get(summary_type, summary_lengths["medium"])
+    if target_length <= 0:
+        return Summary(text="", total_words=total_words, summary_words=0)
+        
+    scores = rank_sentences(sentences)
+    order = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+    
+    chosen = []
+    used = 0
+    for i in order:
+        if used + lengths[i] <= target_length:
+            chosen.append(i)
+            used += lengths[i]
+            if used == target_length:
+                break
+                
+    if not chosen:
+        # Every sentence is longer than the budget: trim the best one
+        best = order[0]
+        words = sentences[best][:target_length]
+        return Summary(text=' '.join(words), total_words=total_words, summary_words=len(words))
+        
+    chosen.sort()
+    summary = ' '.join(' '.join(sentences[i]) for i in chosen)
+    return Summary(text=summary, total_words=total_words, summary_words=used)
@@ -0,0 +1,258 @@
+"""
+Playlist and channel mirroring with a persistent download archive.
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+from urllib.parse import urlparse
+import yt_dlp
+from .bandwidth import BandwidthScheduler, DEFAULT_FRAGMENTS
+from .cache import MetadataCache
+from .downloader import DownloadResult, build_ydl_opts, print_batch_report, _download_one, _setup_worker
+from .pool import YoutubeDLPool
+from .utils import print_error, print_success, print_info, format_file_size, run_bounded
+
+
+ARCHIVE_NAME = '.yt-cli-archive.txt'
+
+# Channel tabs list the newest uploads first, so once this many videos in a
+# row are already archived, the rest of the tab is too
+DEFAULT_STOP_AFTER = 20
+
+# Nesting allowed between the given URL and the videos (channel -> tab -> video)
+MAX_DEPTH = 3
+
+_VIDEO_ID = re.compile(r'[0-9A-Za-z_-]{11}')
+
+YOUTUBE_HOSTS = ('youtube.com', 'youtu.be', 'youtube-nocookie.com')
+
+
+@dataclass
+class SyncEntry:
+    """A video found while listing a playlist or channel."""
+    
+    video_id: str
+    title: Optional[str] = None
+    
+    @property
+    def url(self) -> str:
+        return f'https://www.youtube.com/watch?v={self.video_id}'
+
+
+class DownloadArchive:
+    """
+    Set of video IDs that were already downloaded.
+    
+    The file uses yt-dlp's ``--download-archive`` format (one ``youtube ID``
+    line per video), so it can be shared with yt-dlp itself. IDs are
+    appended and synced as soon as each download finishes, so an
+    interrupted sync never downloads a finished video again.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._ids: Set[str] = set()
+        self._lock = threading.Lock()
+        self._torn = False
+        
+    def load(self) -> None:
+        """Read the archive, ignoring lines for other sites and a torn last line."""
+        self._ids = set()
+        self._torn = False
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                for line in f:
+                    self._torn = not line.endswith('\n')
+                    parts = line.split()
+                    if len(parts) == 2 and parts[0].lower() == 'youtube' and _VIDEO_ID.fullmatch(parts[1]):
+                        self._ids.add(parts[1])
+        except OSError:
+            pass
+            
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._ids
+        
+    def __len__(self) -> int:
+        return len(self._ids)
+        
+    def add(self, video_id: str) -> None:
+        """Record a downloaded video."""
+        with self._lock:
+            if video_id in self._ids:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if self._torn:
+                    # Keep a torn last line from swallowing the new entry
+                    f.write('\n')
+                f.write(f"youtube {video_id}\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._torn = False
+            self._ids.add(video_id)
+
+
+def is_collection_url(url: str) -> bool:
+    """Check that a URL points at YouTube (a playlist, channel or channel tab)."""
+    host = (urlparse(url if '://' in url else f'https://{url}').hostname or '').lower()
+    return any(host == h or host.endswith('.' + h) for h in YOUTUBE_HOSTS)
+
+
+def _video_entry(entry: Dict[str, Any]) -> Optional[SyncEntry]:
+    """Return the entry as a video, or None if it is a nested listing."""
+    if entry.get('ie_key', 'Youtube') != 'Youtube' or entry.get('entries') is not None:
+        return None
+    video_id = entry.get('id')
+    if not video_id or not _VIDEO_ID.fullmatch(video_id):
+        return None
+    return SyncEntry(video_id, entry.get('title'))
+
+
+def iter_entries(ydl: Any, info: Dict[str, Any], archive: Optional[DownloadArchive] = None,
+                 stop_after: int = 0, depth: int = 0) -> Iterator[SyncEntry]:
+    """
+    Yield the videos of a flat (unprocessed) yt-dlp result, following nested listings.
+    
+    A channel URL resolves to one listing per tab; those and any redirects
+    are followed up to ``MAX_DEPTH`` levels. Listings are paged lazily, so
+    stopping early saves the requests for the remaining pages.
+    
+    Args:
+        ydl: ``YoutubeDL`` used to resolve nested listings
+        info: Result of ``extract_info(url, download=False, process=False)``
+        archive: Archive consulted for ``stop_after``
+        stop_after: Stop a listing after this many consecutive archived
+            videos (0 lists everything)
+        depth: Current nesting level
+        
+    Yields:
+        Videos in listing order (duplicates are possible across tabs)
+    """
+    video = _video_entry(info) if info.get('_type', 'video') != 'playlist' else None
+    if video is not None:
+        yield video
+        return
+        
+    if info.get('_type') in ('url', 'url_transparent'):
+        if depth < MAX_DEPTH:
+            nested = ydl.extract_info(info['url'], download=False, process=False)
+            yield from iter_entries(ydl, nested, archive, stop_after, depth + 1)
+        return
+        
+    known_run = 0
+    for entry in info.get('entries') or []:
+        if not entry:
+            continue
+        video = _video_entry(entry)
+        if video is None:
+            if depth < MAX_DEPTH:
+                yield from iter_entries(ydl, entry, archive, stop_after, depth + 1)
+            continue
+        yield video
+        if archive is not None and stop_after:
+            known_run = known_run + 1 if video.video_id in archive else 0
+            if known_run >= stop_after:
+                break
+
+
+def sync_collection(url: str, output_path: str = ".", audio_only: bool = False,
+                    jobs: int = 4, archive_path: Optional[str] = None,
+                    use_cache: bool = True, stop_after: int = DEFAULT_STOP_AFTER,
+                    rate_limit: Optional[float] = None,
+                    fragments: int = DEFAULT_FRAGMENTS) -> List[DownloadResult]:
+    """
+    Download the videos of a playlist or channel that are not in the archive yet.
+    
+    Entries are listed with flat extraction, which reads only the listing
+    pages and not each video's page, and new videos are downloaded
+    concurrently while the listing continues. For channels (any URL
+    without a ``list=`` playlist ID), listing stops after ``stop_after``
+    consecutive archived videos, so a repeat sync only reads the first
+    page of each tab. Playlists are always listed in full, since new
+    entries may be appended anywhere.
+    
+    Args:
+        url: Playlist, channel or channel tab URL
+        output_path: Directory to save the downloads
+        audio_only: If True, download audio only
+        jobs: Number of concurrent downloads
+        archive_path: Archive file (default: ``.yt-cli-archive.txt`` in ``output_path``)
+        use_cache: If True, store the extracted metadata in the metadata cache
+        stop_after: Consecutive archived videos that end a channel listing (0 lists everything)
+        rate_limit: Total download rate in bytes per second (None for no limit)
+        fragments: Fragment connections shared by the active downloads
+        
+    Returns:
+        One result per downloaded (or failed) video, in completion order
+    """
+    if jobs < 1:
+        print_error("--jobs must be at least 1")
+        sys.exit(1)
+    if not is_collection_url(url):
+        print_error("sync needs a YouTube playlist or channel URL")
+        sys.exit(1)
+        
+    Path(output_path).mkdir(parents=True, exist_ok=True)
+    archive = DownloadArchive(Path(archive_path) if archive_path else Path(output_path) / ARCHIVE_NAME)
+    archive.load()
+    if 'list=' in url:
+        stop_after = 0
+        
+    print_info(f"Archive {archive.path}: {len(archive)} video(s) already downloaded")
+    scheduler = BandwidthScheduler(rate_limit, fragments, report=True)
+    print_info(f"Listing {url} and downloading new videos with {jobs} worker(s), {scheduler.describe()}...")
+    
+    lister = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True})
+    ydl_opts = build_ydl_opts(audio_only, output_path)
+    ydl_opts.update({'quiet': True, 'no_warnings': True, 'noprogress': True})
+    pool = YoutubeDLPool(ydl_opts, setup=_setup_worker)
+    cache = MetadataCache() if use_cache else None
+    counts = {'listed': 0, 'known': 0}
+    
+    def new_entries() -> Iterator[SyncEntry]:
+        seen = set()
+        info = lister.extract_info(url, download=False, process=False)
+        for entry in iter_entries(lister, info, archive, stop_after):
+            if entry.video_id in seen:
+                continue
+            seen.add(entry.video_id)
+            counts['listed'] += 1
+            if entry.video_id in archive:
+                counts['known'] += 1
+            else:
+                yield entry
+                
+    results = []
+    listing_failed = False
+    start = time.monotonic()
+    
+    try:
+        for entry, result, error in run_bounded(lambda e: _download_one(pool, e.url, cache, scheduler),
+                                                new_entries(), jobs):
+            if error is not None:
+                result = DownloadResult(url=entry.url, error=str(error))
+            results.append(result)
+            if result.ok:
+                archive.add(entry.video_id)
+                print_success(f"{result.title or entry.title or entry.url} ({format_file_size(result.bytes)})")
+            else:
+                print_error(f"{entry.url}: {result.error}")
+    except yt_dlp.utils.DownloadError as e:
+        print_error(f"Listing failed: {e}")
+        listing_failed = True
+    finally:
+        scheduler.close()
+        pool.close()
+        lister.close()
+        
+    print_info(f"Listed: {counts['listed']} video(s), {counts['known']} already in the archive")
+    print_batch_report(results, time.monotonic() - start)
+    if listing_failed:
+        sys.exit(1)
+    return results
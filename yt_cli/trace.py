@@ -0,0 +1,270 @@
+"""
+Lightweight phase timing, Chrome trace output and profiling.
+
+Code marks its phases with ``span``::
+
+    with span('extract_info', url=video_url):
+        info = ydl.extract_info(video_url, download=False)
+
+Spans are only recorded while a ``Tracer`` is active (``yt-cli --trace
+FILE``). Otherwise ``span`` returns a shared no-op context manager, so an
+instrumented phase costs a single function call. The recorded spans are
+written as Chrome trace events, which chrome://tracing, Perfetto
+(ui.perfetto.dev) and speedscope show as a timeline per thread.
+
+yt-dlp transfers and post-processes a video inside a single call, so
+``instrument_ydl_opts`` adds hooks that turn its progress and
+post-processor events into ``transfer`` and ``postprocess`` spans.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+PROFILE_SORT_KEYS = ('cumulative', 'tottime', 'calls')
+
+# Functions listed by ``--profile``
+PROFILE_LIMIT = 40
+
+
+class Tracer:
+    """Collects the completed spans of every thread."""
+    
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.pid = os.getpid()
+        self._origin = time.perf_counter()
+        self._threads: Dict[int, str] = {}
+        self._open: Dict[Hashable, Tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        
+    def _thread_id(self) -> int:
+        thread = threading.current_thread()
+        self._threads.setdefault(thread.ident, thread.name)
+        return thread.ident
+        
+    def record(self, name: str, start: float, end: float, category: str = 'yt-cli',
+               args: Optional[Dict[str, Any]] = None, tid: Optional[int] = None) -> None:
+        """
+        Add a completed span.
+        
+        Args:
+            name: Phase name
+            start: Start time from ``time.perf_counter()``
+            end: End time from ``time.perf_counter()``
+            category: Trace category, e.g. the module the phase belongs to
+            args: Details shown with the span
+            tid: Thread the span ran on (default: the calling thread)
+        """
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((start - self._origin) * 1e6, 3),
+            'dur': round((end - start) * 1e6, 3),
+            'pid': self.pid,
+            'tid': tid if tid is not None else self._thread_id(),
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+            
+    def begin(self, key: Hashable) -> None:
+        """Open a span that ends in another callback, unless ``key`` is already open."""
+        with self._lock:
+            if key not in self._open:
+                self._open[key] = (time.perf_counter(), self._thread_id())
+                
+    def end(self, key: Hashable, name: str, category: str = 'yt-cli',
+            args: Optional[Dict[str, Any]] = None) -> None:
+        """Close the span opened with ``begin(key)``; does nothing if it is not open."""
+        with self._lock:
+            opened = self._open.pop(key, None)
+        if opened is not None:
+            start, tid = opened
+            self.record(name, start, time.perf_counter(), category, args, tid)
+            
+    def totals(self) -> List[Tuple[str, int, float]]:
+        """Return ``(name, count, seconds)`` per phase name, the longest first."""
+        totals: Dict[str, List[float]] = {}
+        with self._lock:
+            for event in self.events:
+                entry = totals.setdefault(event['name'], [0, 0.0])
+                entry[0] += 1
+                entry[1] += event['dur'] / 1e6
+        return sorted(((name, int(count), seconds) for name, (count, seconds) in totals.items()),
+                      key=lambda item: item[2], reverse=True)
+                      
+    def to_chrome(self) -> Dict[str, Any]:
+        """Return the spans in the Chrome trace-event format."""
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self.pid, 'args': {'name': 'yt-cli'}}]
+        with self._lock:
+            for tid, name in self._threads.items():
+                metadata.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                                 'args': {'name': name}})
+            events = sorted(self.events, key=lambda event: event['ts'])
+        return {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}
+        
+    def write(self, path: str) -> None:
+        """Write the spans to ``path`` as Chrome trace-event JSON."""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_chrome(), f)
+
+
+class _Span:
+    """A phase being timed; see ``span``."""
+    
+    __slots__ = ('tracer', 'name', 'category', 'args', 'start')
+    
+    def __init__(self, tracer: Tracer, name: str, category: str, args: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = 0.0
+        
+    def __enter__(self) -> '_Span':
+        self.start = time.perf_counter()
+        return self
+        
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        self.tracer.record(self.name, self.start, time.perf_counter(), self.category, self.args)
+        return False
+        
+    def set(self, **args: Any) -> None:
+        """Add details that are only known once the phase has run."""
+        self.args.update(args)
+
+
+class _NullSpan:
+    """Stand-in for ``_Span`` while tracing is off."""
+    
+    __slots__ = ()
+    
+    def __enter__(self) -> '_NullSpan':
+        return self
+        
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+        
+    def set(self, **args: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+_tracer: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    """Start recording spans in this process and return the tracer."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop_tracing() -> Optional[Tracer]:
+    """Stop recording spans and return the tracer that recorded them."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def span(name: str, category: str = 'yt-cli', **args: Any):
+    """
+    Time a phase while tracing is on.
+    
+    Args:
+        name: Phase name
+        category: Trace category, e.g. the module the phase belongs to
+        **args: Details shown with the span (keep them cheap to compute)
+        
+    Returns:
+        Context manager; its ``set(**args)`` adds details from inside the phase
+    """
+    tracer = _tracer
+    if tracer is None:
+        return _NULL_SPAN
+    return _Span(tracer, name, category, args)
+
+
+def progress_hook(d: Dict[str, Any]) -> None:
+    """yt-dlp progress hook that times the transfer of each format."""
+    tracer = _tracer
+    if tracer is None:
+        return
+    key = ('transfer', d.get('filename'))
+    if d['status'] == 'downloading':
+        tracer.begin(key)
+    else:
+        info = d.get('info_dict') or {}
+        tracer.end(key, 'transfer', 'yt-dlp', {
+            'video_id': info.get('id'),
+            'format_id': info.get('format_id'),
+            'bytes': d.get('total_bytes') or d.get('downloaded_bytes'),
+            'status': d['status'],
+        })
+
+
+def postprocessor_hook(d: Dict[str, Any]) -> None:
+    """yt-dlp post-processor hook that times each post-processor, e.g. ``FFmpegExtractAudio``."""
+    tracer = _tracer
+    if tracer is None:
+        return
+    info = d.get('info_dict') or {}
+    key = ('postprocess', d.get('postprocessor'), info.get('id'))
+    if d['status'] == 'started':
+        tracer.begin(key)
+    elif d['status'] == 'finished':
+        tracer.end(key, 'postprocess', 'yt-dlp', {'postprocessor': d.get('postprocessor'),
+                                                  'video_id': info.get('id')})
+
+
+def instrument_ydl_opts(opts: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the tracing hooks to yt-dlp options while tracing is on, and return them."""
+    if _tracer is not None:
+        for option, hook in (('progress_hooks', progress_hook), ('postprocessor_hooks', postprocessor_hook)):
+            hooks = list(opts.get(option) or [])
+            if hook not in hooks:
+                opts[option] = hooks + [hook]
+    return opts
+
+
+def profile_call(func: Callable[..., Any], *args: Any, sort: str = 'cumulative',
+                 limit: int = PROFILE_LIMIT, stream=None) -> Any:
+    """
+    Run ``func(*args)`` under cProfile and print its slowest functions.
+    
+    The statistics are printed even if ``func`` raises (or exits). Only the
+    calling thread is profiled.
+    
+    Args:
+        func: Function to run
+        *args: Its arguments
+        sort: ``pstats`` sort key, one of ``PROFILE_SORT_KEYS``
+        limit: Number of functions to print
+        stream: Where to print (default: stderr)
+        
+    Returns:
+        What ``func`` returns
+    """
+    import cProfile
+    import pstats
+    
+    profiler = cProfile.Profile()
+    try:
+        return profiler.runcall(func, *args)
+    finally:
+        stats = pstats.Stats(profiler, stream=stream or sys.stderr)
+        stats.sort_stats(sort).print_stats(limit)
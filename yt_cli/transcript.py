@@ -2,19 +2,87 @@
 Transcript fetching and summarization module.
 """
 
+import json
+import os
+import random
+import re
 import sys
-from typing import Optional
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
-from .utils import print_error, print_success, print_info, extract_video_id
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, TextIO, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+from youtube_transcript_api import (
+    NoTranscriptFound, TooManyRequests, TranscriptsDisabled, YouTubeTranscriptApi
+)
+# The 0.6 public API opens a new session per call; its fetcher is the only way to
+# share one. requirements.txt pins youtube-transcript-api below 1.0, which changed it.
+from youtube_transcript_api._transcripts import TranscriptListFetcher
+from .cache import TranscriptStore
+from .metrics import count_failure
+from .summarizer import summarize
+from .trace import span
+from .utils import print_error, print_success, print_info, extract_video_id, iter_urls, run_bounded
 
 
-def fetch_transcript(video_url: str) -> Optional[str]:
+# HTTP statuses that mean "slow down" rather than "failed"
+THROTTLE_STATUSES = (429, 503)
+
+DEFAULT_RETRIES = 5
+BACKOFF_BASE = 1.0    # Seconds; doubled on every retry
+BACKOFF_MAX = 60.0
+
+_VIDEO_ID = re.compile(r'[0-9A-Za-z_-]{11}')
+
+
+def fetch_transcript_segments(video_id: str, languages: Sequence[str] = ('en',),
+                              store: Optional[TranscriptStore] = None) -> Tuple[List[Dict[str, Any]], str]:
+    """
+    Fetch the transcript segments of a video and report where they came from.
+    
+    Args:
+        video_id: YouTube video ID
+        languages: Language codes in order of preference
+        store: Transcript store to read from and write to (None disables it)
+        
+    Returns:
+        Tuple of (segments, source), where source is 'cache' or 'api'
+        
+    Raises:
+        TranscriptsDisabled: If transcripts are disabled for the video
+        NoTranscriptFound: If no transcript exists in the requested languages
+    """
+    language_key = ','.join(languages)
+    with span('cache_lookup', 'transcript') as lookup:
+        segments = store.get(video_id, language_key) if store else None
+        lookup.set(hit=segments is not None)
+    if segments is not None:
+        return segments, 'cache'
+        
+    try:
+        with span('fetch_transcript', 'transcript', video_id=video_id):
+            segments = YouTubeTranscriptApi.get_transcript(video_id, languages=list(languages))
+    except Exception as e:
+        count_failure('transcript', e)
+        raise
+    if store:
+        store.put(video_id, language_key, segments)
+    return segments, 'api'
+
+
+def fetch_transcript(video_url: str, languages: Sequence[str] = ('en',),
+                     use_cache: bool = True) -> Optional[str]:
     """
     Fetch transcript from a YouTube video.
     
+    Transcripts are kept in the local transcript store, so summarizing the
+    same video again (e.g. at a different length) does not refetch it.
+    
     Args:
         video_url: YouTube video URL
+        languages: Language codes in order of preference
+        use_cache: If False, bypass the local transcript store
         
     Returns:
         Full transcript text or None if unavailable
@@ -24,9 +92,14 @@ def fetch_transcript(video_url: str) -> Optional[str]:
         print_error("Invalid YouTube URL")
         return None
     
+    store = TranscriptStore() if use_cache else None
+    
     try:
-        print_info(f"Fetching transcript for video ID: {video_id}")
-        transcript_list = YouTubeTranscriptApi.get_transcript(video_id)
+        transcript_list, source = fetch_transcript_segments(video_id, languages, store)
+        if source == 'cache':
+            print_info(f"Using cached transcript for video ID: {video_id}")
+        else:
+            print_info(f"Fetched transcript for video ID: {video_id}")
         
         # Combine all transcript segments
         full_transcript = " ".join([entry['text'] for entry in transcript_list])
@@ -41,12 +114,18 @@ def fetch_transcript(video_url: str) -> Optional[str]:
     except Exception as e:
         print_error(f"Failed to fetch transcript: {str(e)}")
         return None
+    finally:
+        if store is not None:
+            store.close()
 
 
 def summarize_text(text: str, summary_type: str = "medium") -> str:
     """
     Summarize text based on the summary type.
     
+    The most representative sentences are picked by TF-IDF weighted
+    TextRank (see ``yt_cli.summarizer``) and returned in their original order.
+    
     Args:
         text: Text to summarize
         summary_type: Type of summary (short, medium, long)
@@ -54,54 +133,236 @@ def summarize_text(text: str, summary_type: str = "medium") -> str:
     Returns:
         Summarized text
     """
-    words = text.split()
-    total_words = len(words)
-    
-    # Define summary lengths
-    summary_lengths = {
-        "short": min(100, total_words // 10),
-        "medium": min(300, total_words // 4),
-        "long": min(600, total_words // 2)
-    }
-    
-    target_length = summary_lengths.get(summary_type, summary_lengths["medium"])
-    
-    # Simple extractive summary: take first N words
-    # In production, you might want to use NLP libraries like NLTK or spaCy
-    summary_words = words[:target_length]
-    summary = " ".join(summary_words)
-    
-    # Add ellipsis if truncated
-    if len(words) > target_length:
-        summary += "..."
-    
-    return summary
+    return summarize(text, summary_type).text
 
 
-def generate_summary(video_url: str, summary_type: str = "medium") -> None:
+def generate_summary(video_url: str, summary_type: str = "medium",
+                     languages: Sequence[str] = ('en',), use_cache: bool = True) -> None:
     """
     Generate and print a summary of a YouTube video transcript.
     
     Args:
         video_url: YouTube video URL
         summary_type: Type of summary (short, medium, long)
+        languages: Transcript language codes in order of preference
+        use_cache: If False, bypass the local transcript store
     """
     if summary_type not in ["short", "medium", "long"]:
         print_error(f"Invalid summary type: {summary_type}. Use 'short', 'medium', or 'long'")
         sys.exit(1)
     
-    transcript = fetch_transcript(video_url)
+    transcript = fetch_transcript(video_url, languages, use_cache)
     
     if transcript:
         print_info(f"Generating {summary_type} summary...")
-        summary = summarize_text(transcript, summary_type)
+        summary = summarize(transcript, summary_type)
         
         print_success("Summary generated:\n")
         print("=" * 80)
-        print(summary)
+        print(summary.text)
         print("=" * 80)
-        print(f"\nOriginal length: {len(transcript.split())} words")
-        print(f"Summary length: {len(summary.split())} words")
+        print(f"\nOriginal length: {summary.total_words} words")
+        print(f"Summary length: {summary.summary_words} words")
     else:
         print_error("Could not generate summary")
         sys.exit(1)
+
+
+class Throttled(Exception):
+    """Raised when YouTube answers with a throttling status."""
+    
+    def __init__(self, status: int, retry_after: Optional[float] = None):
+        super().__init__(f"Throttled by YouTube (HTTP {status})")
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _raise_throttled(response: requests.Response, *args: Any, **kwargs: Any) -> None:
+    """Response hook turning throttling statuses into ``Throttled``."""
+    if response.status_code in THROTTLE_STATUSES:
+        retry_after = response.headers.get('Retry-After', '')
+        raise Throttled(response.status_code, float(retry_after) if retry_after.isdigit() else None)
+
+
+def create_session(pool_size: int = 4) -> requests.Session:
+    """
+    Create the HTTP session shared by batch transcript workers.
+    
+    The connection pool is sized for ``pool_size`` concurrent workers, so
+    every worker reuses a kept-alive connection, and the consent cookie
+    YouTube sets for the first video is reused for the rest.
+    
+    Args:
+        pool_size: Number of workers sharing the session
+        
+    Returns:
+        Configured ``requests.Session``
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.hooks['response'].append(_raise_throttled)
+    return session
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None,
+                  base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """
+    Return how long to wait before retry number ``attempt`` (starting at 0).
+    
+    A server-sent ``Retry-After`` is honoured; otherwise the delay is drawn
+    uniformly from zero to an exponentially growing ceiling ("full jitter"),
+    so throttled workers do not retry in lockstep.
+    """
+    if retry_after is not None:
+        return min(retry_after, cap)
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def fetch_with_retry(fetch: Callable[[], Any], retries: int = DEFAULT_RETRIES,
+                     sleep: Callable[[float], None] = time.sleep) -> Any:
+    """
+    Call ``fetch``, retrying with jittered backoff while YouTube throttles.
+    
+    Args:
+        fetch: Callable performing the requests
+        retries: Retries after the first attempt
+        sleep: Function used to wait (replaceable in tests)
+        
+    Returns:
+        The result of ``fetch``
+        
+    Raises:
+        Throttled, TooManyRequests: If still throttled after the last retry
+    """
+    for attempt in range(retries + 1):
+        try:
+            return fetch()
+        except (Throttled, TooManyRequests) as e:
+            if attempt == retries:
+                raise
+            sleep(backoff_delay(attempt, getattr(e, 'retry_after', None)))
+
+
+def batch_video_id(line: str) -> Optional[str]:
+    """Return the video ID of a batch line holding a URL or a bare ID."""
+    return line if _VIDEO_ID.fullmatch(line) else extract_video_id(line)
+
+
+def _fetch_batch_one(session: requests.Session, line: str, languages: Sequence[str],
+                     store: Optional[TranscriptStore], retries: int) -> Dict[str, Any]:
+    """Fetch one batch entry over the shared session."""
+    video_id = batch_video_id(line)
+    if not video_id:
+        raise ValueError("Invalid YouTube URL or video ID")
+        
+    language_key = ','.join(languages)
+    segments = store.get(video_id, language_key) if store else None
+    source = 'cache'
+    if segments is None:
+        try:
+            with span('fetch_transcript', 'transcript', video_id=video_id):
+                segments = fetch_with_retry(
+                    lambda: TranscriptListFetcher(session).fetch(video_id).find_transcript(list(languages)).fetch(),
+                    retries)
+        except Exception as e:
+            count_failure('transcript', e)
+            raise
+        source = 'api'
+        if store:
+            store.put(video_id, language_key, segments)
+            
+    return {
+        'video_id': video_id,
+        'source': source,
+        'text': " ".join(entry['text'] for entry in segments),
+        'segments': segments,
+    }
+
+
+def _error_message(error: BaseException) -> str:
+    """Return the first line of an error's cause, without the API's troubleshooting text."""
+    message = str(getattr(error, 'cause', None) or error).strip()
+    return message.splitlines()[0] if message else type(error).__name__
+
+
+def _write_record(directory: Path, record: Dict[str, Any]) -> None:
+    """Atomically write one record to ``directory/<video_id>.json``."""
+    fd, tmp_path = tempfile.mkstemp(dir=str(directory), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, directory / f"{record['video_id']}.json")
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def fetch_transcript_batch(source: str, output: TextIO = sys.stdout, errors: TextIO = sys.stderr,
+                           output_dir: Optional[str] = None, languages: Sequence[str] = ('en',),
+                           jobs: int = 4, use_cache: bool = True, retries: int = DEFAULT_RETRIES,
+                           summary_type: Optional[str] = None,
+                           session: Optional[requests.Session] = None) -> Tuple[int, int]:
+    """
+    Fetch transcripts for every URL or video ID listed in a file (or stdin) concurrently.
+    
+    Workers share one pooled HTTP session. Throttling responses (HTTP 429
+    or 503, or YouTube's captcha page) are retried with jittered
+    exponential backoff. Each transcript is written as soon as it arrives,
+    either as an NDJSON line on ``output`` or as ``<video_id>.json`` in
+    ``output_dir``. Failures are written to ``errors`` as NDJSON objects
+    with ``url`` and ``error`` keys and do not stop the run.
+    
+    Args:
+        source: Path to a file with one URL or video ID per line, or ``-`` for stdin
+        output: Stream receiving NDJSON records when ``output_dir`` is None
+        errors: Stream receiving the failures
+        output_dir: Directory receiving one JSON file per video
+        languages: Language codes in order of preference
+        jobs: Number of concurrent fetches
+        use_cache: If False, bypass the local transcript store
+        retries: Retries per video while throttled
+        summary_type: Also summarize each transcript (short, medium, long)
+        session: HTTP session to use (default: ``create_session(jobs)``)
+        
+    Returns:
+        Tuple of (succeeded, failed) counts
+    """
+    directory = Path(output_dir) if output_dir else None
+    if directory:
+        directory.mkdir(parents=True, exist_ok=True)
+    own_session = session is None
+    session = session or create_session(jobs)
+    store = TranscriptStore() if use_cache else None
+    
+    succeeded = failed = 0
+    start = time.monotonic()
+    
+    try:
+        for line, record, error in run_bounded(
+                lambda u: _fetch_batch_one(session, u, languages, store, retries), iter_urls(source), jobs):
+            if error is not None:
+                errors.write(json.dumps({'url': line, 'error': _error_message(error)}) + '\n')
+                errors.flush()
+                failed += 1
+                continue
+            record['url'] = line
+            if summary_type:
+                record['summary'] = summarize(record['text'], summary_type).text
+            if directory:
+                _write_record(directory, record)
+            else:
+                output.write(json.dumps(record, ensure_ascii=False) + '\n')
+                output.flush()
+            succeeded += 1
+    finally:
+        if own_session:
+            session.close()
+        if store is not None:
+            store.close()
+            
+    elapsed = time.monotonic() - start
+    print_info(f"Fetched {succeeded} transcript(s), {failed} failed, in {elapsed:.1f}s",
+               file=sys.stderr)
+    return succeeded, failed
@@ -0,0 +1,225 @@
+"""
+Normalization and deduplication of YouTube URL lists.
+
+``yt-cli urls normalize`` streams a URL list (one per line) through
+``parse_youtube_url`` and writes the normalized URL of the first
+occurrence of each video, playlist and channel, in input order. A Short
+and a watch URL of the same video are duplicates. Lines that are not
+YouTube URLs are counted and skipped (or written to ``--rejects``).
+
+Deduplication is probabilistic and its memory is bounded, so inputs
+with millions of lines can be piped through it. ``SeenKeys`` remembers a
+64-bit hash of each key instead of the key itself, so two distinct items
+are taken for duplicates if their hashes collide (see ``SeenKeys`` for
+the odds). Once the in-memory set reaches its budget it is written as a
+sorted run to a temporary file, which later lookups binary-search
+through ``mmap``. Runs are merged once there are more than ``MAX_RUNS``
+of them.
+"""
+
+import bisect
+import hashlib
+import heapq
+import mmap
+import os
+import sys
+import tempfile
+import time
+from array import array
+from typing import Dict, List, Optional, TextIO, Tuple
+from .utils import URL_KINDS, iter_urls, parse_youtube_url, print_info
+
+
+# Memory for seen keys before they spill to disk
+DEFAULT_MEMORY = 64 * 1024 * 1024
+
+# Approximate bytes per key held in the in-memory set (int object and set slot)
+MEMORY_PER_KEY = 80
+
+# Sorted runs kept on disk before they are merged into one
+MAX_RUNS = 8
+
+# Keys written per chunk when spilling or merging
+_CHUNK = 65536
+
+_MASK = (1 << 64) - 1
+
+
+if sys.hash_info.width >= 64:
+    def _hash64(key: str) -> int:
+        return hash(key) & _MASK
+else:
+    # hash() has only 32 bits here, which would make collisions likely on big lists
+    def _hash64(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'little')
+
+
+class _Run:
+    """A sorted run of keys in a temporary file, searched in place."""
+    
+    def __init__(self, path: str, count: int):
+        self.path = path
+        self.count = count
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.keys = memoryview(self._map).cast('Q')
+        
+    def __contains__(self, key: int) -> bool:
+        i = bisect.bisect_left(self.keys, key)
+        return i < self.count and self.keys[i] == key
+        
+    def close(self) -> None:
+        self.keys.release()
+        self._map.close()
+        self._file.close()
+        os.unlink(self.path)
+
+
+class SeenKeys:
+    """
+    Probabilistic set membership with bounded memory.
+    
+    Only a 64-bit hash of each key is kept: ``hash()`` on 64-bit builds,
+    which is only stable within the process, so the spilled runs never
+    outlive it, and BLAKE2b on builds whose ``hash()`` is 32 bits wide. A
+    new key whose hash collides with an earlier key's is reported as seen.
+    Among n distinct keys that happens at all with a probability of about
+    n²/2^65: under 1 in 3,000 for 100 million keys.
+    
+    Args:
+        memory: Bytes of keys to hold in memory before spilling a run
+        directory: Where to put the runs (default: the system temp directory)
+    """
+    
+    def __init__(self, memory: int = DEFAULT_MEMORY, directory: Optional[str] = None):
+        self.max_keys = max(1024, memory // MEMORY_PER_KEY)
+        self.directory = directory
+        self.spills = 0
+        self._keys = set()
+        self._runs: List[_Run] = []
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        
+    def __len__(self) -> int:
+        return len(self._keys) + sum(run.count for run in self._runs)
+        
+    def add(self, key: str) -> bool:
+        """
+        Remember a key.
+        
+        Returns:
+            True if the key is new, False if it was seen before
+        """
+        h = _hash64(key)
+        if h in self._keys:
+            return False
+        for run in self._runs:
+            if h in run:
+                return False
+        self._keys.add(h)
+        if len(self._keys) >= self.max_keys:
+            self._spill()
+        return True
+        
+    def _new_path(self) -> str:
+        if self._tmp is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix='yt-cli-urls-', dir=self.directory)
+        fd, path = tempfile.mkstemp(suffix='.run', dir=self._tmp.name)
+        os.close(fd)
+        return path
+        
+    def _write_run(self, keys) -> _Run:
+        path = self._new_path()
+        count = 0
+        chunk = array('Q')
+        with open(path, 'wb') as f:
+            for key in keys:
+                chunk.append(key)
+                if len(chunk) == _CHUNK:
+                    chunk.tofile(f)
+                    count += len(chunk)
+                    chunk = array('Q')
+            chunk.tofile(f)
+            count += len(chunk)
+        return _Run(path, count)
+        
+    def _spill(self) -> None:
+        self._runs.append(self._write_run(sorted(self._keys)))
+        self._keys = set()
+        self.spills += 1
+        if len(self._runs) > MAX_RUNS:
+            runs, self._runs = self._runs, []
+            self._runs.append(self._write_run(heapq.merge(*(run.keys for run in runs))))
+            for run in runs:
+                run.close()
+                
+    def close(self) -> None:
+        """Remove the runs from disk."""
+        for run in self._runs:
+            run.close()
+        self._runs = []
+        self._keys = set()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+            self._tmp = None
+            
+    def __enter__(self) -> 'SeenKeys':
+        return self
+        
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def normalize_urls(source: str, output: TextIO = sys.stdout, rejects: Optional[TextIO] = None,
+                   memory: int = DEFAULT_MEMORY, kinds: Optional[Tuple[str, ...]] = None,
+                   ids: bool = False) -> Dict[str, int]:
+    """
+    Write the normalized, deduplicated URLs of a URL list.
+    
+    Args:
+        source: Path to a file with one URL per line, or ``-`` for stdin
+        output: Stream receiving one normalized URL (or ID) per line
+        rejects: Stream receiving the lines that are not YouTube URLs
+        memory: Bytes of seen keys to hold in memory before spilling to disk
+        kinds: Kinds to keep (default: all of ``URL_KINDS``); others are dropped
+        ids: Write canonical IDs instead of URLs
+        
+    Returns:
+        Counts of ``read``, ``written``, ``duplicates``, ``rejected`` and
+        ``skipped`` lines, and one count per kind written
+    """
+    counts = dict.fromkeys(('read', 'written', 'duplicates', 'rejected', 'skipped') + URL_KINDS, 0)
+    start = time.monotonic()
+    write = output.write
+    
+    with SeenKeys(memory) as seen:
+        for line in iter_urls(source):
+            counts['read'] += 1
+            parsed = parse_youtube_url(line)
+            if parsed is None:
+                counts['rejected'] += 1
+                if rejects is not None:
+                    rejects.write(line + '\n')
+                continue
+            if kinds is not None and parsed.kind not in kinds:
+                counts['skipped'] += 1
+                continue
+            # A Short is the same video as its watch URL
+            if not seen.add(parsed.id if parsed.is_video else parsed.url):
+                counts['duplicates'] += 1
+                continue
+            write((parsed.id if ids else parsed.url) + '\n')
+            counts['written'] += 1
+            counts[parsed.kind] += 1
+        spills = seen.spills
+        
+    elapsed = time.monotonic() - start
+    rate = counts['read'] / elapsed if elapsed > 0 else 0
+    print_info(f"Read {counts['read']:,} line(s) in {elapsed:.1f}s ({rate:,.0f}/s): "
+               f"{counts['written']:,} unique, {counts['duplicates']:,} duplicate(s), "
+               f"{counts['rejected']:,} not YouTube URLs"
+               + (f", {counts['skipped']:,} of other kinds" if kinds is not None else ''),
+               file=sys.stderr)
+    if spills:
+        print_info(f"Seen keys exceeded the memory budget and spilled to disk {spills} time(s)",
+                   file=sys.stderr)
+    return counts
@@ -2,9 +2,12 @@
 Utility functions for the YT CLI Tools package.
 """
 
+import os
 import sys
 import re
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, NamedTuple, Optional, TextIO, Tuple
 
 
 def print_error(message: str) -> None:
@@ -12,28 +15,150 @@ def print_error(message: str) -> None:
     print(f"Error: {message}", file=sys.stderr)
 
 
-def print_success(message: str) -> None:
-    """Print success message to stdout."""
-    print(f"✓ {message}")
+def print_success(message: str, file: Optional[TextIO] = None) -> None:
+    """Print success message to stdout (or ``file``)."""
+    print(f"✓ {message}", file=file)
 
 
-def print_info(message: str) -> None:
-    """Print info message to stdout."""
-    print(f"ℹ {message}")
+def print_info(message: str, file: Optional[TextIO] = None) -> None:
+    """Print info message to stdout (or ``file``)."""
+    print(f"ℹ {message}", file=file)
+
+
+def get_cache_dir() -> Path:
+    """
+    Return the directory used for on-disk caches.
+    
+    ``YT_CLI_CACHE_DIR`` takes precedence, then ``$XDG_CACHE_HOME/yt-cli``,
+    then ``~/.cache/yt-cli``. The directory is not created.
+    
+    Returns:
+        Cache directory path
+    """
+    override = os.environ.get('YT_CLI_CACHE_DIR')
+    if override:
+        return Path(override).expanduser()
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return Path(base) / 'yt-cli'
+
+
+# Kinds of YouTube URL told apart by ``parse_youtube_url``
+URL_KINDS = ('video', 'shorts', 'playlist', 'channel')
+
+# Every recognized URL shape in one pattern; the named group that matched
+# holds the ID and tells the kind. The host must be lowercase.
+_YOUTUBE_URL = re.compile(r'''
+    (?:https?://)?
+    (?:
+        (?:www\.|m\.|music\.)?youtube\.com/
+        (?:
+            watch\?(?:[^#\s]*?&)?v=(?P<watch>{id})(?![0-9A-Za-z_-])
+          | (?:watch|playlist)\?(?:[^#\s]*?&)?list=(?P<playlist>[0-9A-Za-z_-]{{2,}})(?![0-9A-Za-z_-])
+          | shorts/(?P<shorts>{id})
+          | (?:embed|v|e|live)/(?P<embed>{id})
+          | channel/(?P<channel>UC[0-9A-Za-z_-]{{22}})
+          | (?P<handle>@[^/?\#\s]+)
+          | (?P<legacy>c|user)/(?P<name>[^/?\#\s]+)
+        )
+      | (?:www\.)?youtube-nocookie\.com/(?:embed|v)/(?P<nocookie>{id})
+      | (?:www\.)?youtu\.be/(?P<short>{id})
+    )
+    (?:[/?&\#]\S*)?
+'''.format(id=r'[0-9A-Za-z_-]{11}'), re.VERBOSE)
+
+_VIDEO_GROUPS = frozenset(['watch', 'embed', 'nocookie', 'short'])
+
+
+class YouTubeURL(NamedTuple):
+    """A classified YouTube URL; see ``parse_youtube_url``."""
+    
+    kind: str
+    id: str
+    url: str
+    
+    @property
+    def is_video(self) -> bool:
+        """True for a single video, including a Short."""
+        return self.kind in ('video', 'shorts')
+
+
+def _lowercase_host(url: str) -> str:
+    """Strip a URL and lowercase its scheme and host, leaving the case-sensitive rest."""
+    rest = url.strip()
+    scheme, sep, tail = rest.partition('://')
+    if sep:
+        rest = tail
+    host, slash, path = rest.partition('/')
+    return (scheme.lower() + sep if sep else '') + host.lower() + slash + path
+
+
+def parse_youtube_url(url: str) -> Optional[YouTubeURL]:
+    """
+    Classify a YouTube URL and normalize it.
+    
+    Recognizes ``www.``, ``m.`` and ``music.youtube.com``,
+    ``youtube-nocookie.com`` and ``youtu.be``, with or without a scheme:
+    
+    * ``video``: ``/watch?v=ID`` (``v`` anywhere in the query), ``youtu.be/ID``,
+      ``/embed/ID``, ``/v/ID``, ``/e/ID`` and ``/live/ID``
+    * ``shorts``: ``/shorts/ID``
+    * ``playlist``: a ``list`` parameter without a ``v`` parameter,
+      e.g. ``/playlist?list=ID``
+    * ``channel``: ``/channel/UC...``, ``/@handle``, ``/c/NAME`` and
+      ``/user/NAME``, with any tab (``/videos``, ``/shorts``, ...) dropped
+      
+    A watch URL with both ``v`` and ``list`` is a video. Tracking
+    parameters, timestamps and fragments are dropped, and handles are
+    lowercased as YouTube treats them case-insensitively.
+    
+    This runs once per line of URL lists with millions of lines, so every
+    shape is told apart by a single precompiled pattern. Only a URL that
+    does not match is stripped and has its host lowercased for a second try.
+    
+    Args:
+        url: URL to classify
+        
+    Returns:
+        The kind, canonical ID and normalized ``https://www.youtube.com/...``
+        URL, or None if the URL is not one of the above
+    """
+    match = _YOUTUBE_URL.fullmatch(url)
+    if match is None:
+        retry = _lowercase_host(url)
+        if retry == url:
+            return None
+        match = _YOUTUBE_URL.fullmatch(retry)
+        if match is None:
+            return None
+            
+    group = match.lastgroup
+    value = match.group(group)
+    if group in _VIDEO_GROUPS:
+        return YouTubeURL('video', value, 'https://www.youtube.com/watch?v=' + value)
+    if group == 'shorts':
+        return YouTubeURL('shorts', value, 'https://www.youtube.com/shorts/' + value)
+    if group == 'playlist':
+        return YouTubeURL('playlist', value, 'https://www.youtube.com/playlist?list=' + value)
+    if group == 'channel':
+        return YouTubeURL('channel', value, 'https://www.youtube.com/channel/' + value)
+    if group == 'handle':
+        value = value.lower()
+        return YouTubeURL('channel', value, 'https://www.youtube.com/' + value)
+    return YouTubeURL('channel', value, f"https://www.youtube.com/{match.group('legacy')}/{value}")
 
 
 def validate_youtube_url(url: str) -> bool:
     """
-    Validate if the provided URL is a valid YouTube URL.
+    Validate if the provided URL is a valid YouTube video URL.
     
     Args:
         url: The URL to validate
         
     Returns:
-        True if valid, False otherwise
+        True if it names a single video (or Short), False otherwise
     """
-    youtube_regex = r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-    return bool(re.match(youtube_regex, url))
+    parsed = parse_youtube_url(url)
+    return parsed is not None and parsed.is_video
 
 
 def extract_video_id(url: str) -> Optional[str]:
@@ -46,10 +171,9 @@ def extract_video_id(url: str) -> Optional[str]:
     Returns:
         Video ID if found, None otherwise
     """
-    youtube_regex = r'(https?://)?(www\.)?(youtube|youtu|youtube-nocookie)\.(com|be)/(watch\?v=|embed/|v/|.+\?v=)?([^&=%\?]{11})'
-    match = re.match(youtube_regex, url)
-    if match:
-        return match.group(6)
+    parsed = parse_youtube_url(url)
+    if parsed is not None and parsed.is_video:
+        return parsed.id
     return None
 
 
@@ -88,3 +212,99 @@ def format_file_size(bytes_size: int) -> str:
             return f"{bytes_size:.2f} {unit}"
         bytes_size /= 1024.0
     return f"{bytes_size:.2f} PB"
+
+
+def parse_size(text: str, base: int = 1024) -> int:
+    """
+    Parse a size such as ``500M`` or ``1.5G`` into a number.
+    
+    Args:
+        text: Number with an optional K, M, G or T suffix (a trailing B is ignored)
+        base: Multiplier between units: 1024 for file sizes, 1000 for bitrates
+        
+    Returns:
+        Size as an integer
+        
+    Raises:
+        ValueError: If the text is not a valid size
+    """
+    value = text.strip().upper()
+    if value.endswith('B'):
+        value = value[:-1]
+    exponent = 0
+    if value and value[-1] in 'KMGT':
+        exponent = 'KMGT'.index(value[-1]) + 1
+        value = value[:-1]
+    number = float(value)
+    if number < 0:
+        raise ValueError(f"negative size: {text}")
+    return int(number * base ** exponent)
+
+
+def iter_urls(source: str) -> Iterator[str]:
+    """
+    Lazily read URLs from a file, one per line.
+    
+    Blank lines and lines starting with ``#`` are skipped.
+    
+    Args:
+        source: Path to a text file, or ``-`` to read from stdin
+        
+    Yields:
+        Stripped URL strings
+    """
+    stream = sys.stdin if source == '-' else open(source, encoding='utf-8')
+    try:
+        for line in stream:
+            line = line.strip()
+            if line and not line.startswith('#'):
+                yield line
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def run_bounded(func: Callable[[Any], Any], items: Iterable[Any], max_workers: int,
+                max_pending: Optional[int] = None) -> Iterator[Tuple[Any, Any, Optional[BaseException]]]:
+    """
+    Run ``func`` over ``items`` on a thread pool, yielding results as they finish.
+    
+    At most ``max_pending`` items are in flight at once, so ``items`` can be
+    an arbitrarily long iterator without being read into memory. Exceptions
+    raised by ``func`` are returned rather than propagated, so one failing
+    item does not stop the others.
+    
+    Args:
+        func: Function called with each item
+        items: Items to process
+        max_workers: Number of worker threads
+        max_pending: Maximum submitted-but-unfinished items (default: 2 * max_workers)
+        
+    Yields:
+        ``(item, result, error)`` tuples in completion order; ``error`` is None on success
+    """
+    max_workers = max(1, max_workers)
+    max_pending = max_pending or max_workers * 2
+    items = iter(items)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+        exhausted = False
+        
+        while pending or not exhausted:
+            while not exhausted and len(pending) < max_pending:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[executor.submit(func, item)] = item
+                
+            if not pending:
+                break
+                
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                item = pending.pop(future)
+                error = future.exception()
+                yield item, (None if error else future.result()), error